@@ -1,780 +1,1155 @@
 import streamlit as st
-import matplotlib.pyplot as plt
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.font_manager as fm
+from streamlit.errors import StreamlitAPIException
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import calendar
-from matplotlib.backends.backend_pdf import PdfPages
-from datetime import datetime
+import functools
 import io
-import warnings
-warnings.filterwarnings('ignore')
+import tempfile
+import threading
+import time
+from datetime import datetime
 
-# 日本語フォント設定
-try:
-    import japanize_matplotlib
-    japanize_matplotlib.japanize()
-except:
-    # 代替フォント設定
-    try:
-        font_path = '/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc'
-        font_prop = fm.FontProperties(fname=font_path)
-        plt.rcParams['font.family'] = font_prop.get_name()
-    except:
-        # それでもダメな場合はデフォルト
-        plt.rcParams['font.sans-serif'] = ['Noto Sans CJK JP', 'DejaVu Sans', 'sans-serif']
-        plt.rcParams['axes.unicode_minus'] = False
-
-# ページ設定
-st.set_page_config(
-    page_title="リハビリ訪問予定表",
-    page_icon="📅",
-    layout="centered"
+import metrics
+import profiling
+from calendar_pdf import create_pdf, render_months, warm_up
+from conflicts import ConflictIndex, caseload_visits, format_visit, month_visits
+from ics_export import iter_calendar
+from slot_finder import FreeTimeIndex
+from svg_preview import render_svg
+from store import ScheduleStore
+from schedule import (
+    WEEKDAY_NAMES, end_time, format_time_range, get_weekdays_in_same_week, holiday_name,
+    is_within_hours, month_range, parse_time_range, resolve_month, resolve_months, weekday_short
 )
+from render_cache import RenderCache, cached_create_pdf
+from render_pool import RenderPool
+
+# PDFキャッシュ（全セッションで共有）
+@st.cache_resource
+def get_render_cache():
+    return RenderCache()
+
+# PDF作成用のスレッドプール（全セッションで共有）
+@st.cache_resource
+def get_render_pool():
+    return RenderPool()
+
+# 年の選択肢
+YEARS = [2024, 2025, 2026, 2027, 2028]
+# 複数月作成で選べる月
+RANGE_MONTHS = month_range((YEARS[0], 1), (YEARS[-1], 12))
+
+# 振替元の選択肢（定期訪問日を合わせたもの）。曜日と年月が同じなら計算し直さない
+@st.cache_data
+def get_transfer_options(year, month, weekdays):
+    slots = [{'weekday': weekday, 'time': ''} for weekday in weekdays]
+    return resolve_month(year, month, slots).transfer_options()
+
+def current_visit_slots(state=None):
+    """入力中の定期訪問日1・2（セッション状態から読む。どのフラグメントからでも使える）"""
+    state = st.session_state if state is None else state
+    return [
+        {
+            'weekday': state[f'visit{n}_weekday'],
+            'time': format_time_range(state[f'visit{n}_start_hour'], state[f'visit{n}_start_min'],
+                                      state[f'visit{n}_duration']),
+        }
+        for n in (1, 2)
+    ]
+
+# 利用者・定期訪問・振替の保存先（全セッションで共有。接続はスレッドごと）
+@st.cache_resource
+def get_store():
+    return ScheduleStore()
+
+def current_patient_name(state=None):
+    state = st.session_state if state is None else state
+    return (state['patient_name'] if 'patient_name' in state else '').strip()
+
+def load_patient(year, month):
+    """利用者名・年月が変わったら、保存されている定期訪問と振替を入力欄に読み込む"""
+    name = current_patient_name()
+    target = (name, year, month)
+    previous = st.session_state.get('_loaded_for')
+    if not name or previous == target:
+        return
+    st.session_state._loaded_for = target
+    saved = get_store().patient_month(name, year, month)
+    if saved is None:
+        # まだ保存されていない利用者は今の入力のまま保存する。
+        # ただしほかの利用者から切り替えた場合、その人の振替は引き継がない
+        if previous and previous[0] != name:
+            st.session_state.transfers = []
+        return
+    for n, slot in enumerate(saved['slots'][:2], 1):
+        start, end = parse_time_range(slot['time'])
+        # 入力欄の選択肢にない値（3つ目以降の枠・5分刻みでない時刻など）は読み込まない
+        if slot['weekday'] in WEEKDAY_NAMES and end - start in (40, 60) and start % 5 == 0:
+            st.session_state[f'visit{n}_weekday'] = slot['weekday']
+            st.session_state[f'visit{n}_start_hour'] = start // 60
+            st.session_state[f'visit{n}_start_min'] = start % 60
+            st.session_state[f'visit{n}_duration'] = end - start
+    st.session_state.transfers = list(saved['transfers'])
+    st.session_state._saved = (target, tuple(s['time'] for s in current_visit_slots()),
+                               tuple(s['weekday'] for s in current_visit_slots()), tuple(st.session_state.transfers))
+
+def save_patient(year, month):
+    """利用者名が入力されていれば、定期訪問と振替を保存する（前回保存したときから変わっていなければ何もしない）"""
+    name = current_patient_name()
+    if not name:
+        return
+    slots = current_visit_slots()
+    snapshot = ((name, year, month), tuple(s['time'] for s in slots),
+                tuple(s['weekday'] for s in slots), tuple(st.session_state.transfers))
+    if st.session_state.get('_saved') != snapshot:
+        get_store().save_patient(name, slots, year, month, st.session_state.transfers)
+        st.session_state._saved = snapshot
+
+# アップロードされたケースロード（CSV・Excel）の読み込みと行ごとのチェック。
+# エラーのある行は除いた利用者と、エラーの一覧を返す
+@st.cache_data(max_entries=8)
+def load_caseload(data, year, month):
+    # numpy を使うので、ケースロードを使うときだけimportする
+    from caseload_import import read_rows, to_patients, validate_rows
+    rows = read_rows(data)
+    errors = validate_rows(rows, year, month)
+    return to_patients(rows, errors), errors
+
+# ケースロード全体の訪問の区間（担当者・日ごと）。
+# caseload_source はケースロードファイルのバイト列か、データベースの revision（書き込むたびに変わる）
+@st.cache_resource(max_entries=8)
+def get_conflict_index(caseload_source, year, month):
+    if isinstance(caseload_source, bytes):
+        patients, _ = load_caseload(caseload_source, year, month)
+    else:
+        patients = get_store().load_month(year, month)
+    return patients, ConflictIndex(caseload_visits(year, month, patients))
+
+# 振替先の候補探し用の空き時間（担当者ごと。この利用者のケースロード上の訪問は除く）
+@st.cache_resource(max_entries=32)
+def get_free_time_index(caseload_source, year, month, therapist, patient):
+    patients, _ = get_conflict_index(caseload_source, year, month)
+    others = [p for p in patients if p['therapist'] == therapist and p['patient'] != patient]
+    return FreeTimeIndex(caseload_visits(year, month, others))
+
+def caseload_zip(patients, year, month):
+    """
+    ケースロード全員分のPDFのZIP（ダウンロードボタンを押したときに別スレッドで作る）
+    PDFは作成用のスレッドプールで作り、できた順に一時ファイルのZIPへ書き込む
+    """
+    from batch import iter_patient_pdfs, write_zip
+    pool = get_render_pool()
+    f = tempfile.TemporaryFile()
+    write_zip(iter_patient_pdfs(patients, year, month, pool.workers, submit=pool.submit), f)
+    f.seek(0)
+    return f
+
+def schedule_ics(months, slots, transfers_by_month, patient):
+    """入力中の予定の iCalendar（.ics）のバイト列（ダウンロードボタンを押したときに作る）"""
+    entries = ((schedule, patient, '') for schedule in resolve_months(months, slots, transfers_by_month))
+    return ''.join(iter_calendar(entries, patient or "訪問リハビリ", show_patient=False)).encode('utf-8')
+
+def session_ics(state, months, year, month):
+    """
+    ダウンロードボタンを押したときの入力（定期訪問・振替・利用者名）で .ics を作る。
+    振替の編集では振替のフラグメントだけ再実行され、ボタンは作り直されないので、表示したときの値を渡すと古くなる。
+    押したときはスクリプトの外で呼ばれ st.session_state が使えないので、セッションの状態（state）から直接読む
+    """
+    return schedule_ics(months, current_visit_slots(state), {(year, month): list(state['transfers'])},
+                        current_patient_name(state))
 
-# 超スタイリッシュなCSS
-st.markdown("""
-<style>
-    /* 全体設定 */
-    .main .block-container {
-        padding: 2rem 1.5rem;
-        max-width: 1000px;
-    }
+# ケースロード全体の1年分の訪問の配列（集計用）。絞り込みを変えてもここは作り直さない
+@st.cache_resource(max_entries=4)
+def get_workload(caseload_source, caseload_month, year):
+    from workload import build_workload
+    from ics_export import caseload_entries
+    months = month_range((year, 1), (year, 12))
+    if isinstance(caseload_source, bytes):
+        # ケースロードのファイルの振替は、読み込んだときに選んでいた月のもの
+        patients, _ = load_caseload(caseload_source, *caseload_month)
+        no_transfers = [dict(p, transfers=[]) for p in patients]
+
+        def load_month(y, m):
+            return patients if (y, m) == caseload_month else no_transfers
+    else:
+        load_month = get_store().load_month
+    return build_workload(months, caseload_entries(months, load_month))
+
+def workload_csv(rows):
+    """集計のCSV（Excelで開けるようにBOM付き）"""
+    from workload import write_csv
+    out = io.StringIO()
+    write_csv(rows, out)
+    return out.getvalue().encode('utf-8-sig')
+
+def makeup_suggestions(year, month, transfer_from):
+    """振替元の日の訪問の振替先候補（ケースロードがあればほかの利用者の訪問を避ける）"""
+    slots = resolve_month(year, month, current_visit_slots()).regular_slots(transfer_from)
+    if not slots:
+        return []
+    caseload = current_caseload(year, month)
+    if caseload:
+        source, _, therapist, patient = caseload
+        index = get_free_time_index(source, year, month, therapist, patient).copy()
+    else:
+        therapist, patient = '', None
+        index = FreeTimeIndex()
+    # この利用者自身の訪問（登録済みの振替を含む）も埋まっている時間にする
+    schedule = resolve_month(year, month, current_visit_slots(), st.session_state.transfers)
+    for visit in month_visits(schedule, patient, therapist):
+        index.add(visit)
+    return index.suggest(year, month, transfer_from, slots[0]['time'], therapist, patient)
+
+def apply_suggestion(suggestion):
+    """候補のボタン: 振替先と時間の入力欄に候補を入れる（ウィジェットの作成前に呼ばれる）"""
+    st.session_state.transfer_to_select = suggestion.day
+    st.session_state.start_hour = suggestion.start // 60
+    st.session_state.start_min = suggestion.start % 60
+    if suggestion.end - suggestion.start in (40, 60):
+        st.session_state.duration = suggestion.end - suggestion.start
+
+def current_caseload(year, month):
+    """
+    比べる相手のケースロード (caseload_source, 区間, 担当者, この利用者の名前)。なければ None
+    ケースロードのファイルを読み込んでいればそれを、なければ利用者名が入力されているときにデータベースを使う
+    """
+    uploaded = st.session_state.get('caseload_csv')
+    if uploaded is not None:
+        source = uploaded.getvalue()
+        try:
+            _, index = get_conflict_index(source, year, month)
+        except ValueError:
+            return None  # 読めないファイル（エラーはケースロードの欄に表示する）
+        return source, index, st.session_state.get('caseload_therapist', ''), st.session_state.get('caseload_patient')
+
+    name = current_patient_name()
+    if not name:
+        return None
+    source = get_store().revision()
+    patients, index = get_conflict_index(source, year, month)
+    therapist = next((p['therapist'] for p in patients if p['patient'] == name), '')
+    return source, index, therapist, name
+
+def timed_fragment(func):
+    """st.fragment に実行時間の記録を付ける（scripts/rerun_timing.py で再実行時間を比べる用）"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            st.session_state.setdefault('_section_timings', {})[func.__name__] = elapsed
+            metrics.observe(f'app.fragment.{func.__name__}', elapsed)
+    return st.fragment(wrapper)
+
+def rerun_fragment():
+    """フラグメントの再実行中ならその部分だけ、ページ全体の実行中ならページ全体を再実行"""
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
+
+_script_start = time.perf_counter()
+
+# 再実行のプロファイル（REHAB_CALENDAR_PROFILE=rerun か、URLに ?profile=1 を付けている間）
+_rerun_profile = None
+if profiling.enabled_for('rerun') or st.query_params.get('profile') == '1':
+    _rerun_profile = profiling.capture('rerun').start()
+
+try:
+    # ページ設定
+    st.set_page_config(
+        page_title="リハビリ訪問予定表",
+        page_icon="📅",
+        layout="centered"
+    )
+
+    # 超スタイリッシュなCSS
+    st.markdown("""
+    <style>
+        /* 全体設定 */
+        .main .block-container {
+            padding: 2rem 1.5rem;
+            max-width: 1000px;
+        }
     
-    /* タイトル */
-    h1 {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        font-weight: 900;
-        font-size: 2.8rem;
-        margin-bottom: 0.5rem;
-        text-align: center;
-    }
+        /* タイトル */
+        h1 {
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            -webkit-background-clip: text;
+            -webkit-text-fill-color: transparent;
+            font-weight: 900;
+            font-size: 2.8rem;
+            margin-bottom: 0.5rem;
+            text-align: center;
+        }
     
-    /* セクションヘッダー */
-    h2 {
-        color: #2c3e50;
-        font-weight: 800;
-        margin: 3rem 0 1.5rem 0;
-        padding-bottom: 1rem;
-        border-bottom: 4px solid;
-        border-image: linear-gradient(90deg, #667eea 0%, #764ba2 100%) 1;
-        font-size: 1.8rem;
-    }
+        /* セクションヘッダー */
+        h2 {
+            color: #2c3e50;
+            font-weight: 800;
+            margin: 3rem 0 1.5rem 0;
+            padding-bottom: 1rem;
+            border-bottom: 4px solid;
+            border-image: linear-gradient(90deg, #667eea 0%, #764ba2 100%) 1;
+            font-size: 1.8rem;
+        }
     
-    /* セレクトボックス */
-    .stSelectbox label {
-        font-weight: 700;
-        color: #2c3e50;
-        font-size: 1.05rem;
-        margin-bottom: 0.5rem;
-    }
+        /* セレクトボックス */
+        .stSelectbox label {
+            font-weight: 700;
+            color: #2c3e50;
+            font-size: 1.05rem;
+            margin-bottom: 0.5rem;
+        }
     
-    .stSelectbox > div > div {
-        border-radius: 14px;
-        border: 2px solid #e3e8ef;
-        background: white;
-        transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1);
-        box-shadow: 0 1px 3px rgba(0,0,0,0.05);
-    }
+        .stSelectbox > div > div {
+            border-radius: 14px;
+            border: 2px solid #e3e8ef;
+            background: white;
+            transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1);
+            box-shadow: 0 1px 3px rgba(0,0,0,0.05);
+        }
     
-    .stSelectbox > div > div:hover {
-        border-color: #667eea;
-        box-shadow: 0 4px 12px rgba(102, 126, 234, 0.15);
-        transform: translateY(-1px);
-    }
+        .stSelectbox > div > div:hover {
+            border-color: #667eea;
+            box-shadow: 0 4px 12px rgba(102, 126, 234, 0.15);
+            transform: translateY(-1px);
+        }
     
-    /* セレクトボックス内のテキストを濃く */
-    .stSelectbox div[data-baseweb="select"] > div {
-        color: #1a202c !important;
-        font-weight: 700 !important;
-        font-size: 1.1rem !important;
-    }
+        /* セレクトボックス内のテキストを濃く */
+        .stSelectbox div[data-baseweb="select"] > div {
+            color: #1a202c !important;
+            font-weight: 700 !important;
+            font-size: 1.1rem !important;
+        }
     
-    /* セレクトボックスの選択された値 */
-    .stSelectbox div[data-baseweb="select"] span {
-        color: #1a202c !important;
-        font-weight: 700 !important;
-    }
+        /* セレクトボックスの選択された値 */
+        .stSelectbox div[data-baseweb="select"] span {
+            color: #1a202c !important;
+            font-weight: 700 !important;
+        }
     
-    /* ドロップダウンリスト内のテキスト */
-    .stSelectbox ul[role="listbox"] li {
-        color: #2c3e50 !important;
-        font-weight: 600 !important;
-        font-size: 1.05rem !important;
-    }
+        /* ドロップダウンリスト内のテキスト */
+        .stSelectbox ul[role="listbox"] li {
+            color: #2c3e50 !important;
+            font-weight: 600 !important;
+            font-size: 1.05rem !important;
+        }
     
-    /* ドロップダウンリストの背景 */
-    .stSelectbox ul[role="listbox"] {
-        background: white !important;
-        border: 2px solid #e3e8ef !important;
-        box-shadow: 0 8px 24px rgba(0,0,0,0.15) !important;
-        border-radius: 12px !important;
-    }
+        /* ドロップダウンリストの背景 */
+        .stSelectbox ul[role="listbox"] {
+            background: white !important;
+            border: 2px solid #e3e8ef !important;
+            box-shadow: 0 8px 24px rgba(0,0,0,0.15) !important;
+            border-radius: 12px !important;
+        }
     
-    /* ドロップダウンのホバー */
-    .stSelectbox ul[role="listbox"] li:hover {
-        background: #f0f4ff !important;
-        color: #667eea !important;
-        font-weight: 700 !important;
-    }
+        /* ドロップダウンのホバー */
+        .stSelectbox ul[role="listbox"] li:hover {
+            background: #f0f4ff !important;
+            color: #667eea !important;
+            font-weight: 700 !important;
+        }
     
-    /* ボタン */
-    .stButton button {
-        border-radius: 14px;
-        font-weight: 700;
-        transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1);
-        border: none;
-        letter-spacing: 0.5px;
-    }
+        /* ボタン */
+        .stButton button {
+            border-radius: 14px;
+            font-weight: 700;
+            transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1);
+            border: none;
+            letter-spacing: 0.5px;
+        }
     
-    .stButton button:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 8px 20px rgba(0,0,0,0.12);
-    }
+        .stButton button:hover {
+            transform: translateY(-2px);
+            box-shadow: 0 8px 20px rgba(0,0,0,0.12);
+        }
     
-    .stButton button[kind="primary"] {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        font-size: 1.1rem;
-        padding: 0.7rem 2rem;
-        height: 55px;
-    }
+        .stButton button[kind="primary"] {
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            color: white;
+            font-size: 1.1rem;
+            padding: 0.7rem 2rem;
+            height: 55px;
+        }
     
-    .stButton button[kind="primary"]:hover {
-        box-shadow: 0 8px 25px rgba(102, 126, 234, 0.35);
-    }
+        .stButton button[kind="primary"]:hover {
+            box-shadow: 0 8px 25px rgba(102, 126, 234, 0.35);
+        }
     
-    /* ダウンロードボタン */
-    .stDownloadButton button {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%) !important;
-        color: white !important;
-        font-weight: 800 !important;
-        font-size: 1.25rem !important;
-        padding: 1.2rem 3rem !important;
-        border-radius: 16px !important;
-        border: none !important;
-        box-shadow: 0 6px 20px rgba(102, 126, 234, 0.3) !important;
-        transition: all 0.3s ease !important;
-    }
+        /* ダウンロードボタン */
+        .stDownloadButton button {
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%) !important;
+            color: white !important;
+            font-weight: 800 !important;
+            font-size: 1.25rem !important;
+            padding: 1.2rem 3rem !important;
+            border-radius: 16px !important;
+            border: none !important;
+            box-shadow: 0 6px 20px rgba(102, 126, 234, 0.3) !important;
+            transition: all 0.3s ease !important;
+        }
     
-    .stDownloadButton button:hover {
-        transform: scale(1.03) !important;
-        box-shadow: 0 10px 30px rgba(102, 126, 234, 0.4) !important;
-    }
+        .stDownloadButton button:hover {
+            transform: scale(1.03) !important;
+            box-shadow: 0 10px 30px rgba(102, 126, 234, 0.4) !important;
+        }
     
-    /* メッセージボックス */
-    .stSuccess, .stError, .stWarning, .stInfo {
-        border-radius: 12px;
-        padding: 1.2rem;
-        font-weight: 600;
-        border-left: 5px solid;
-    }
+        /* メッセージボックス */
+        .stSuccess, .stError, .stWarning, .stInfo {
+            border-radius: 12px;
+            padding: 1.2rem;
+            font-weight: 600;
+            border-left: 5px solid;
+        }
     
-    /* 区切り線 */
-    hr {
-        margin: 3rem 0;
-        border: none;
-        height: 2px;
-        background: linear-gradient(90deg, transparent 0%, rgba(102, 126, 234, 0.3) 50%, transparent 100%);
-    }
-</style>
-""", unsafe_allow_html=True)
-
-# セッション状態の初期化
-if 'transfers' not in st.session_state:
-    st.session_state.transfers = []
-
-# タイトル
-st.title("📅 リハビリ訪問予定表")
-st.markdown("""
-<div style='text-align: center; margin: -10px 0 30px 0;'>
-    <p style='color: #7f8c8d; font-size: 1.2rem; font-weight: 500;'>
-        月次スケジュールを数クリックでPDF化 ✨
-    </p>
-</div>
-""", unsafe_allow_html=True)
-
-st.markdown("---")
-
-# カレンダー設定
-st.header("📆 カレンダー設定")
-col1, col2 = st.columns(2)
-
-with col1:
-    year = st.selectbox(
-        "年",
-        options=[2024, 2025, 2026, 2027, 2028],
-        index=1
-    )
+        /* 区切り線 */
+        hr {
+            margin: 3rem 0;
+            border: none;
+            height: 2px;
+            background: linear-gradient(90deg, transparent 0%, rgba(102, 126, 234, 0.3) 50%, transparent 100%);
+        }
+    </style>
+    """, unsafe_allow_html=True)
 
-with col2:
-    month = st.selectbox(
-        "月",
-        options=list(range(1, 13)),
-        index=datetime.now().month - 1
-    )
+    # セッション状態の初期化
+    if 'transfers' not in st.session_state:
+        st.session_state.transfers = []
 
-st.markdown("---")
-
-# 定期訪問設定セクション
-st.header("📅 定期訪問設定")
-st.markdown("""
-<div style='background: linear-gradient(145deg, #e8f5e9 0%, #ffffff 100%);
-            padding: 2rem;
-            border-radius: 20px;
-            box-shadow: 0 8px 30px rgba(0,0,0,0.06);
-            margin: 2rem 0;
-            border: 1px solid rgba(76, 175, 80, 0.2);'>
-    <p style='color: #2e7d32; font-size: 0.95rem; font-weight: 600; margin: 0; text-align: center;'>
-        💡 毎週の定期訪問日と時間を設定してください
-    </p>
-</div>
-""", unsafe_allow_html=True)
-
-# 訪問日1
-st.markdown("<p style='font-weight:700; color:#2c3e50; font-size:1.1rem; margin-bottom:0.5rem;'>🔹 定期訪問日 1</p>", unsafe_allow_html=True)
-
-col_v1_day, col_v1_time = st.columns([1, 2])
-
-with col_v1_day:
-    visit1_weekday = st.selectbox(
-        "曜日",
-        options=['月曜日', '火曜日', '水曜日', '木曜日', '金曜日'],
-        index=0,  # デフォルト: 月曜日
-        key="visit1_weekday"
-    )
+    # 定期訪問の初期値（保存した利用者の読み込みで書き換えるので、indexではなくセッション状態で持つ）
+    for key, value in {
+        'visit1_weekday': '月曜日', 'visit1_start_hour': 11, 'visit1_start_min': 20, 'visit1_duration': 40,
+        'visit2_weekday': '水曜日', 'visit2_start_hour': 11, 'visit2_start_min': 0, 'visit2_duration': 40,
+    }.items():
+        st.session_state.setdefault(key, value)
 
-with col_v1_time:
-    v1_col1, v1_col2, v1_col3 = st.columns(3)
-    
-    with v1_col1:
-        visit1_start_hour = st.selectbox(
-            "開始時",
-            options=list(range(9, 18)),
-            index=2,  # デフォルト: 11時
-            format_func=lambda x: f"{x}時",
-            key="visit1_start_hour"
-        )
-    
-    with v1_col2:
-        visit1_start_min = st.selectbox(
-            "開始分",
-            options=list(range(0, 60, 5)),
-            index=4,  # デフォルト: 20分
-            format_func=lambda x: f"{x:02d}分",
-            key="visit1_start_min"
-        )
-    
-    with v1_col3:
-        visit1_duration = st.selectbox(
-            "訪問時間",
-            options=[40, 60],
-            index=0,  # デフォルト: 40分
-            format_func=lambda x: f"{x}分",
-            key="visit1_duration"
-        )
+    # 振替の時間の初期値（振替先の候補ボタンからも書き換えるので、indexではなくセッション状態で持つ）
+    st.session_state.setdefault('start_hour', 11)
+    st.session_state.setdefault('start_min', 20)
+    st.session_state.setdefault('duration', 40)
 
-# 訪問日1の終了時刻計算
-v1_end_total = visit1_start_hour * 60 + visit1_start_min + visit1_duration
-v1_end_hour = v1_end_total // 60
-v1_end_min = v1_end_total % 60
-visit1_time = f"{visit1_start_hour}:{visit1_start_min:02d}-{v1_end_hour}:{v1_end_min:02d}"
+    # タイトル
+    st.title("📅 リハビリ訪問予定表")
+    st.markdown("""
+    <div style='text-align: center; margin: -10px 0 30px 0;'>
+        <p style='color: #7f8c8d; font-size: 1.2rem; font-weight: 500;'>
+            月次スケジュールを数クリックでPDF化 ✨
+        </p>
+    </div>
+    """, unsafe_allow_html=True)
 
-st.markdown(f"""
-<div style='background: linear-gradient(135deg, #4caf50 0%, #66bb6a 100%); 
-            padding: 0.8rem 1.5rem; 
-            border-radius: 12px; 
-            text-align: center;
-            margin: 1rem 0;'>
-    <p style='color: white; font-size: 1.1rem; font-weight: 700; margin: 0;'>
-        📌 {visit1_weekday} {visit1_time}
-    </p>
-</div>
-""", unsafe_allow_html=True)
-
-st.markdown("<br>", unsafe_allow_html=True)
-
-# 訪問日2
-st.markdown("<p style='font-weight:700; color:#2c3e50; font-size:1.1rem; margin-bottom:0.5rem;'>🔹 定期訪問日 2</p>", unsafe_allow_html=True)
-
-col_v2_day, col_v2_time = st.columns([1, 2])
-
-with col_v2_day:
-    visit2_weekday = st.selectbox(
-        "曜日",
-        options=['月曜日', '火曜日', '水曜日', '木曜日', '金曜日'],
-        index=2,  # デフォルト: 水曜日
-        key="visit2_weekday"
-    )
+    st.markdown("---")
 
-with col_v2_time:
-    v2_col1, v2_col2, v2_col3 = st.columns(3)
-    
-    with v2_col1:
-        visit2_start_hour = st.selectbox(
-            "開始時",
-            options=list(range(9, 18)),
-            index=2,  # デフォルト: 11時
-            format_func=lambda x: f"{x}時",
-            key="visit2_start_hour"
-        )
-    
-    with v2_col2:
-        visit2_start_min = st.selectbox(
-            "開始分",
-            options=list(range(0, 60, 5)),
-            index=0,  # デフォルト: 00分
-            format_func=lambda x: f"{x:02d}分",
-            key="visit2_start_min"
+    # カレンダー設定
+    st.header("📆 カレンダー設定")
+    col1, col2 = st.columns(2)
+
+    with col1:
+        year = st.selectbox(
+            "年",
+            options=YEARS,
+            index=1,
+            key="year"
         )
-    
-    with v2_col3:
-        visit2_duration = st.selectbox(
-            "訪問時間",
-            options=[40, 60],
-            index=0,  # デフォルト: 40分
-            format_func=lambda x: f"{x}分",
-            key="visit2_duration"
+
+    with col2:
+        month = st.selectbox(
+            "月",
+            options=list(range(1, 13)),
+            index=datetime.now().month - 1,
+            key="month"
         )
 
-# 訪問日2の終了時刻計算
-v2_end_total = visit2_start_hour * 60 + visit2_start_min + visit2_duration
-v2_end_hour = v2_end_total // 60
-v2_end_min = v2_end_total % 60
-visit2_time = f"{visit2_start_hour}:{visit2_start_min:02d}-{v2_end_hour}:{v2_end_min:02d}"
+    st.text_input(
+        "利用者名（任意）",
+        key="patient_name",
+        placeholder="例: 山田 太郎",
+        help="入力すると定期訪問と振替が保存され、次回は利用者名を入力するだけで読み込まれます"
+    )
+    load_patient(year, month)
+    # 年月を変えても振替は残るので、この月にない日付（31日など）の振替は外す
+    num_days = calendar.monthrange(year, month)[1]
+    if any(max(from_day, to_day) > num_days for from_day, to_day, _ in st.session_state.transfers):
+        st.session_state.transfers = [t for t in st.session_state.transfers if max(t[0], t[1]) <= num_days]
 
-st.markdown(f"""
-<div style='background: linear-gradient(135deg, #4caf50 0%, #66bb6a 100%); 
-            padding: 0.8rem 1.5rem; 
-            border-radius: 12px; 
-            text-align: center;
-            margin: 1rem 0;'>
-    <p style='color: white; font-size: 1.1rem; font-weight: 700; margin: 0;'>
-        📌 {visit2_weekday} {visit2_time}
-    </p>
-</div>
-""", unsafe_allow_html=True)
-
-st.markdown("---")
-
-# 振替設定セクション
-st.header("🔄 振替設定")
-
-# スタイリッシュなカードデザイン
-st.markdown("""
-<div style='background: linear-gradient(145deg, #f8f9fa 0%, #ffffff 100%);
-            padding: 2.5rem 2rem;
-            border-radius: 20px;
-            box-shadow: 0 8px 30px rgba(0,0,0,0.06);
-            margin: 2rem 0;
-            border: 1px solid rgba(102, 126, 234, 0.08);'>
-    <p style='color: #7f8c8d; font-size: 0.95rem; font-weight: 600; margin: 0 0 1.5rem 0; text-align: center;'>
-        💡 振替がない場合は、このセクションをスキップして「PDFを作成」ボタンへ
-    </p>
-</div>
-""", unsafe_allow_html=True)
-
-# 関数定義
-def get_visit_days(year, month, weekday_name):
-    """指定した曜日の日付リストを取得"""
-    weekday_map = {
-        '月曜日': 1, '火曜日': 2, '水曜日': 3,
-        '木曜日': 4, '金曜日': 5
-    }
-    
-    weekday_num = weekday_map[weekday_name]
+    st.markdown("---")
+
+    # 定期訪問設定セクション
+    st.header("📅 定期訪問設定")
+    st.markdown("""
+    <div style='background: linear-gradient(145deg, #e8f5e9 0%, #ffffff 100%);
+                padding: 2rem;
+                border-radius: 20px;
+                box-shadow: 0 8px 30px rgba(0,0,0,0.06);
+                margin: 2rem 0;
+                border: 1px solid rgba(76, 175, 80, 0.2);'>
+        <p style='color: #2e7d32; font-size: 0.95rem; font-weight: 600; margin: 0; text-align: center;'>
+            💡 毎週の定期訪問日と時間を設定してください
+        </p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    def visit_slot_inputs():
+        """定期訪問日1・2の入力"""
+        # 訪問日1
+        st.markdown("<p style='font-weight:700; color:#2c3e50; font-size:1.1rem; margin-bottom:0.5rem;'>🔹 定期訪問日 1</p>", unsafe_allow_html=True)
+
+        col_v1_day, col_v1_time = st.columns([1, 2])
+
+        with col_v1_day:
+            visit1_weekday = st.selectbox(
+                "曜日",
+                options=WEEKDAY_NAMES,
+                key="visit1_weekday"
+            )
+
+        with col_v1_time:
+            v1_col1, v1_col2, v1_col3 = st.columns(3)
     
-    calendar.setfirstweekday(6)  # 日曜始まり
-    cal = calendar.monthcalendar(year, month)
-    days = []
+            with v1_col1:
+                visit1_start_hour = st.selectbox(
+                    "開始時",
+                    options=list(range(9, 18)),
+                    format_func=lambda x: f"{x}時",
+                    key="visit1_start_hour"
+                )
     
-    for week in cal:
-        if week[weekday_num] != 0:
-            days.append(week[weekday_num])
+            with v1_col2:
+                visit1_start_min = st.selectbox(
+                    "開始分",
+                    options=list(range(0, 60, 5)),
+                    format_func=lambda x: f"{x:02d}分",
+                    key="visit1_start_min"
+                )
     
-    return sorted(days)
+            with v1_col3:
+                visit1_duration = st.selectbox(
+                    "訪問時間",
+                    options=[40, 60],
+                    format_func=lambda x: f"{x}分",
+                    key="visit1_duration"
+                )
+
+        # 訪問日1の終了時刻計算
+        visit1_time = format_time_range(visit1_start_hour, visit1_start_min, visit1_duration)
 
-def get_weekdays_in_same_week(year, month, day):
-    from datetime import date, timedelta
+        st.markdown(f"""
+        <div style='background: linear-gradient(135deg, #4caf50 0%, #66bb6a 100%); 
+                    padding: 0.8rem 1.5rem; 
+                    border-radius: 12px; 
+                    text-align: center;
+                    margin: 1rem 0;'>
+            <p style='color: white; font-size: 1.1rem; font-weight: 700; margin: 0;'>
+                📌 {visit1_weekday} {visit1_time}
+            </p>
+        </div>
+        """, unsafe_allow_html=True)
+
+        st.markdown("<br>", unsafe_allow_html=True)
+
+        # 訪問日2
+        st.markdown("<p style='font-weight:700; color:#2c3e50; font-size:1.1rem; margin-bottom:0.5rem;'>🔹 定期訪問日 2</p>", unsafe_allow_html=True)
+
+        col_v2_day, col_v2_time = st.columns([1, 2])
+
+        with col_v2_day:
+            visit2_weekday = st.selectbox(
+                "曜日",
+                options=WEEKDAY_NAMES,
+                key="visit2_weekday"
+            )
+
+        with col_v2_time:
+            v2_col1, v2_col2, v2_col3 = st.columns(3)
     
-    target_date = date(year, month, day)
-    weekday = target_date.weekday()
-    monday = target_date - timedelta(days=weekday)
+            with v2_col1:
+                visit2_start_hour = st.selectbox(
+                    "開始時",
+                    options=list(range(9, 18)),
+                    format_func=lambda x: f"{x}時",
+                    key="visit2_start_hour"
+                )
     
-    weekdays = []
-    for i in range(5):
-        d = monday + timedelta(days=i)
-        if d.month == month and d.day != day:
-            weekdays.append(d.day)
+            with v2_col2:
+                visit2_start_min = st.selectbox(
+                    "開始分",
+                    options=list(range(0, 60, 5)),
+                    format_func=lambda x: f"{x:02d}分",
+                    key="visit2_start_min"
+                )
     
-    return sorted(weekdays)
-
-# 定期訪問日1と訪問日2の日付を取得
-visit1_days = get_visit_days(year, month, visit1_weekday)
-visit2_days = get_visit_days(year, month, visit2_weekday)
-
-# 振替元の選択肢（定期訪問日を合わせたもの）
-transfer_options = sorted(visit1_days + visit2_days)
-
-# グリッドレイアウト
-col1, col2 = st.columns([1, 1])
-
-with col1:
-    st.markdown("<p style='font-weight:700; color:#2c3e50; font-size:1.05rem; margin-bottom:0.5rem;'>振替元（訪問日）</p>", unsafe_allow_html=True)
-    if transfer_options:
-        transfer_from = st.selectbox(
-            "振替元を選択",
-            options=transfer_options,
-            format_func=lambda x: f"{x}日",
-            key="transfer_from_select",
-            label_visibility="collapsed"
-        )
-    else:
-        st.warning("⚠️ 訪問日がありません")
-        transfer_from = None
+            with v2_col3:
+                visit2_duration = st.selectbox(
+                    "訪問時間",
+                    options=[40, 60],
+                    format_func=lambda x: f"{x}分",
+                    key="visit2_duration"
+                )
 
-with col2:
-    st.markdown("<p style='font-weight:700; color:#2c3e50; font-size:1.05rem; margin-bottom:0.5rem;'>振替先（平日）</p>", unsafe_allow_html=True)
-    if transfer_from:
-        weekday_options = get_weekdays_in_same_week(year, month, transfer_from)
-        
-        if weekday_options:
-            transfer_to = st.selectbox(
-                "振替先を選択",
-                options=weekday_options,
-                format_func=lambda x: f"{x}日 ({['月','火','水','木','金','土','日'][calendar.weekday(year, month, x)]})",
-                key="transfer_to_select",
-                label_visibility="collapsed"
-            )
-        else:
-            st.warning("⚠️ 振替可能な日がありません")
-            transfer_to = None
-    else:
-        st.info("👆 まず振替元を選択してください")
-        transfer_to = None
-
-# 時間設定
-st.markdown("<br>", unsafe_allow_html=True)
-st.markdown("<p style='font-weight:700; color:#2c3e50; font-size:1.05rem; margin-bottom:0.8rem;'>⏰ 時間設定</p>", unsafe_allow_html=True)
-
-time_col1, time_col2, time_col3 = st.columns(3)
-
-with time_col1:
-    start_hour = st.selectbox(
-        "開始時",
-        options=list(range(9, 18)),
-        index=2,
-        format_func=lambda x: f"{x}時",
-        key="start_hour"
-    )
+        # 訪問日2の終了時刻計算
+        visit2_time = format_time_range(visit2_start_hour, visit2_start_min, visit2_duration)
 
-with time_col2:
-    start_min = st.selectbox(
-        "開始分",
-        options=list(range(0, 60, 5)),
-        index=4,
-        format_func=lambda x: f"{x:02d}分",
-        key="start_min"
-    )
+        st.markdown(f"""
+        <div style='background: linear-gradient(135deg, #4caf50 0%, #66bb6a 100%); 
+                    padding: 0.8rem 1.5rem; 
+                    border-radius: 12px; 
+                    text-align: center;
+                    margin: 1rem 0;'>
+            <p style='color: white; font-size: 1.1rem; font-weight: 700; margin: 0;'>
+                📌 {visit2_weekday} {visit2_time}
+            </p>
+        </div>
+        """, unsafe_allow_html=True)
 
-with time_col3:
-    duration = st.selectbox(
-        "訪問時間",
-        options=[40, 60],
-        index=0,
-        format_func=lambda x: f"{x}分",
-        key="duration"
-    )
+        save_patient(st.session_state.year, st.session_state.month)
 
-# 終了時刻計算
-start_total_min = start_hour * 60 + start_min
-end_total_min = start_total_min + duration
-end_hour = end_total_min // 60
-end_min = end_total_min % 60
-
-# 時間表示（超スタイリッシュ）
-st.markdown(f"""
-<div style='background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
-            padding: 1.5rem 2rem; 
-            border-radius: 16px; 
-            text-align: center;
-            margin: 1.5rem 0;
-            box-shadow: 0 10px 30px rgba(102, 126, 234, 0.3);
-            border: 3px solid rgba(255,255,255,0.4);
-            position: relative;
-            overflow: hidden;'>
-    <div style='position: absolute; top: 0; left: 0; right: 0; bottom: 0; 
-                background: radial-gradient(circle at top right, rgba(255,255,255,0.1), transparent);'>
-    </div>
-    <p style='color: white; font-size: 2rem; font-weight: 900; margin: 0; 
-              letter-spacing: 2px; position: relative; z-index: 1;'>
-        {start_hour}:{start_min:02d} ～ {end_hour}:{end_min:02d}
-    </p>
-    <p style='color: rgba(255,255,255,0.95); font-size: 1.1rem; margin: 0.5rem 0 0 0; 
-              font-weight: 700; position: relative; z-index: 1;'>
-        📋 訪問時間: {duration}分
-    </p>
-</div>
-""", unsafe_allow_html=True)
-
-# バリデーション
-transfer_time = f"{start_hour}:{start_min:02d}-{end_hour}:{end_min:02d}"
-time_valid = not (end_hour > 17 or (end_hour == 17 and end_min > 30))
-
-if not time_valid:
-    st.error("⚠️ 終了時刻が定時（17:30）を超えています")
-
-st.markdown("<br>", unsafe_allow_html=True)
-
-# ボタン
-col_btn1, col_btn2 = st.columns(2)
-
-with col_btn1:
-    if st.button("➕ 振替を追加", use_container_width=True, type="primary"):
-        if transfer_from is None or transfer_to is None:
-            st.error("❌ 振替元と振替先を選択してください")
-        elif not time_valid:
-            st.error("❌ 終了時刻が定時を超えています")
-        else:
-            if any(t[0] == transfer_from for t in st.session_state.transfers):
-                st.warning("⚠️ この日付の振替は既に登録されています")
-            else:
-                st.session_state.transfers.append((transfer_from, transfer_to, transfer_time))
-                st.success(f"✅ {transfer_from}日 → {transfer_to}日を追加しました")
-                st.rerun()
+    @timed_fragment
+    def transfer_editor(year, month):
+        """振替の入力・一覧（追加・削除してもこの部分だけ再実行）"""
+        # 振替元の選択肢（定期訪問日を合わせたもの）
+        weekdays = tuple(slot['weekday'] for slot in current_visit_slots())
+        transfer_options = get_transfer_options(year, month, weekdays)
 
-with col_btn2:
-    if st.button("🗑️ 全てクリア", use_container_width=True):
-        st.session_state.transfers = []
-        st.rerun()
+        # グリッドレイアウト
+        col1, col2 = st.columns([1, 1])
 
-# 登録された振替
-st.markdown("<br>", unsafe_allow_html=True)
+        with col1:
+            st.markdown("<p style='font-weight:700; color:#2c3e50; font-size:1.05rem; margin-bottom:0.5rem;'>振替元（訪問日）</p>", unsafe_allow_html=True)
+            if transfer_options:
+                transfer_from = st.selectbox(
+                    "振替元を選択",
+                    options=transfer_options,
+                    # 祝日は自動でお休みになっている（振替先だけ選べばよい）
+                    format_func=lambda x: f"{x}日（{holiday_name(year, month, x)}・お休み）"
+                    if holiday_name(year, month, x) else f"{x}日",
+                    key="transfer_from_select",
+                    label_visibility="collapsed"
+                )
+            else:
+                st.warning("⚠️ 訪問日がありません")
+                transfer_from = None
 
-if st.session_state.transfers:
-    st.markdown("<p style='font-weight:700; color:#2c3e50; font-size:1.1rem; margin-bottom:1rem;'>📋 登録された振替</p>", unsafe_allow_html=True)
-    for i, (from_day, to_day, time) in enumerate(st.session_state.transfers, 1):
-        from_weekday = ['月','火','水','木','金','土','日'][calendar.weekday(year, month, from_day)]
-        to_weekday = ['月','火','水','木','金','土','日'][calendar.weekday(year, month, to_day)]
+        with col2:
+            st.markdown("<p style='font-weight:700; color:#2c3e50; font-size:1.05rem; margin-bottom:0.5rem;'>振替先（平日）</p>", unsafe_allow_html=True)
+            if transfer_from:
+                weekday_options = get_weekdays_in_same_week(year, month, transfer_from)
         
-        col_info, col_del = st.columns([8.5, 1.5])
-        with col_info:
-            st.markdown(f"""
-            <div style='background: white;
-                        padding: 1.2rem 1.5rem; 
-                        border-radius: 14px; 
-                        border-left: 6px solid;
-                        border-image: linear-gradient(180deg, #667eea 0%, #764ba2 100%) 1;
-                        margin-bottom: 0.8rem;
-                        box-shadow: 0 3px 10px rgba(0,0,0,0.08);
-                        transition: all 0.3s ease;'>
-                <span style='font-size: 1.1rem; font-weight: 800; color: #2c3e50;'>
-                    {i}. {from_day}日({from_weekday}) <span style='color: #667eea; font-size: 1.3rem;'>→</span> {to_day}日({to_weekday})
-                </span>
-                <span style='color: #7f8c8d; margin-left: 1.5rem; font-weight: 600; font-size: 1rem;'>
-                    🕐 {time}
-                </span>
+                if weekday_options:
+                    transfer_to = st.selectbox(
+                        "振替先を選択",
+                        options=weekday_options,
+                        format_func=lambda x: f"{x}日 ({weekday_short(year, month, x)})",
+                        key="transfer_to_select",
+                        label_visibility="collapsed"
+                    )
+                else:
+                    st.warning("⚠️ 振替可能な日がありません")
+                    transfer_to = None
+            else:
+                st.info("👆 まず振替元を選択してください")
+                transfer_to = None
+
+        # 振替先の候補（同じ週の平日・定時内で、担当者の予定が空いている時間）
+        if transfer_from:
+            suggestions = makeup_suggestions(year, month, transfer_from)
+            if suggestions:
+                st.markdown("<p style='font-weight:700; color:#2c3e50; font-size:1.05rem; margin:1rem 0 0.5rem 0;'>💡 振替先の候補</p>", unsafe_allow_html=True)
+                for column, suggestion in zip(st.columns(len(suggestions)), suggestions):
+                    with column:
+                        st.button(
+                            f"{suggestion.day}日({weekday_short(year, month, suggestion.day)}) {suggestion.time}",
+                            key=f"suggestion_{suggestion.day}_{suggestion.start}",
+                            on_click=apply_suggestion, args=(suggestion,),
+                            use_container_width=True
+                        )
+
+        # 時間設定
+        st.markdown("<br>", unsafe_allow_html=True)
+        st.markdown("<p style='font-weight:700; color:#2c3e50; font-size:1.05rem; margin-bottom:0.8rem;'>⏰ 時間設定</p>", unsafe_allow_html=True)
+
+        time_col1, time_col2, time_col3 = st.columns(3)
+
+        with time_col1:
+            start_hour = st.selectbox(
+                "開始時",
+                options=list(range(9, 18)),
+                format_func=lambda x: f"{x}時",
+                key="start_hour"
+            )
+
+        with time_col2:
+            start_min = st.selectbox(
+                "開始分",
+                options=list(range(0, 60, 5)),
+                format_func=lambda x: f"{x:02d}分",
+                key="start_min"
+            )
+
+        with time_col3:
+            duration = st.selectbox(
+                "訪問時間",
+                options=[40, 60],
+                format_func=lambda x: f"{x}分",
+                key="duration"
+            )
+
+        # 終了時刻計算
+        end_hour, end_min = end_time(start_hour, start_min, duration)
+
+        # 時間表示（超スタイリッシュ）
+        st.markdown(f"""
+        <div style='background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
+                    padding: 1.5rem 2rem; 
+                    border-radius: 16px; 
+                    text-align: center;
+                    margin: 1.5rem 0;
+                    box-shadow: 0 10px 30px rgba(102, 126, 234, 0.3);
+                    border: 3px solid rgba(255,255,255,0.4);
+                    position: relative;
+                    overflow: hidden;'>
+            <div style='position: absolute; top: 0; left: 0; right: 0; bottom: 0; 
+                        background: radial-gradient(circle at top right, rgba(255,255,255,0.1), transparent);'>
             </div>
-            """, unsafe_allow_html=True)
-        with col_del:
-            st.markdown("<br>", unsafe_allow_html=True)
-            if st.button("🗑️", key=f"del_{i}", help="削除", use_container_width=True):
-                st.session_state.transfers.pop(i-1)
-                st.rerun()
-else:
-    st.markdown("<p style='color: #95a5a6; font-style: italic; text-align: center; padding: 2rem; background: #f8f9fa; border-radius: 12px;'>振替なし</p>", unsafe_allow_html=True)
-
-st.markdown("---")
-
-# PDF作成関数
-def create_pdf(year, month, transfers_list, visit1_config, visit2_config):
-    """
-    visit1_config = {'weekday': '月曜日', 'time': '11:20-12:00', 'days': [3, 10, 17, 24]}
-    visit2_config = {'weekday': '水曜日', 'time': '11:00-11:40', 'days': [5, 12, 19, 26]}
-    """
-    calendar.setfirstweekday(6)  # 日曜始まり
-    cal = calendar.monthcalendar(year, month)
-    
-    canceled_dates = [t[0] for t in transfers_list]
-    makeup_visits = {t[1]: t[2] for t in transfers_list}
-    
-    # 休みを除いた訪問日リスト
-    visit1_actual_days = [d for d in visit1_config['days'] if d not in canceled_dates]
-    visit2_actual_days = [d for d in visit2_config['days'] if d not in canceled_dates]
-    
-    pdf_buffer = io.BytesIO()
-    
-    with PdfPages(pdf_buffer) as pdf:
-        fig, ax = plt.subplots(figsize=(11.7, 8.3))
-        ax.set_xlim(0, 7)
-        ax.set_ylim(0, len(cal) + 3.5)
-        ax.axis('off')
-        
-        # タイトル
-        title = f"{year}年{month}月 リハビリ訪問予定表"
-        ax.text(3.5, len(cal) + 3, title, ha='center', va='center', 
-                fontsize=24, fontweight='bold')
-        
-        # 通常の訪問時間
-        ax.text(0.2, len(cal) + 2.3, "【通常の訪問時間】", ha='left', va='center',
-               fontsize=12, fontweight='bold')
-        ax.text(0.4, len(cal) + 1.95, f"・{visit1_config['weekday']}：{visit1_config['time']}", ha='left', va='center',
-               fontsize=11)
-        ax.text(0.4, len(cal) + 1.65, f"・{visit2_config['weekday']}：{visit2_config['time']}", ha='left', va='center',
-               fontsize=11)
+            <p style='color: white; font-size: 2rem; font-weight: 900; margin: 0; 
+                      letter-spacing: 2px; position: relative; z-index: 1;'>
+                {start_hour}:{start_min:02d} ～ {end_hour}:{end_min:02d}
+            </p>
+            <p style='color: rgba(255,255,255,0.95); font-size: 1.1rem; margin: 0.5rem 0 0 0; 
+                      font-weight: 700; position: relative; z-index: 1;'>
+                📋 訪問時間: {duration}分
+            </p>
+        </div>
+        """, unsafe_allow_html=True)
+
+        # バリデーション
+        transfer_time = format_time_range(start_hour, start_min, duration)
+        time_valid = is_within_hours(start_hour, start_min, duration)
+
+        if not time_valid:
+            st.error("⚠️ 終了時刻が定時（17:30）を超えています")
+
+        # ケースロードのほかの利用者の訪問との重なり
+        caseload = current_caseload(year, month)
+        if caseload is not None:
+            _, index, therapist, patient = caseload
+            if transfer_to is not None:
+                clashes = index.overlapping(therapist, transfer_to, *parse_time_range(transfer_time), exclude_patient=patient)
+                if clashes:
+                    st.warning("⚠️ 振替先の時間がほかの訪問と重なっています: " + "、".join(map(format_visit, clashes)))
+            schedule = resolve_month(year, month, current_visit_slots(), st.session_state.transfers)
+            booked = [
+                clash for visit in month_visits(schedule, patient, therapist)
+                for clash in index.overlapping(therapist, visit.day, visit.start, visit.end, exclude_patient=patient)
+            ]
+            if booked:
+                st.warning("⚠️ この利用者の訪問がほかの訪問と重なっています:\n" + "\n".join(
+                    f"- {format_visit(clash)}" for clash in booked))
+
+        st.markdown("<br>", unsafe_allow_html=True)
+
+        # ボタン
+        col_btn1, col_btn2 = st.columns(2)
+
+        with col_btn1:
+            if st.button("➕ 振替を追加", use_container_width=True, type="primary"):
+                if transfer_from is None or transfer_to is None:
+                    st.error("❌ 振替元と振替先を選択してください")
+                elif not time_valid:
+                    st.error("❌ 終了時刻が定時を超えています")
+                else:
+                    if any(t[0] == transfer_from for t in st.session_state.transfers):
+                        st.warning("⚠️ この日付の振替は既に登録されています")
+                    else:
+                        st.session_state.transfers.append((transfer_from, transfer_to, transfer_time))
+                        st.success(f"✅ {transfer_from}日 → {transfer_to}日を追加しました")
+                        rerun_fragment()
+
+        with col_btn2:
+            if st.button("🗑️ 全てクリア", use_container_width=True):
+                st.session_state.transfers = []
+                rerun_fragment()
+
+        # 登録された振替
+        st.markdown("<br>", unsafe_allow_html=True)
+
+        if st.session_state.transfers:
+            st.markdown("<p style='font-weight:700; color:#2c3e50; font-size:1.1rem; margin-bottom:1rem;'>📋 登録された振替</p>", unsafe_allow_html=True)
+            for i, (from_day, to_day, time) in enumerate(st.session_state.transfers, 1):
+                from_weekday = weekday_short(year, month, from_day)
+                to_weekday = weekday_short(year, month, to_day)
         
-        # 振替予定
-        if transfers_list:
-            ax.text(0.2, len(cal) + 1.2, "【振替予定】", ha='left', va='center',
-                   fontsize=12, fontweight='bold', color='red')
-            
-            y_offset = len(cal) + 0.9
-            for from_day, to_day, time in transfers_list:
-                from_weekday = ['月','火','水','木','金','土','日'][calendar.weekday(year, month, from_day)]
-                to_weekday = ['月','火','水','木','金','土','日'][calendar.weekday(year, month, to_day)]
-                
-                text = f"{month}月{from_day}日({from_weekday}) → {month}月{to_day}日({to_weekday}) {time}"
-                ax.text(0.5, y_offset, text, ha='left', va='center',
-                       fontsize=11, color='red', fontweight='bold')
-                y_offset -= 0.25
+                col_info, col_del = st.columns([8.5, 1.5])
+                with col_info:
+                    st.markdown(f"""
+                    <div style='background: white;
+                                padding: 1.2rem 1.5rem; 
+                                border-radius: 14px; 
+                                border-left: 6px solid;
+                                border-image: linear-gradient(180deg, #667eea 0%, #764ba2 100%) 1;
+                                margin-bottom: 0.8rem;
+                                box-shadow: 0 3px 10px rgba(0,0,0,0.08);
+                                transition: all 0.3s ease;'>
+                        <span style='font-size: 1.1rem; font-weight: 800; color: #2c3e50;'>
+                            {i}. {from_day}日({from_weekday}) <span style='color: #667eea; font-size: 1.3rem;'>→</span> {to_day}日({to_weekday})
+                        </span>
+                        <span style='color: #7f8c8d; margin-left: 1.5rem; font-weight: 600; font-size: 1rem;'>
+                            🕐 {time}
+                        </span>
+                    </div>
+                    """, unsafe_allow_html=True)
+                with col_del:
+                    st.markdown("<br>", unsafe_allow_html=True)
+                    if st.button("🗑️", key=f"del_{i}", help="削除", use_container_width=True):
+                        st.session_state.transfers.pop(i-1)
+                        rerun_fragment()
+        else:
+            st.markdown("<p style='color: #95a5a6; font-style: italic; text-align: center; padding: 2rem; background: #f8f9fa; border-radius: 12px;'>振替なし</p>", unsafe_allow_html=True)
+
+        # プレビュー（PDFと同じ描画処理でSVGに描く。matplotlibを使わないので数ミリ秒）
+        with st.expander("👀 プレビュー", expanded=True):
+            preview = resolve_month(year, month, current_visit_slots(), st.session_state.transfers)
+            st.markdown(f"<div style='border-radius: 12px; overflow: hidden; box-shadow: 0 3px 10px rgba(0,0,0,0.08);'>"
+                        f"{render_svg(preview)}</div>", unsafe_allow_html=True)
+
+        save_patient(year, month)
+
+    with st.expander("👥 ケースロードとの重なりチェック"):
+        st.caption("ケースロードのCSVかExcel（batch.pyと同じ列。担当者が複数なら therapist 列）を読み込むと、"
+                   "同じ担当者のほかの利用者の訪問と時間が重なっていないかを確認します。"
+                   "読み込まない場合は、利用者名を入力していればデータベースに保存された利用者と比べます")
+        caseload_file = st.file_uploader("ケースロード（CSV・Excel）", type=["csv", "xlsx"], key="caseload_csv")
+        caseload_patients = None
+        if caseload_file is not None:
+            try:
+                caseload_patients, caseload_errors = load_caseload(caseload_file.getvalue(), year, month)
+            except ValueError as e:
+                st.error(f"ケースロードを読み込めません: {e}")
+        if caseload_patients is not None:
+            if caseload_errors:
+                st.warning(f"⚠️ {len({e['row'] for e in caseload_errors})}行にエラーがあります。"
+                           "エラーのある行の利用者は読み込んでいません")
+                st.dataframe(
+                    [{'行': e['row'], '利用者': e['patient'], '列': e['column'], '内容': e['message']}
+                     for e in caseload_errors],
+                    use_container_width=True, hide_index=True
+                )
+            _, caseload_index = get_conflict_index(caseload_file.getvalue(), year, month)
+            therapists = sorted({p['therapist'] for p in caseload_patients})
+            if len(therapists) > 1:
+                st.selectbox("担当者", options=therapists, key="caseload_therapist")
+            else:
+                st.session_state.caseload_therapist = therapists[0] if therapists else ''
+            st.selectbox(
+                "この予定表の利用者（ケースロード内の本人の予定は比較しない）",
+                options=[None] + [p['patient'] for p in caseload_patients
+                                  if p['therapist'] == st.session_state.caseload_therapist],
+                format_func=lambda name: "（ケースロードにない利用者）" if name is None else name,
+                key="caseload_patient"
+            )
+            st.caption(f"{len(caseload_patients)}人・{caseload_index.size}件の訪問を読み込みました")
+            st.download_button(
+                label=f"📦 {len(caseload_patients)}人分のPDFをZIPでダウンロード",
+                data=functools.partial(caseload_zip, caseload_patients, year, month),
+                file_name=f"{year}年{month}月_リハビリ訪問予定表.zip",
+                mime="application/zip",
+                on_click="ignore",
+                use_container_width=True
+            )
+            if st.button("💾 ケースロードをデータベースに保存（この月の振替も上書き）", use_container_width=True):
+                get_store().save_patients(caseload_patients, year, month)
+                st.success(f"✅ {len(caseload_patients)}人分を保存しました")
+
+    # PDF作成ボタン
+    @timed_fragment
+    def pdf_section(year, month):
+        """PDFの作成・ダウンロード（ボタンを押してもこの部分だけ再実行）"""
+        st.markdown("<br><br>", unsafe_allow_html=True)
+        if st.button("📥 PDFを作成", use_container_width=True, type="primary"):
+            with st.spinner("📄 PDF作成中..."):
+                # 定期訪問の設定を準備
+                visit1_config, visit2_config = current_visit_slots()
         
-        # 曜日ヘッダー
-        weekdays = ['日', '月', '火', '水', '木', '金', '土']
-        for i, day in enumerate(weekdays):
-            color = 'red' if i == 0 else 'blue' if i == 6 else 'black'
-            ax.text(i + 0.5, len(cal) + 0.3, day, ha='center', va='center',
-                   fontsize=14, fontweight='bold', color=color)
+                if st.query_params.get('profile') == '1':
+                    # プロファイル中はキャッシュを使わずに作成し、作成したスレッドでプロファイルを取る
+                    pdf_buffer, visit1_actual, visit2_actual, canceled_dates = get_render_pool().run(
+                        profiling.profiled(create_pdf, 'pdf'), year, month, st.session_state.transfers, visit1_config, visit2_config
+                    )
+                else:
+                    pdf_buffer, visit1_actual, visit2_actual, canceled_dates = get_render_pool().run(
+                        cached_create_pdf, get_render_cache(), year, month, st.session_state.transfers, visit1_config, visit2_config
+                    )
         
-        # カレンダーグリッド
-        for week_num, week in enumerate(cal):
-            y = len(cal) - week_num
-            
-            for day_num, day in enumerate(week):
-                x = day_num
-                
-                # セルの枠線
-                rect = plt.Rectangle((x, y-1), 1, 1, fill=False, 
-                                    edgecolor='black', linewidth=1.2)
-                ax.add_patch(rect)
-                
-                if day != 0:
-                    # 日付の色
-                    text_color = 'red' if day_num == 0 else 'blue' if day_num == 6 else 'black'
-                    
-                    # 日付を表示（左上）
-                    ax.text(x + 0.1, y - 0.15, str(day), ha='left', va='top',
-                           fontsize=13, fontweight='bold', color=text_color)
-                    
-                    # 訪問・振替・休みの情報
-                    # 休みの日
-                    if day in canceled_dates:
-                        ax.text(x + 0.5, y - 0.5, "リハビリ\nお休み", ha='center', va='center',
-                               fontsize=10, fontweight='bold', color='red')
-                    
-                    # 通常の訪問日
-                    elif day in visit1_actual_days:
-                        ax.text(x + 0.5, y - 0.5, f"訪問予定\n{visit1_config['time']}", ha='center', va='center',
-                               fontsize=9, fontweight='bold', color='green')
-                    
-                    elif day in visit2_actual_days:
-                        ax.text(x + 0.5, y - 0.5, f"訪問予定\n{visit2_config['time']}", ha='center', va='center',
-                               fontsize=9, fontweight='bold', color='green')
-                    
-                    # 振替訪問
-                    if day in makeup_visits:
-                        ax.text(x + 0.5, y - 0.5, f"振替訪問\n{makeup_visits[day]}", ha='center', va='center',
-                               fontsize=9, fontweight='bold', color='red')
+                st.success("✅ PDFが完成しました！")
         
-        # フッター
-        ax.text(0.2, -0.5, "※ 急な変更が生じた場合は、事前にご連絡させていただきます。", 
-               ha='left', va='center', fontsize=10)
-        ax.text(0.2, -0.75, "※ ご不明な点がございましたら、お気軽にお問い合わせください。", 
-               ha='left', va='center', fontsize=10)
+                with st.expander("📋 作成内容を確認"):
+                    st.write(f"**{visit1_config['weekday']}の訪問:** {visit1_actual}")
+                    st.write(f"**{visit2_config['weekday']}の訪問:** {visit2_actual}")
+                    if canceled_dates:
+                        st.write(f"**休みの日:** {canceled_dates}")
+                        st.write(f"**振替日:** {[t[1] for t in st.session_state.transfers]}")
         
-        plt.tight_layout()
-        pdf.savefig(fig, bbox_inches='tight', pad_inches=0.5)
-        plt.close()
+                st.download_button(
+                    label="📥 PDFをダウンロード",
+                    data=pdf_buffer,
+                    file_name=f"{year}年{month}月_リハビリ訪問予定表.pdf",
+                    mime="application/pdf",
+                    use_container_width=True
+                )
     
-    pdf_buffer.seek(0)
-    return pdf_buffer, visit1_actual_days, visit2_actual_days, canceled_dates
-
-# PDF作成ボタン
-st.markdown("<br><br>", unsafe_allow_html=True)
-if st.button("📥 PDFを作成", use_container_width=True, type="primary"):
-    with st.spinner("📄 PDF作成中..."):
-        # 定期訪問の設定を準備
-        visit1_config = {
-            'weekday': visit1_weekday,
-            'time': visit1_time,
-            'days': visit1_days
-        }
-        visit2_config = {
-            'weekday': visit2_weekday,
-            'time': visit2_time,
-            'days': visit2_days
-        }
-        
-        pdf_buffer, visit1_actual, visit2_actual, canceled_dates = create_pdf(
-            year, month, st.session_state.transfers, visit1_config, visit2_config
-        )
-        
-        st.success("✅ PDFが完成しました！")
-        
-        with st.expander("📋 作成内容を確認"):
-            st.write(f"**{visit1_weekday}の訪問:** {visit1_actual}")
-            st.write(f"**{visit2_weekday}の訪問:** {visit2_actual}")
-            if canceled_dates:
-                st.write(f"**休みの日:** {canceled_dates}")
-                st.write(f"**振替日:** {[t[1] for t in st.session_state.transfers]}")
+        # 複数月をまとめて作成
+        with st.expander("🗓️ 複数月をまとめて作成（四半期・1年分など）"):
+            st.caption("定期訪問は各月に展開され、振替はカレンダー設定で選んでいる月にだけ反映されます")
+            range_col1, range_col2 = st.columns(2)
+            with range_col1:
+                start_index = st.selectbox(
+                    "開始月",
+                    options=range(len(RANGE_MONTHS)),
+                    index=RANGE_MONTHS.index((year, month)),
+                    format_func=lambda i: f"{RANGE_MONTHS[i][0]}年{RANGE_MONTHS[i][1]}月",
+                    key="range_start"
+                )
+            with range_col2:
+                end_index = st.selectbox(
+                    "終了月",
+                    options=range(len(RANGE_MONTHS)),
+                    index=min(RANGE_MONTHS.index((year, month)) + 11, len(RANGE_MONTHS) - 1),
+                    format_func=lambda i: f"{RANGE_MONTHS[i][0]}年{RANGE_MONTHS[i][1]}月",
+                    key="range_end"
+                )
         
-        st.download_button(
-            label="📥 PDFをダウンロード",
-            data=pdf_buffer,
-            file_name=f"{year}年{month}月_リハビリ訪問予定表.pdf",
-            mime="application/pdf",
-            use_container_width=True
-        )
+            if end_index < start_index:
+                st.error("⚠️ 終了月は開始月より後にしてください")
+            elif st.button("📥 期間のPDFを作成", use_container_width=True):
+                months = RANGE_MONTHS[start_index:end_index + 1]
+                with st.spinner(f"📄 {len(months)}か月分のPDFを作成中..."):
+                    pdf_buffer = io.BytesIO()
+                    start = time.perf_counter()
+                    timings = get_render_pool().run(
+                        render_months, pdf_buffer,
+                        resolve_months(months, current_visit_slots(), {(year, month): st.session_state.transfers})
+                    )
+                    total = time.perf_counter() - start
+            
+                st.success(f"✅ {len(months)}か月分のPDFが完成しました！（合計 {total:.2f}秒）")
+                st.dataframe(
+                    [{'月': f"{t['year']}年{t['month']}月",
+                      '描画(秒)': round(t['build'], 3),
+                      '書き出し(秒)': round(t['save'], 3)} for t in timings],
+                    use_container_width=True, hide_index=True
+                )
+                first, last = months[0], months[-1]
+                st.download_button(
+                    label="📥 PDFをダウンロード",
+                    data=pdf_buffer.getvalue(),
+                    file_name=f"{first[0]}年{first[1]}月-{last[0]}年{last[1]}月_リハビリ訪問予定表.pdf",
+                    mime="application/pdf",
+                    use_container_width=True
+                )
+            if end_index >= start_index:
+                # スマートフォンのカレンダーに取り込む用（振替訪問・お休みも入る）
+                months = RANGE_MONTHS[start_index:end_index + 1]
+                first, last = months[0], months[-1]
+                st.download_button(
+                    label="📅 カレンダー（.ics）をダウンロード",
+                    data=functools.partial(session_ics, get_script_run_ctx().session_state, months, year, month),
+                    file_name=f"{first[0]}年{first[1]}月-{last[0]}年{last[1]}月_リハビリ訪問予定.ics",
+                    mime="text/calendar",
+                    on_click="ignore",
+                    use_container_width=True
+                )
 
-st.markdown("---")
+    @timed_fragment
+    def schedule_sections(year, month):
+        """
+        定期訪問・振替・PDF作成
+        定期訪問の曜日・時間を変えると振替元の選択肢・プレビュー・PDFの内容が変わるので、この3つだけまとめて再実行する。
+        振替の編集・PDFの作成は、それぞれのフラグメントだけ再実行
+        """
+        visit_slot_inputs()
 
-# 使い方
-with st.expander("💡 使い方ガイド"):
-    st.markdown("""
-    ### 📝 基本的な流れ
-    1. **年月を選択** → カレンダー設定
-    2. **定期訪問日を設定** → 曜日と時間を選択
-    3. **振替がなければスキップ** → 直接PDF作成へ
-    4. **振替がある場合** → 振替情報を入力して追加
-    5. **PDFを作成** → ダウンロード
+        st.markdown("---")
+
+        # 振替設定セクション
+        st.header("🔄 振替設定")
+
+        # スタイリッシュなカードデザイン
+        st.markdown("""
+    <div style='background: linear-gradient(145deg, #f8f9fa 0%, #ffffff 100%);
+                padding: 2.5rem 2rem;
+                border-radius: 20px;
+                box-shadow: 0 8px 30px rgba(0,0,0,0.06);
+                margin: 2rem 0;
+                border: 1px solid rgba(102, 126, 234, 0.08);'>
+        <p style='color: #7f8c8d; font-size: 0.95rem; font-weight: 600; margin: 0 0 1.5rem 0; text-align: center;'>
+            💡 振替がない場合は、このセクションをスキップして「PDFを作成」ボタンへ
+        </p>
+    </div>
+        """, unsafe_allow_html=True)
+
+        transfer_editor(year, month)
+
+        st.markdown("---")
+
+        pdf_section(year, month)
+
+    schedule_sections(year, month)
+
+    @timed_fragment
+    def workload_section(year, month):
+        """担当者・週・月ごとの訪問件数・稼働率（絞り込みを変えてもこの部分だけ再実行）"""
+        with st.expander("📊 訪問件数・稼働率の集計（管理者向け）"):
+            st.caption("ケースロードを読み込んでいればその利用者を、なければデータベースに保存された利用者を、"
+                       "担当者・週・月ごとに集計します。"
+                       "稼働率は平日（祝日を除く）の定時 9:00〜17:30 のうち訪問している時間の割合です")
+            uploaded = st.session_state.get('caseload_csv')
+            if uploaded is not None:
+                source, caseload_month = uploaded.getvalue(), (year, month)
+            else:
+                source, caseload_month = get_store().revision(), None
+            workload_year = st.selectbox("集計する年", options=YEARS, index=YEARS.index(year), key="workload_year")
+            try:
+                workload = get_workload(source, caseload_month, workload_year)
+            except ValueError as e:
+                st.error(f"ケースロードを読み込めません: {e}")
+                return
+            if not workload.size:
+                st.info("集計する利用者がいません（ケースロードを読み込むか、利用者を保存してください）")
+                return
+
+            filter_col1, filter_col2 = st.columns(2)
+            with filter_col1:
+                first, last = st.select_slider("期間", options=list(range(1, 13)), value=(1, 12),
+                                               format_func=lambda m: f"{m}月", key="workload_months")
+            with filter_col2:
+                by = st.radio("集計の単位", options=['therapist', 'week', 'month'], horizontal=True,
+                              format_func={'therapist': "担当者", 'week': "週", 'month': "月"}.get, key="workload_by")
+            selected = st.multiselect("担当者（空なら全員）", options=workload.therapists, key="workload_therapists")
+            therapists = selected or None
+            start, end = (workload_year, first), (workload_year, last)
+
+            rows = workload.summary(by, therapists, start, end)
+            st.dataframe(
+                [{'集計単位': r['group'] or "（担当者なし）", '訪問件数': r['visits'], '訪問時間(時間)': round(r['minutes'] / 60, 1),
+                  '振替訪問': r['makeup'], '休み': r['canceled'], '休みの割合(%)': round(r['cancel_rate'] * 100, 1),
+                  '稼働率(%)': round(r['utilization'] * 100, 1)} for r in rows],
+                use_container_width=True, hide_index=True
+            )
+            hourly = workload.hourly(therapists, start, end)
+            peak = max(hourly, key=lambda r: r['utilization'])
+            st.caption(f"いちばん混んでいる時間帯: {peak['hour']}時台（稼働率 {peak['utilization']:.0%}・"
+                       f"同時に最大 {peak['peak']}人が訪問中）")
+            st.bar_chart({'時間帯': [f"{r['hour']:02d}時" for r in hourly],
+                          '稼働率(%)': [round(r['utilization'] * 100, 1) for r in hourly]},
+                         x='時間帯', y='稼働率(%)', height=220)
+            st.download_button(
+                label="📥 集計をCSVでダウンロード",
+                data=workload_csv(rows),
+                file_name=f"{workload_year}年{first}月-{last}月_訪問集計.csv",
+                mime="text/csv",
+                on_click="ignore",
+                use_container_width=True
+            )
+
+    workload_section(year, month)
+
+    st.markdown("---")
+
+    # 使い方
+    with st.expander("💡 使い方ガイド"):
+        st.markdown("""
+        ### 📝 基本的な流れ
+        1. **年月を選択** → カレンダー設定
+        2. **定期訪問日を設定** → 曜日と時間を選択
+        3. **振替がなければスキップ** → 直接PDF作成へ
+        4. **振替がある場合** → 振替情報を入力して追加
+        5. **PDFを作成** → ダウンロード
     
-    ### 📅 定期訪問設定
-    - **訪問日1・2**: 曜日と時間を自由に設定
-    - デフォルト: 月曜日 11:20-12:00 / 水曜日 11:00-11:40
-    - 訪問時間は40分/60分から選択
+        ### 📅 定期訪問設定
+        - **訪問日1・2**: 曜日と時間を自由に設定
+        - デフォルト: 月曜日 11:20-12:00 / 水曜日 11:00-11:40
+        - 訪問時間は40分/60分から選択
     
-    ### 🔄 振替の設定方法
-    - **振替元**: 定期訪問日から選択
-    - **振替先**: 同じ週の平日から選択
-    - **時間**: 開始時刻 + 訪問時間で自動計算
+        ### 🔄 振替の設定方法
+        - **振替元**: 定期訪問日から選択
+        - **振替先**: 同じ週の平日から選択
+        - **時間**: 開始時刻 + 訪問時間で自動計算
     
-    ### 💡 ポイント
-    - 終了時刻は自動計算されるので入力ミスなし
-    - 定時（9:00-17:30）を超えるとエラー表示
-    - 同じ日の重複登録を自動チェック
-    """)
-
-# フッター
-st.markdown("""
-<div style='text-align: center; margin-top: 3rem; padding: 2rem 0; 
-            background: linear-gradient(145deg, #f8f9fa 0%, #ffffff 100%);
-            border-radius: 16px;'>
-    <p style='color: #7f8c8d; font-size: 0.95rem; font-weight: 600; margin: 0;'>
-        💡 定期訪問日と時間は自由に設定できます
-    </p>
-    <p style='color: #95a5a6; font-size: 0.85rem; margin: 0.8rem 0 0 0;'>
-        Created with ❤️ by Claude
-    </p>
-</div>
-""", unsafe_allow_html=True)
+        ### 💡 ポイント
+        - 終了時刻は自動計算されるので入力ミスなし
+        - 定時（9:00-17:30）を超えるとエラー表示
+        - 同じ日の重複登録を自動チェック
+        """)
+
+    # 計測パネル（管理者用。REHAB_CALENDAR_METRICS=1 で起動したときだけ表示）
+    # 計測のオン・オフやリセットは全セッションに効くので、URLなど利用者が変えられるもので表示しない
+    if metrics.ENABLED_AT_START:
+        with st.expander("🛠️ 処理時間の計測（管理者用）"):
+            enabled = st.toggle("計測する（全セッション共通）", value=metrics.ENABLED)
+            if enabled != metrics.ENABLED:
+                metrics.enable(enabled)
+            rows = metrics.REGISTRY.summary()
+            if rows:
+                st.dataframe(
+                    [{'処理': r['span'], '回数': r['count'], '平均(ms)': round(r['mean_ms'], 1),
+                      'p50(ms)': round(r['p50_ms'], 1), 'p95(ms)': round(r['p95_ms'], 1),
+                      '最大(ms)': round(r['max_ms'], 1), '合計(秒)': round(r['total_s'], 2)} for r in rows],
+                    use_container_width=True, hide_index=True
+                )
+            else:
+                st.caption("まだ記録がありません（PDFを作成したり画面を操作したりすると記録されます）")
+            col1, col2 = st.columns(2)
+            with col1:
+                st.download_button("📥 Prometheus形式でダウンロード", data=metrics.REGISTRY.prometheus(),
+                                   file_name="rehab_calendar_metrics.txt", mime="text/plain",
+                                   use_container_width=True)
+            with col2:
+                if st.button("🗑️ 記録をリセット", use_container_width=True):
+                    metrics.REGISTRY.reset()
+                    st.rerun()
+
+    # フッター
+    st.markdown("""
+    <div style='text-align: center; margin-top: 3rem; padding: 2rem 0; 
+                background: linear-gradient(145deg, #f8f9fa 0%, #ffffff 100%);
+                border-radius: 16px;'>
+        <p style='color: #7f8c8d; font-size: 0.95rem; font-weight: 600; margin: 0;'>
+            💡 定期訪問日と時間は自由に設定できます
+        </p>
+        <p style='color: #95a5a6; font-size: 0.85rem; margin: 0.8rem 0 0 0;'>
+            Created with ❤️ by Claude
+        </p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    # 画面を表示し終えてから、PDF作成用のライブラリ（matplotlib・フォント）を裏で読み込んでおく
+    @st.cache_resource
+    def start_prewarm():
+        thread = threading.Thread(target=warm_up, name="prewarm", daemon=True)
+        thread.start()
+        return thread
+
+    start_prewarm()
+
+    # REHAB_CALENDAR_METRICS_FILE が指定されていれば、計測結果を定期的にファイルへ書き出す
+    @st.cache_resource
+    def start_metrics_export():
+        return metrics.start_file_export()
+
+    start_metrics_export()
+
+    _script_seconds = time.perf_counter() - _script_start
+    st.session_state.setdefault('_section_timings', {})['script'] = _script_seconds
+    metrics.observe('app.rerun', _script_seconds)
+
+    if _rerun_profile is not None:
+        _profile_path = _rerun_profile.stop()
+        if _profile_path:
+            st.caption(f"🔬 プロファイルを保存しました: {_profile_path}")
+finally:
+    # 例外・st.stop()・st.rerun() で途中で終わった再実行のプロファイルは、書き出さずに止める
+    # （止めないとサンプリングのスレッドとtracemallocが動き続ける）
+    if _rerun_profile is not None:
+        _rerun_profile.stop(write=False)
@@ -0,0 +1,249 @@
+"""複数の利用者の予定表をまとめて作成するバッチ処理
+
+使い方:
+    python batch.py caseload.csv --year 2025 --month 10 --out 2025年10月.pdf
+    python batch.py caseload.csv --year 2025 --month 10 --out-dir pdfs/
+    python batch.py caseload.csv --year 2025 --month 10 --zip 2025年10月.zip
+    python batch.py caseload.xlsx --year 2025 --month 10 --check
+    python batch.py --db rehab_calendar.db --year 2025 --month 10 --out 2025年10月.pdf
+    python batch.py caseload.csv --year 2025 --month 10 --out 2025年10月.pdf --fonttype 42 --single-document
+    python batch.py caseload.csv --year 2025 --month 10 --out 2025年10月_4面.pdf --nup 4 --backend native
+
+caseload.csv の列:
+    patient, visit1_weekday, visit1_time, visit2_weekday, visit2_time, transfers
+    （定期訪問が3つ以上ある場合は visit3_weekday, visit3_time ... を追加）
+    （担当者が複数いる場合は therapist 列を追加。訪問の重なりは担当者ごとにチェックする）
+
+transfers は「振替元>振替先 時間」を ; で区切って並べる（例: 10>12 14:00-14:40; 17>19 11:00-11:40）
+Excel（.xlsx。1枚目のシート・1行目が見出し）も同じ列で読める（openpyxl が必要）。
+作成の前に全行をチェックし（caseload_import.validate_rows）、エラーがあれば行ごとに表示して終了コード1を返す。
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from calendar_pdf import (
+    DEFAULT_BACKEND, PDF_BACKENDS, PDF_FONTTYPES, configure_pdf, create_schedule_pdf, draw_page, open_pdf,
+    output_filename, render_months
+)
+from caseload_import import format_report, read_file, to_patients, validate_rows
+from impose import LAYOUTS, impose_pdfs, sheet_count
+from schedule import resolve_month
+
+try:
+    from pypdf import PdfWriter
+except ImportError:
+    PdfWriter = None
+
+
+def read_caseload(path):
+    """ケースロード（CSVかExcel）を読み込んで利用者ごとの辞書のリストを返す"""
+    return to_patients(read_file(path))
+
+
+def patient_schedule(year, month, patient):
+    """利用者の行から1か月分の予定を解決する"""
+    return resolve_month(year, month, patient['slots'], patient['transfers'])
+
+
+def render_patient(year, month, patient, backend=None):
+    """1人分の予定表をPDFバイト列として作成（ワーカープロセスで実行）"""
+    return create_schedule_pdf(patient_schedule(year, month, patient), backend).getvalue()
+
+
+def render_to_dir(patients, year, month, out_dir, workers, backend=None):
+    """利用者ごとのPDFを、CSVの行順にディレクトリへ書き出す（作成中・未書き出しは workers×2 件まで）"""
+    os.makedirs(out_dir, exist_ok=True)
+    # 同じ名前の利用者がいても上書きしないよう、行順に番号を付ける（write_zip と同じ付け方）
+    names = set()
+    for filename, data in iter_patient_pdfs(patients, year, month, workers, backend):
+        with open(os.path.join(out_dir, unique_filename(filename, names)), 'wb') as f:
+            f.write(data)
+    return len(patients)
+
+
+def render_merged(patients, year, month, out_path, workers, backend=None, single_document=False):
+    """
+    全員分を1つの複数ページPDFにまとめる（ページ順はCSVの行順）
+    matplotlibでは、ワーカープロセスで1人ずつ作ったPDFをつなげるので、フォントがページごとに埋め込まれる。
+    single_document=True なら1つの文書に書き込み（ページの作成はスレッドで並列）、フォントの埋め込みは1回で済む
+    つなげる場合（pypdf）は全ページを書き出しまでメモリに持つので、メモリは人数に比例する。
+    人数が多いときは --out-dir / --zip（1人ずつ書き出す）を使う
+    """
+    if single_document and (backend or DEFAULT_BACKEND) != 'native':
+        with open(out_path, 'wb') as f:
+            render_months(f, (patient_schedule(year, month, patient) for patient in patients), backend, workers)
+        return len(patients)
+    if PdfWriter is None or (backend or DEFAULT_BACKEND) == 'native':
+        # pypdfがない場合は1プロセスで順番に書き込む
+        # nativeは1ページが軽く、1つの文書にまとめればフォントの埋め込みも1回で済む
+        with open_pdf(out_path, backend) as pdf:
+            for patient in patients:
+                draw_page(pdf, patient_schedule(year, month, patient), backend)
+        return len(patients)
+
+    # 作成中・未読のPDFは iter_patient_pdfs で workers×2 件までにして、できたページから1つずつ追加する
+    # （pypdf は書き出しを最後にまとめて行うので、追加したページは書き出しまで残る）
+    writer = PdfWriter()
+    for _, pdf_bytes in iter_patient_pdfs(patients, year, month, workers, backend):
+        writer.append(io.BytesIO(pdf_bytes))
+    with open(out_path, 'wb') as f:
+        writer.write(f)
+    return len(patients)
+
+
+def render_imposed(patients, year, month, out_path, nup, copies, workers, backend=None):
+    """
+    全員分を用紙1枚に nup 面ずつ面付けした1つのPDFにまとめる（ページ順はCSVの行順）。(ページ数, 用紙の枚数) を返す
+    native は1つの文書に予定表をフォームとして書き、用紙に並べる（フォントの埋め込みは1回）。
+    matplotlib はワーカープロセスで1人ずつ作ったPDFを、できた順に面付けする
+    """
+    if (backend or DEFAULT_BACKEND) == 'native':
+        with open_pdf(out_path, backend, nup=nup, copies=copies) as pdf:
+            for patient in patients:
+                draw_page(pdf, patient_schedule(year, month, patient), backend)
+        return len(patients), sheet_count(len(patients), nup, copies)
+    pdfs = (data for _, data in iter_patient_pdfs(patients, year, month, workers, backend))
+    return impose_pdfs(pdfs, out_path, nup, copies)
+
+
+def iter_patient_pdfs(patients, year, month, workers=1, backend=None, submit=None):
+    """
+    利用者ごとのPDFを (ファイル名, バイト列) としてCSVの行順に返す（ジェネレータ）
+    作成中・未読の結果は workers×2 件までにするので、人数が増えてもメモリはほぼ一定
+    submit を渡すとそれ（RenderPool.submit など）で作成し、渡さなければ workers 個のプロセスで作成する
+    workers=1 で submit がなければこのプロセスで1人ずつ作る
+    """
+    if submit is None and workers <= 1:
+        for patient in patients:
+            yield output_filename(year, month, patient['patient']), render_patient(year, month, patient, backend)
+        return
+
+    with contextlib.nullcontext() if submit else ProcessPoolExecutor(max_workers=workers) as executor:
+        submit = submit or executor.submit
+        pending = deque()
+        for patient in patients:
+            pending.append((patient['patient'], submit(render_patient, year, month, patient, backend)))
+            if len(pending) >= workers * 2:
+                name, future = pending.popleft()
+                yield output_filename(year, month, name), future.result()
+        while pending:
+            name, future = pending.popleft()
+            yield output_filename(year, month, name), future.result()
+
+
+def unique_filename(filename, names):
+    """names にない名前にして（同じ名前があれば _2, _3 ... を付ける）names に加える"""
+    stem, ext = os.path.splitext(filename)
+    n = 1
+    while filename in names:
+        n += 1
+        filename = f"{stem}_{n}{ext}"
+    names.add(filename)
+    return filename
+
+
+def write_zip(pdfs, out):
+    """
+    (ファイル名, バイト列) を順にZIPに書き込む（out はパスかバイナリのファイル。シークできないストリームでもよい）
+    1件ずつ流し込むので、ZIP全体をメモリに持たない。PDFは圧縮済みなので無圧縮で格納する
+    """
+    names = set()
+    with zipfile.ZipFile(out, 'w', zipfile.ZIP_STORED) as archive:
+        for filename, data in pdfs:
+            # 同じ名前の利用者がいても上書きしないよう番号を付ける
+            filename = unique_filename(filename, names)
+            archive.writestr(zipfile.ZipInfo(filename, date_time=time.localtime()[:6]), data)
+    return len(names)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ケースロードCSVからリハビリ訪問予定表をまとめて作成")
+    parser.add_argument('caseload', nargs='?', help="ケースロードCSV・Excelファイル")
+    parser.add_argument('--db', help="CSVの代わりに、アプリで保存したデータベース（SQLite）から読み込む")
+    parser.add_argument('--year', type=int, required=True)
+    parser.add_argument('--month', type=int, required=True)
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument('--out', help="全員分をまとめたPDFの出力先")
+    output.add_argument('--out-dir', help="利用者ごとのPDFの出力ディレクトリ")
+    output.add_argument('--zip', help="利用者ごとのPDFをまとめたZIPの出力先（- なら標準出力）")
+    output.add_argument('--check', action='store_true', help="ケースロードのチェックだけ行い、PDFは作成しない")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="並列プロセス数（デフォルト: CPUコア数）")
+    parser.add_argument('--backend', choices=PDF_BACKENDS, default=DEFAULT_BACKEND,
+                        help="PDFの描画方法（native はmatplotlibを使わず高速）")
+    parser.add_argument('--fonttype', type=int, choices=PDF_FONTTYPES,
+                        help="フォントの埋め込み方（3: Type 3、42: TrueTypeのサブセット。matplotlibのみ）")
+    parser.add_argument('--compression', type=int, choices=range(10), metavar='0-9', help="圧縮レベル")
+    parser.add_argument('--single-document', action='store_true',
+                        help="--out で1つの文書に書き込み、フォントを1回だけ埋め込む（matplotlibのみ。1プロセス）")
+    parser.add_argument('--nup', type=int, choices=sorted(LAYOUTS),
+                        help="--out で用紙1枚に2人分・4人分ずつ並べる（トンボ付き。2: A4縦、4: A4横）")
+    parser.add_argument('--copies', type=int, default=1, help="--nup で同じ予定表を続けて何部置くか（控え用など）")
+    args = parser.parse_args(argv)
+    if (args.caseload is None) == (args.db is None):
+        parser.error("ケースロードCSVか --db のどちらか一方を指定してください")
+    if not (args.out or args.out_dir or args.zip or args.check):
+        parser.error("--out / --out-dir / --zip / --check のどれかを指定してください")
+    if args.nup and not args.out:
+        parser.error("--nup は --out と一緒に指定してください")
+    if args.copies < 1:
+        parser.error("--copies は1以上にしてください")
+    configure_pdf(args.fonttype, args.compression)
+
+    if args.db:
+        from store import ScheduleStore
+        patients = ScheduleStore(args.db).load_month(args.year, args.month)
+    else:
+        try:
+            rows = read_file(args.caseload)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 2
+        start = time.perf_counter()
+        errors = validate_rows(rows, args.year, args.month)
+        elapsed = time.perf_counter() - start
+        if errors:
+            print(format_report(errors), file=sys.stderr)
+            print(f"{len(rows)}行中 {len({e['row'] for e in errors})}行にエラーがあります（{elapsed * 1000:.0f}ms）",
+                  file=sys.stderr)
+            return 1
+        if args.check:
+            print(f"{len(rows)}行 エラーはありません（{elapsed * 1000:.0f}ms）", file=sys.stderr)
+            return 0
+        patients = to_patients(rows)
+    if args.check:
+        return 0
+
+    start = time.perf_counter()
+    if args.out and args.nup:
+        pages, sheets = render_imposed(patients, args.year, args.month, args.out, args.nup, args.copies,
+                                       args.workers, args.backend)
+        elapsed = time.perf_counter() - start
+        print(f"{pages}ページ → 用紙{sheets}枚（{args.nup}面） / {elapsed:.2f}秒 "
+              f"({pages / elapsed:.1f} pages/sec, {sheets / elapsed:.1f} sheets/sec, {args.workers}プロセス)",
+              file=sys.stderr)
+        return 0
+    if args.out:
+        pages = render_merged(patients, args.year, args.month, args.out, args.workers, args.backend,
+                              args.single_document)
+    elif args.zip:
+        out = sys.stdout.buffer if args.zip == '-' else args.zip
+        pages = write_zip(iter_patient_pdfs(patients, args.year, args.month, args.workers, args.backend), out)
+    else:
+        pages = render_to_dir(patients, args.year, args.month, args.out_dir, args.workers, args.backend)
+    elapsed = time.perf_counter() - start
+
+    print(f"{pages}ページ作成 / {elapsed:.2f}秒 ({pages / elapsed:.1f} pages/sec, {args.workers}プロセス)",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
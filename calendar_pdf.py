@@ -0,0 +1,356 @@
+import functools
+import io
+import itertools
+import os
+import re
+import time
+import types
+import warnings
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+warnings.filterwarnings('ignore')
+
+import metrics
+import profiling
+from schedule import resolve_month, weekday_short
+
+# 起動時間の内訳（秒）。load_matplotlib() が記録する
+STARTUP_TIMINGS = {}
+
+@functools.lru_cache(maxsize=None)
+def load_matplotlib():
+    """
+    matplotlibと日本語フォントを初回だけ読み込む
+    画面の表示を待たせないよう、モジュールの読み込み時ではなくPDF作成時（または事前読み込み）に呼ぶ
+    """
+    start = time.perf_counter()
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.font_manager as fm
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.backends.backend_pdf import PdfPages
+    from matplotlib.figure import Figure
+    from matplotlib.patches import Rectangle
+    STARTUP_TIMINGS['import_matplotlib'] = time.perf_counter() - start
+    metrics.observe('pdf.import_matplotlib', STARTUP_TIMINGS['import_matplotlib'])
+    
+    # 日本語フォント設定
+    start = time.perf_counter()
+    try:
+        import japanize_matplotlib
+        japanize_matplotlib.japanize()
+    except:
+        # 代替フォント設定
+        try:
+            font_path = '/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc'
+            font_prop = fm.FontProperties(fname=font_path)
+            matplotlib.rcParams['font.family'] = font_prop.get_name()
+        except:
+            # それでもダメな場合はデフォルト
+            matplotlib.rcParams['font.sans-serif'] = ['Noto Sans CJK JP', 'DejaVu Sans', 'sans-serif']
+            matplotlib.rcParams['axes.unicode_minus'] = False
+    _apply_pdf_options(matplotlib)
+    STARTUP_TIMINGS['font_setup'] = time.perf_counter() - start
+    metrics.observe('pdf.font_setup', STARTUP_TIMINGS['font_setup'])
+    
+    return types.SimpleNamespace(
+        Figure=Figure, FigureCanvasAgg=FigureCanvasAgg, PdfPages=PdfPages, Rectangle=Rectangle
+    )
+
+def warm_up(backend=None):
+    """PDF作成に必要なライブラリとフォントを先に読み込んでおく（バックグラウンドスレッドから呼ぶ）"""
+    start = time.perf_counter()
+    if (backend or DEFAULT_BACKEND) == 'native':
+        from native_pdf import NativePdfDocument
+        NativePdfDocument(io.BytesIO()).close()
+    else:
+        mpl = load_matplotlib()
+        # フォントキャッシュも温めるため、空のページを1枚描いて捨てる
+        with mpl.PdfPages(io.BytesIO()) as pdf:
+            fig = mpl.Figure(figsize=(1, 1))
+            mpl.FigureCanvasAgg(fig)
+            fig.text(0.5, 0.5, "予定表", fontweight='bold')
+            pdf.savefig(fig)
+    STARTUP_TIMINGS['warm_up'] = time.perf_counter() - start
+    return dict(STARTUP_TIMINGS)
+
+# PDFの描画バックエンド（'matplotlib' または 'native'）
+PDF_BACKENDS = ('matplotlib', 'native')
+DEFAULT_BACKEND = os.environ.get('REHAB_CALENDAR_PDF_BACKEND', 'matplotlib')
+
+# PDFのフォントの埋め込み方と圧縮（プロセス全体の設定。matplotlibのrcParamsはスレッド間で共有されるため）
+#   fonttype     3 = Type 3（文字ごとの図形。matplotlibのデフォルト）
+#                42 = TrueType（使った文字だけのサブセット。小さくなるが1ページ目の作成が遅い）。nativeは常にこちら
+#   compression  0〜9（zlibの圧縮レベル。0は圧縮なし）。None ならバックエンドのデフォルト（matplotlib 6、native 9）
+PDF_FONTTYPES = (3, 42)
+PDF_OPTIONS = {
+    'fonttype': int(os.environ.get('REHAB_CALENDAR_PDF_FONTTYPE', '3')),
+    'compression': (int(os.environ['REHAB_CALENDAR_PDF_COMPRESSION'])
+                    if os.environ.get('REHAB_CALENDAR_PDF_COMPRESSION') else None),
+}
+
+def configure_pdf(fonttype=None, compression=None):
+    """
+    フォントの埋め込み方と圧縮レベルを変える（PDFを作る前に1回だけ呼ぶ）
+    環境変数にも書くので、ProcessPoolExecutorのワーカープロセスにも引き継がれる
+    """
+    if fonttype is not None:
+        if fonttype not in PDF_FONTTYPES:
+            raise ValueError(f"fonttype は {PDF_FONTTYPES} のいずれかです（{fonttype}）")
+        PDF_OPTIONS['fonttype'] = fonttype
+        os.environ['REHAB_CALENDAR_PDF_FONTTYPE'] = str(fonttype)
+    if compression is not None:
+        if not 0 <= compression <= 9:
+            raise ValueError(f"compression は 0〜9 です（{compression}）")
+        PDF_OPTIONS['compression'] = compression
+        os.environ['REHAB_CALENDAR_PDF_COMPRESSION'] = str(compression)
+    if load_matplotlib.cache_info().currsize:
+        import matplotlib
+        _apply_pdf_options(matplotlib)
+
+def _apply_pdf_options(matplotlib):
+    matplotlib.rcParams['pdf.fonttype'] = PDF_OPTIONS['fonttype']
+    if PDF_OPTIONS['compression'] is not None:
+        matplotlib.rcParams['pdf.compression'] = PDF_OPTIONS['compression']
+
+# 同じ入力から同じバイト列になるよう、作成日時などの可変なメタデータは入れない
+PDF_METADATA = {
+    'Creator': 'リハビリ訪問予定表',
+    'Producer': None,
+    'CreationDate': None,
+}
+
+# PDF作成関数
+def draw_calendar(ax, schedule):
+    """
+    カレンダーを描く（描画バックエンド共通）
+    ax は ax.text() と ax.rect() を持つもの（_AxesCanvas または native_pdf.NativeCanvas）
+    schedule は schedule.MonthSchedule
+    """
+    year, month = schedule.year, schedule.month
+    cal = schedule.weeks
+    
+    # タイトル
+    title = f"{year}年{month}月 リハビリ訪問予定表"
+    ax.text(3.5, len(cal) + 3, title, ha='center', va='center', 
+            fontsize=24, fontweight='bold')
+    
+    # 通常の訪問時間
+    ax.text(0.2, len(cal) + 2.3, "【通常の訪問時間】", ha='left', va='center',
+           fontsize=12, fontweight='bold')
+    y_offset = len(cal) + 1.95
+    for slot in schedule.slots:
+        ax.text(0.4, y_offset, f"・{slot['weekday']}：{slot['time']}", ha='left', va='center',
+               fontsize=11)
+        y_offset -= 0.3
+    
+    # 振替予定
+    if schedule.transfers:
+        y_offset = min(len(cal) + 1.2, y_offset + 0.3 - 0.45)
+        ax.text(0.2, y_offset, "【振替予定】", ha='left', va='center',
+               fontsize=12, fontweight='bold', color='red')
+        
+        y_offset -= 0.3
+        for from_day, to_day, time in schedule.transfers:
+            from_weekday = weekday_short(year, month, from_day)
+            to_weekday = weekday_short(year, month, to_day)
+            
+            text = f"{month}月{from_day}日({from_weekday}) → {month}月{to_day}日({to_weekday}) {time}"
+            ax.text(0.5, y_offset, text, ha='left', va='center',
+                   fontsize=11, color='red', fontweight='bold')
+            y_offset -= 0.25
+    
+    # 曜日ヘッダー
+    weekdays = ['日', '月', '火', '水', '木', '金', '土']
+    for i, day in enumerate(weekdays):
+        color = 'red' if i == 0 else 'blue' if i == 6 else 'black'
+        ax.text(i + 0.5, len(cal) + 0.3, day, ha='center', va='center',
+               fontsize=14, fontweight='bold', color=color)
+    
+    # カレンダーグリッド
+    for week_num, week in enumerate(cal):
+        y = len(cal) - week_num
+        
+        for day_num, day in enumerate(week):
+            x = day_num
+            
+            # セルの枠線
+            ax.rect(x, y-1, 1, 1, linewidth=1.2)
+            
+            if day != 0:
+                # 日付の色（祝日は日曜と同じ赤）
+                holiday = schedule.holiday_name(day)
+                text_color = 'red' if day_num == 0 or holiday else 'blue' if day_num == 6 else 'black'
+                
+                # 日付を表示（左上）
+                ax.text(x + 0.1, y - 0.15, str(day), ha='left', va='top',
+                       fontsize=13, fontweight='bold', color=text_color)
+                
+                # 祝日の名前（右上）
+                if holiday:
+                    ax.text(x + 0.95, y - 0.17, holiday, ha='right', va='top',
+                           fontsize=7, color='red')
+                
+                # 訪問・振替・休みの情報
+                # 休みの日
+                if schedule.is_canceled(day):
+                    ax.text(x + 0.5, y - 0.5, "リハビリ\nお休み", ha='center', va='center',
+                           fontsize=10, fontweight='bold', color='red')
+                
+                # 通常の訪問日
+                elif schedule.is_regular_visit(day):
+                    times = '\n'.join(slot['time'] for slot in schedule.regular_slots(day))
+                    ax.text(x + 0.5, y - 0.5, f"訪問予定\n{times}", ha='center', va='center',
+                           fontsize=9, fontweight='bold', color='green')
+                
+                # 振替訪問
+                if schedule.is_makeup(day):
+                    ax.text(x + 0.5, y - 0.5, f"振替訪問\n{schedule.makeup[day]}", ha='center', va='center',
+                           fontsize=9, fontweight='bold', color='red')
+    
+    # フッター
+    ax.text(0.2, -0.5, "※ 急な変更が生じた場合は、事前にご連絡させていただきます。", 
+           ha='left', va='center', fontsize=10)
+    ax.text(0.2, -0.75, "※ ご不明な点がございましたら、お気軽にお問い合わせください。", 
+           ha='left', va='center', fontsize=10)
+
+class _AxesCanvas:
+    """matplotlibのAxesをdraw_calendarから使えるようにする"""
+    
+    def __init__(self, ax, rectangle_cls):
+        self._ax = ax
+        self._rectangle_cls = rectangle_cls
+        self.text = ax.text
+    
+    def rect(self, x, y, width, height, linewidth=1.0):
+        self._ax.add_patch(self._rectangle_cls((x, y), width, height, fill=False,
+                                               edgecolor='black', linewidth=linewidth))
+
+def build_calendar_figure(schedule):
+    """カレンダーを描いたmatplotlibのFigureを作る（スレッドごとに独立しているので並列に呼べる）"""
+    mpl = load_matplotlib()
+    
+    with metrics.span('pdf.build_figure'):
+        # pyplotの図管理（グローバル状態）を通さず、セッションごとに独立したFigureを作る
+        fig = mpl.Figure(figsize=(11.7, 8.3))
+        mpl.FigureCanvasAgg(fig)
+        ax = fig.subplots()
+        ax.set_xlim(0, 7)
+        ax.set_ylim(0, len(schedule.weeks) + 3.5)
+        ax.axis('off')
+        
+        draw_calendar(_AxesCanvas(ax, mpl.Rectangle), schedule)
+    
+    with metrics.span('pdf.tight_layout'):
+        fig.tight_layout()
+    profiling.note_figure(fig)
+    return fig
+
+def draw_calendar_page(pdf, schedule):
+    """開いているPdfPagesにカレンダーを1ページ書き込む"""
+    commit_page(pdf, build_calendar_figure(schedule), 'matplotlib')
+
+def build_native_page(pdf, schedule):
+    """native_pdf.NativePdfDocument用の1ページ分の描画命令を作る（matplotlibを使わない）"""
+    # フッターまで入るように、matplotlibのbbox_inches='tight'と同じ範囲を取る
+    with metrics.span('pdf.native_build'):
+        canvas = pdf.new_page(xlim=(0, 7), ylim=(-0.9, len(schedule.weeks) + 3.4))
+        draw_calendar(canvas, schedule)
+    return canvas
+
+def draw_native_calendar_page(pdf, schedule):
+    """native_pdf.NativePdfDocumentにカレンダーを1ページ書き込む"""
+    pdf.add_page(build_native_page(pdf, schedule))
+
+
+def open_pdf(file, backend=None, nup=None, copies=1):
+    """
+    バックエンドに応じた複数ページPDFの書き出し先を開く（with で使う）
+    nup を指定すると用紙1枚に nup 面ずつ面付けする（native のみ。matplotlib は作成後に impose.impose_pdfs で）
+    """
+    if (backend or DEFAULT_BACKEND) == 'native':
+        from native_pdf import NativePdfDocument
+        compression = PDF_OPTIONS['compression']
+        return NativePdfDocument(file, compress=True if compression is None else compression,
+                                 nup=nup, copies=copies)
+    if nup:
+        raise ValueError("書き出しながらの面付けは native バックエンドだけです（impose.impose_pdfs を使ってください）")
+    return load_matplotlib().PdfPages(file, metadata=PDF_METADATA)
+
+def build_page(pdf, schedule, backend=None):
+    """1ページ分を描く（まだ書き出さない）。別スレッドから呼んでよい"""
+    if (backend or DEFAULT_BACKEND) == 'native':
+        return build_native_page(pdf, schedule)
+    return build_calendar_figure(schedule)
+
+def commit_page(pdf, page, backend=None):
+    """build_pageで描いたページを書き出し先に追加する（ページ順を保つため1スレッドから呼ぶ）"""
+    if (backend or DEFAULT_BACKEND) == 'native':
+        with metrics.span('pdf.native_write'):
+            pdf.add_page(page)
+    else:
+        with metrics.span('pdf.savefig'):
+            pdf.savefig(page, bbox_inches='tight', pad_inches=0.5)
+
+def draw_page(pdf, schedule, backend=None):
+    """open_pdfで開いた書き出し先に1ページ追加する"""
+    commit_page(pdf, build_page(pdf, schedule, backend), backend)
+
+def render_months(file, schedules, backend=None, workers=4):
+    """
+    複数月の予定を1つのPDFにまとめる
+    各月のページはスレッドプールで並列に描き、できた順ではなく月の順に書き出す。
+    同時に描いておくページは workers * 2 枚までなので、月数が増えてもメモリは増えない。
+    戻り値は月ごとの時間 [{'year', 'month', 'build', 'save'}, ...]（秒）
+    """
+    def timed_build(schedule):
+        start = time.perf_counter()
+        page = build_page(pdf, schedule, backend)
+        return page, time.perf_counter() - start
+    
+    timings = []
+    schedules = iter(schedules)
+    with open_pdf(file, backend) as pdf, ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque(
+            (schedule, executor.submit(timed_build, schedule))
+            for schedule in itertools.islice(schedules, workers * 2)
+        )
+        while pending:
+            schedule, future = pending.popleft()
+            page, build_seconds = future.result()
+            start = time.perf_counter()
+            commit_page(pdf, page, backend)
+            del page
+            timings.append({
+                'year': schedule.year,
+                'month': schedule.month,
+                'build': build_seconds,
+                'save': time.perf_counter() - start,
+            })
+            for schedule in itertools.islice(schedules, 1):
+                pending.append((schedule, executor.submit(timed_build, schedule)))
+    return timings
+
+def output_filename(year, month, patient_name):
+    """'2025年10月_山田_太郎_リハビリ訪問予定表.pdf' のようなファイル名（ファイル名に使えない文字は _ に置換）"""
+    safe_name = re.sub(r'[\\/:*?"<>|\s]+', '_', patient_name)
+    return f"{year}年{month}月_{safe_name}_リハビリ訪問予定表.pdf"
+
+
+def create_schedule_pdf(schedule, backend=None):
+    """解決済みの予定（schedule.MonthSchedule）から1ページのPDFを作る"""
+    pdf_buffer = io.BytesIO()
+    with profiling.maybe_capture('pdf'), metrics.span('pdf.create'), open_pdf(pdf_buffer, backend) as pdf:
+        draw_page(pdf, schedule, backend)
+    pdf_buffer.seek(0)
+    return pdf_buffer
+
+def create_pdf(year, month, transfers_list, visit1_config, visit2_config, backend=None):
+    """
+    visit1_config = {'weekday': '月曜日', 'time': '11:20-12:00', 'days': [3, 10, 17, 24]}
+    visit2_config = {'weekday': '水曜日', 'time': '11:00-11:40', 'days': [5, 12, 19, 26]}
+    backend = 'matplotlib'（デフォルト）または 'native'
+    """
+    schedule = resolve_month(year, month, [visit1_config, visit2_config], transfers_list)
+    pdf_buffer = create_schedule_pdf(schedule, backend)
+    return pdf_buffer, schedule.actual_days(0), schedule.actual_days(1), schedule.canceled_dates
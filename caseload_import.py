@@ -0,0 +1,258 @@
+"""ケースロード（CSV / Excel）の読み込みと、全行まとめての入力チェック
+
+列は batch.py のケースロードCSVと同じ（patient, visit1_weekday, visit1_time, ..., transfers, therapist）。
+チェックのルールはアプリの入力欄・schedule.validate_schedule と同じ:
+  - 定期訪問・振替の時間帯は定時（9:00〜17:30）の中
+  - 定期訪問の曜日は平日
+  - 振替元はその利用者の定期訪問日、振替先は同じ週の平日（祝日を除く）
+  - 同じ日の振替（お休み）を2回登録しない
+1行ずつ MonthSchedule を作らず、全行の枠・振替を numpy の配列にしてまとめて比べるので、
+1万行でも数十ミリ秒で終わる。時間帯の文字列は同じものが多いので、種類ごとに1回だけ解析する。
+
+Excel（.xlsx）を読むには openpyxl が必要（pip install openpyxl）。
+"""
+import calendar
+import csv
+import io
+import re
+
+import numpy as np
+
+from schedule import (
+    WEEKDAY_NAMES, WORK_END_MINUTES, WORK_START_MINUTES, holiday_mask, holiday_name, parse_transfers
+)
+
+_VISIT_COLUMN = re.compile(r'visit(\d+)_(weekday|time)$')
+_TIME_RANGE = re.compile(r'(\d{1,2}):(\d{2})-(\d{1,2}):(\d{2})$')
+_TRANSFER = re.compile(r'(\d+)>(\d+)\s+(\S+)$')
+
+# 時間帯の解析結果のコード（開始・終了の分の代わりに入れる）
+_BAD_FORMAT = -1
+
+
+def is_xlsx(data):
+    """Excelのファイル（ZIP）か"""
+    return data[:4] == b'PK\x03\x04'
+
+
+def read_rows(data):
+    """
+    ケースロードのバイト列（CSVかExcel）を行の辞書のリストにする
+    値はすべて前後の空白を除いた文字列（空のセルは ''）
+    """
+    if is_xlsx(data):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise ValueError("Excelファイルを読むには openpyxl が必要です（pip install openpyxl）") from None
+        sheet = load_workbook(io.BytesIO(data), read_only=True, data_only=True).worksheets[0]
+        values = sheet.iter_rows(values_only=True)
+        header = [str(name or '').strip() for name in next(values, ())]
+        return [{name: '' if value is None else str(value).strip() for name, value in zip(header, row)}
+                for row in values if any(value is not None for value in row)]
+    text = data.decode('utf-8-sig')
+    return [{name: (value or '').strip() for name, value in row.items() if name is not None}
+            for row in csv.DictReader(io.StringIO(text))]
+
+
+def read_file(path):
+    with open(path, 'rb') as f:
+        return read_rows(f.read())
+
+
+def _visit_numbers(rows):
+    """行にある visitN_weekday / visitN_time の N（小さい順）"""
+    numbers = set()
+    for name in (rows[0] if rows else {}):
+        match = _VISIT_COLUMN.match(name)
+        if match:
+            numbers.add(int(match.group(1)))
+    return sorted(numbers)
+
+
+def _parse_times(texts):
+    """時間帯の文字列の配列 → (開始分, 終了分) の配列。形式が正しくなければ _BAD_FORMAT"""
+    unique, inverse = np.unique(np.asarray(texts, dtype=object).astype(str), return_inverse=True)
+    parsed = np.full((len(unique), 2), _BAD_FORMAT, dtype=np.int32)
+    for i, text in enumerate(unique):
+        match = _TIME_RANGE.match(text)
+        if match:
+            h1, m1, h2, m2 = map(int, match.groups())
+            if m1 < 60 and m2 < 60:
+                parsed[i] = (h1 * 60 + m1, h2 * 60 + m2)
+    result = parsed[inverse.reshape(-1)]
+    return result[:, 0], result[:, 1]
+
+
+def _time_messages(label, texts, start, end):
+    """時間帯のエラーメッセージ（_time_range_errors と同じ文言。エラーがなければ None）"""
+    messages = np.full(len(texts), None, dtype=object)
+    bad = start == _BAD_FORMAT
+    checks = [
+        (bad, "時間帯 '{}' は '11:20-12:00' の形式で指定してください"),
+        (~bad & (start >= end), "終了時刻が開始時刻より前です（{}）"),
+        (~bad & (start < WORK_START_MINUTES), "開始時刻が定時（9:00）より前です（{}）"),
+        (~bad & (end > WORK_END_MINUTES), "終了時刻が定時（17:30）を超えています（{}）"),
+    ]
+    # 1つの時間帯には最初に当てはまったエラーだけを出す
+    for mask, template in checks:
+        for i in np.flatnonzero(mask & (messages == None)):  # noqa: E711
+            messages[i] = f"{label[i]}: {template.format(texts[i])}"
+    return messages
+
+
+def validate_rows(rows, year, month):
+    """
+    全行をまとめてチェックし、エラーのリストを返す（空ならOK）
+    エラーは {'row': 行番号（見出しが1行目）, 'patient': 利用者名, 'column': 列, 'message': 内容}。行番号の順
+    """
+    errors = []
+
+    def add(row, column, message):
+        errors.append({'row': int(row) + 2, 'patient': rows[row].get('patient', ''),
+                       'column': column, 'message': message})
+
+    if not rows:
+        return errors
+    if 'patient' not in rows[0]:
+        return [{'row': 1, 'patient': '', 'column': 'patient', 'message': "patient 列がありません"}]
+
+    # 利用者名（空・重複）
+    names = np.array([row.get('patient', '') for row in rows], dtype=object)
+    for i in np.flatnonzero(names == ''):
+        add(i, 'patient', "利用者名がありません")
+    _, first, counts = np.unique(names.astype(str), return_index=True, return_counts=True)
+    duplicated = set(names[first[counts > 1]]) - {''}
+    for i in np.flatnonzero(np.isin(names, list(duplicated))):
+        add(i, 'patient', f"同じ利用者名の行が複数あります（{names[i]}）")
+
+    # ---- 定期訪問の枠: 全行の枠を1つの配列に並べる ----
+    slot_row, slot_n, slot_day, slot_time = [], [], [], []
+    for n in _visit_numbers(rows):
+        weekday_key, time_key = f'visit{n}_weekday', f'visit{n}_time'
+        for i, row in enumerate(rows):
+            weekday, time_range = row.get(weekday_key, ''), row.get(time_key, '')
+            if weekday or time_range:
+                slot_row.append(i)
+                slot_n.append(n)
+                slot_day.append(weekday)
+                slot_time.append(time_range)
+    slot_row = np.array(slot_row, dtype=np.int64)
+    weekday_index = {name: i for i, name in enumerate(WEEKDAY_NAMES)}
+    slot_weekday = np.array([weekday_index.get(name, -1) for name in slot_day], dtype=np.int64)
+    slot_start, slot_end = _parse_times(slot_time)
+
+    labels = np.array([f"訪問日{n}" for n in slot_n], dtype=object)
+    for i in np.flatnonzero(slot_weekday < 0):
+        add(slot_row[i], f'visit{slot_n[i]}_weekday',
+            f"訪問日{slot_n[i]}: 曜日 '{slot_day[i]}' は {'・'.join(WEEKDAY_NAMES)} のいずれかです")
+    for i, message in enumerate(_time_messages(labels, slot_time, slot_start, slot_end)):
+        if message:
+            add(slot_row[i], f'visit{slot_n[i]}_time', message)
+
+    slot_count = np.bincount(slot_row, minlength=len(rows))
+    for i in np.flatnonzero(slot_count == 0):
+        add(i, 'visit1_weekday', "定期訪問の枠が1つもありません")
+    # 行ごとの定期訪問の曜日（ビット 0〜4 = 月〜金）
+    valid = slot_weekday >= 0
+    row_weekdays = np.zeros(len(rows), dtype=np.int64)
+    np.bitwise_or.at(row_weekdays, slot_row[valid], 1 << slot_weekday[valid])
+
+    # ---- 振替: 全行の振替を1つの配列に並べる ----
+    tr_row, tr_from, tr_to, tr_time = [], [], [], []
+    for i, row in enumerate(rows):
+        for item in row.get('transfers', '').split(';'):
+            item = item.strip()
+            if not item:
+                continue
+            match = _TRANSFER.match(item)
+            if not match:
+                add(i, 'transfers', f"振替 '{item}' は「振替元>振替先 時間」（例: 10>12 14:00-14:40）の形式で指定してください")
+                continue
+            tr_row.append(i)
+            tr_from.append(int(match.group(1)))
+            tr_to.append(int(match.group(2)))
+            tr_time.append(match.group(3))
+    if tr_row:
+        tr_row = np.array(tr_row, dtype=np.int64)
+        tr_from = np.array(tr_from, dtype=np.int64)
+        tr_to = np.array(tr_to, dtype=np.int64)
+        _check_transfers(year, month, tr_row, tr_from, tr_to, tr_time, row_weekdays, add)
+
+    errors.sort(key=lambda error: error['row'])
+    return errors
+
+
+def _check_transfers(year, month, tr_row, tr_from, tr_to, tr_time, row_weekdays, add):
+    num_days = calendar.monthrange(year, month)[1]
+    first_weekday = calendar.weekday(year, month, 1)  # 月曜 = 0
+    # 日付を添字にした表（0番目と範囲外は使わない）
+    days = np.arange(num_days + 2)
+    weekday_of = (first_weekday + days - 1) % 7
+    week_of = (days - 1 + first_weekday) // 7  # 月曜始まりの週番号
+    holidays = holiday_mask(year, month)
+    is_holiday = np.array([bool(holidays >> int(day) & 1) for day in days])
+
+    from_ok = (tr_from >= 1) & (tr_from <= num_days)
+    to_ok = (tr_to >= 1) & (tr_to <= num_days)
+    from_day = np.where(from_ok, tr_from, 0)
+    to_day = np.where(to_ok, tr_to, 0)
+
+    from_weekday = weekday_of[from_day]
+    is_regular = from_ok & (from_weekday < 5) & ((row_weekdays[tr_row] >> np.minimum(from_weekday, 4)) & 1 == 1)
+    to_holiday = to_ok & is_holiday[to_day]
+    same_week = (to_ok & (weekday_of[to_day] < 5) & (week_of[to_day] == week_of[from_day])
+                 & (tr_to != tr_from) & ~to_holiday)
+
+    # 同じ利用者・同じ振替元が2回目以降のもの（登録順で後のほう）
+    order = np.lexsort((np.arange(len(tr_row)), tr_from, tr_row))
+    repeated = np.zeros(len(tr_row), dtype=bool)
+    repeated[order[1:]] = (tr_row[order[1:]] == tr_row[order[:-1]]) & (tr_from[order[1:]] == tr_from[order[:-1]])
+
+    start, end = _parse_times(tr_time)
+    labels = np.array([f"振替 {a}日→{b}日" for a, b in zip(tr_from, tr_to)], dtype=object)
+    time_messages = _time_messages(labels, tr_time, start, end)
+
+    has_error = ~is_regular | to_holiday | ~same_week | repeated | (time_messages != None)  # noqa: E711
+    for i in np.flatnonzero(has_error):
+        if not is_regular[i]:
+            add(tr_row[i], 'transfers', f"{labels[i]}: 振替元が定期訪問日ではありません")
+        elif to_holiday[i]:
+            add(tr_row[i], 'transfers', f"{labels[i]}: 振替先が祝日（{holiday_name(year, month, int(tr_to[i]))}）です")
+        elif not same_week[i]:
+            add(tr_row[i], 'transfers', f"{labels[i]}: 振替先は振替元と同じ週の平日にしてください")
+        if repeated[i]:
+            add(tr_row[i], 'transfers', f"{labels[i]}: この日付の振替は既に登録されています")
+        if time_messages[i]:
+            add(tr_row[i], 'transfers', time_messages[i])
+
+
+def to_patients(rows, errors=()):
+    """
+    行を batch.read_caseload と同じ形式の利用者のリストにする
+    errors を渡すと、エラーのある行は除く
+    """
+    skip = {error['row'] - 2 for error in errors}
+    numbers = _visit_numbers(rows)
+    patients = []
+    for i, row in enumerate(rows):
+        if i in skip:
+            continue
+        slots = [{'weekday': row[f'visit{n}_weekday'], 'time': row.get(f'visit{n}_time', '')}
+                 for n in numbers if row.get(f'visit{n}_weekday')]
+        patients.append({
+            'patient': row['patient'],
+            'therapist': row.get('therapist', ''),
+            'slots': slots,
+            'transfers': parse_transfers(row.get('transfers')),
+        })
+    return patients
+
+
+def format_report(errors, limit=None):
+    """エラーの一覧をテキストにする（コマンドライン用）"""
+    lines = [f"{error['row']}行目 {error['patient'] or '（名前なし）'} [{error['column']}] {error['message']}"
+             for error in errors[:limit]]
+    if limit is not None and len(errors) > limit:
+        lines.append(f"...ほか {len(errors) - limit}件")
+    return '\n'.join(lines)
@@ -0,0 +1,199 @@
+"""予定表PDFをコマンドラインから作成する（Streamlitを使わない）
+
+使い方:
+    python cli.py spec.json --out-dir pdfs/
+    python cli.py specs.yaml other.json --out-dir pdfs/ --backend native
+    cat specs.jsonl | python cli.py - --out-dir pdfs/
+    python cli.py spec.json --check          # 入力チェックだけ行う
+
+スペック（JSON / YAML。1つのファイルに1件・リスト・JSON Lines・YAMLの複数ドキュメントのどれでもよい）:
+    {
+      "year": 2025, "month": 10,
+      "patient": "山田 太郎",                       # 省略可（ファイル名に使う）
+      "slots": [{"weekday": "月曜日", "time": "11:20-12:00"},
+                {"weekday": "水曜日", "time": "11:00-11:40"}],
+      "transfers": [{"from": 6, "to": 8, "time": "14:00-14:40"}],
+      "output": "yamada.pdf"                        # 省略可（--out-dir からの相対パス）
+    }
+    transfers は [6, 8, "14:00-14:40"] や "6>8 14:00-14:40; 13>15 9:00-9:40"（batch.pyのCSVと同じ形式）でもよい
+
+終了コード:
+    0  すべて作成できた
+    1  入力チェックでエラーになったスペックがある（エラーのないスペックのPDFは作成する）
+    2  ファイルが読めない・JSON/YAMLとして読めないなど
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from calendar_pdf import (
+    DEFAULT_BACKEND, PDF_BACKENDS, PDF_FONTTYPES, configure_pdf, create_schedule_pdf, output_filename
+)
+from schedule import parse_transfers, resolve_month, validate_schedule
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+EXIT_OK = 0
+EXIT_INVALID = 1
+EXIT_INPUT_ERROR = 2
+
+
+class SpecError(ValueError):
+    """スペックの形式が正しくない"""
+
+
+def parse_documents(text, name='<stdin>'):
+    """JSON / JSON Lines / YAML の文字列からスペックのリストを取り出す"""
+    stripped = text.lstrip()
+    if name.endswith(('.yaml', '.yml')) or not stripped.startswith(('{', '[')):
+        if yaml is None:
+            raise SpecError(f"{name}: YAMLを読むには PyYAML が必要です（pip install pyyaml）")
+        try:
+            documents = [doc for doc in yaml.safe_load_all(text) if doc is not None]
+        except yaml.YAMLError as e:
+            raise SpecError(f"{name}: YAMLとして読めません: {e}") from None
+    else:
+        try:
+            documents = [json.loads(text)]
+        except json.JSONDecodeError:
+            # 1行1件の JSON Lines
+            try:
+                documents = [json.loads(line) for line in text.splitlines() if line.strip()]
+            except json.JSONDecodeError as e:
+                raise SpecError(f"{name}: JSONとして読めません: {e}") from None
+
+    specs = []
+    for doc in documents:
+        specs.extend(doc if isinstance(doc, list) else [doc])
+    for spec in specs:
+        if not isinstance(spec, dict):
+            raise SpecError(f"{name}: スペックはオブジェクト（キーと値の組）で指定してください")
+    return specs
+
+
+def load_specs(paths, stdin=None):
+    """ファイル（'-' は標準入力）からスペックを読み込み、(読み込み元, 何件目か, スペック) のリストを返す"""
+    loaded = []
+    for path in paths:
+        if path == '-':
+            text = (stdin or sys.stdin).read()
+        else:
+            try:
+                with open(path, encoding='utf-8-sig') as f:
+                    text = f.read()
+            except OSError as e:
+                raise SpecError(f"{path}: 読み込めません: {e.strerror}") from None
+        name = '<stdin>' if path == '-' else path
+        loaded.extend((name, index, spec) for index, spec in enumerate(parse_documents(text, name), 1))
+    return loaded
+
+
+def _transfers(value):
+    """スペックの transfers（オブジェクト・リスト・文字列）を振替タプルのリストに変換"""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return parse_transfers(value)
+    transfers = []
+    for item in value:
+        if isinstance(item, dict):
+            transfers.append((item['from'], item['to'], item['time']))
+        elif isinstance(item, str):
+            transfers.extend(parse_transfers(item))
+        else:
+            from_day, to_day, time_range = item
+            transfers.append((from_day, to_day, time_range))
+    return transfers
+
+
+def normalize_spec(spec):
+    """スペックを (年, 月, 定期訪問の枠, 振替) にし、入力チェックのエラーと一緒に返す"""
+    try:
+        year, month = spec['year'], spec['month']
+        slots = [{'weekday': slot['weekday'], 'time': slot['time']} for slot in spec.get('slots') or []]
+        transfers = _transfers(spec.get('transfers'))
+    except (KeyError, TypeError, ValueError) as e:
+        detail = f"'{e.args[0]}' がありません" if isinstance(e, KeyError) else str(e)
+        return None, [f"スペックの形式が正しくありません: {detail}"]
+    errors = validate_schedule(year, month, slots, transfers)
+    if not slots:
+        errors.append("定期訪問の枠（slots）が1つもありません")
+    return (year, month, slots, transfers), errors
+
+
+def render_spec(spec, backend=None):
+    """
+    スペック1件からPDFを作成してバイト列を返す（ライブラリとして使う場合の入口）
+    入力チェックでエラーになった場合は ValueError
+    """
+    normalized, errors = normalize_spec(spec)
+    if errors:
+        raise ValueError('\n'.join(errors))
+    return create_schedule_pdf(resolve_month(*normalized), backend).getvalue()
+
+
+def spec_filename(spec, source, index):
+    """出力ファイル名（output の指定がなければ年月と利用者名から作る）"""
+    if spec.get('output'):
+        return spec['output']
+    name = spec.get('patient') or f"{os.path.splitext(os.path.basename(source))[0].strip('<>')}_{index:04d}"
+    return output_filename(spec['year'], spec['month'], str(name))
+
+
+def main(argv=None, stdin=None):
+    parser = argparse.ArgumentParser(description="スペック（JSON/YAML）からリハビリ訪問予定表PDFを作成")
+    parser.add_argument('specs', nargs='+', help="スペックファイル（- で標準入力）")
+    parser.add_argument('--out-dir', default='.', help="PDFの出力ディレクトリ（デフォルト: カレントディレクトリ）")
+    parser.add_argument('--backend', choices=PDF_BACKENDS, default=DEFAULT_BACKEND,
+                        help="PDFの描画方法（native はmatplotlibを使わず高速）")
+    parser.add_argument('--fonttype', type=int, choices=PDF_FONTTYPES,
+                        help="フォントの埋め込み方（3: Type 3、42: TrueTypeのサブセット。matplotlibのみ）")
+    parser.add_argument('--compression', type=int, choices=range(10), metavar='0-9', help="圧縮レベル")
+    parser.add_argument('--check', action='store_true', help="入力チェックだけ行い、PDFは作成しない")
+    parser.add_argument('--quiet', '-q', action='store_true', help="作成したファイル名を表示しない")
+    args = parser.parse_args(argv)
+    configure_pdf(args.fonttype, args.compression)
+
+    try:
+        loaded = load_specs(args.specs, stdin)
+    except SpecError as e:
+        print(f"エラー: {e}", file=sys.stderr)
+        return EXIT_INPUT_ERROR
+
+    start = time.perf_counter()
+    invalid = written = 0
+    for source, index, spec in loaded:
+        normalized, errors = normalize_spec(spec)
+        if errors:
+            invalid += 1
+            for message in errors:
+                print(f"{source}#{index}: {message}", file=sys.stderr)
+            continue
+        if args.check:
+            continue
+
+        path = os.path.join(args.out_dir, spec_filename(spec, source, index))
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(create_schedule_pdf(resolve_month(*normalized), args.backend).getvalue())
+        written += 1
+        if not args.quiet:
+            print(path)
+    elapsed = time.perf_counter() - start
+
+    summary = f"{len(loaded)}件中 エラー{invalid}件"
+    if not args.check:
+        summary += f" / {written}件作成 {elapsed:.2f}秒"
+        if written:
+            summary += f"（1件あたり {elapsed / written * 1000:.1f} ms）"
+    print(summary, file=sys.stderr)
+    return EXIT_INVALID if invalid else EXIT_OK
+
+
+if __name__ == '__main__':
+    sys.exit(main())
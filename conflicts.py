@@ -0,0 +1,93 @@
+"""担当者ごとの訪問の重なりチェック（ケースロード全体）
+
+ケースロードの全員分の定期訪問・振替訪問を、(担当者, 日) ごとに開始時刻でソートした区間のリストに入れておく。
+ある時間帯と重なる訪問は、二分探索で「開始が (終了 - 最長の訪問時間) 以降、終了より前」の範囲だけを見れば見つかる。
+1か月数千件の訪問でも、1件のチェックはマイクロ秒単位で終わる。
+"""
+from bisect import bisect_left, insort
+from collections import defaultdict, namedtuple
+
+from schedule import parse_time_range, resolve_month
+
+# start / end は0時からの分。kind は 'regular'（定期訪問）か 'makeup'（振替訪問）
+Visit = namedtuple('Visit', 'therapist patient day start end kind')
+
+
+def month_visits(schedule, patient, therapist=''):
+    """1か月分の予定（MonthSchedule）を、休みを除いた訪問のリストにする"""
+    visits = []
+    for day in range(1, schedule.num_days + 1):
+        for slot in schedule.regular_slots(day):
+            start, end = parse_time_range(slot['time'])
+            visits.append(Visit(therapist, patient, day, start, end, 'regular'))
+        if schedule.is_makeup(day):
+            start, end = parse_time_range(schedule.makeup[day])
+            visits.append(Visit(therapist, patient, day, start, end, 'makeup'))
+    return visits
+
+
+def caseload_visits(year, month, patients):
+    """batch.read_caseload の利用者リストから、全員分の訪問を作る"""
+    visits = []
+    for patient in patients:
+        schedule = resolve_month(year, month, patient['slots'], patient['transfers'])
+        visits.extend(month_visits(schedule, patient['patient'], patient.get('therapist', '')))
+    return visits
+
+
+class ConflictIndex:
+    """(担当者, 日) ごとに開始時刻でソートした訪問の区間"""
+
+    def __init__(self, visits=()):
+        self._buckets = defaultdict(list)  # (担当者, 日) → [(開始, 終了, 利用者, 種類), ...]
+        self._longest = defaultdict(int)   # (担当者, 日) → 最長の訪問時間（分）
+        self.size = 0
+        # まとめて入れるときは1件ずつinsortせず、最後に1回ソートする
+        for visit in visits:
+            key = (visit.therapist, visit.day)
+            self._buckets[key].append((visit.start, visit.end, visit.patient, visit.kind))
+            self._longest[key] = max(self._longest[key], visit.end - visit.start)
+            self.size += 1
+        for bucket in self._buckets.values():
+            bucket.sort()
+
+    def add(self, visit):
+        key = (visit.therapist, visit.day)
+        insort(self._buckets[key], (visit.start, visit.end, visit.patient, visit.kind))
+        self._longest[key] = max(self._longest[key], visit.end - visit.start)
+        self.size += 1
+
+    def overlapping(self, therapist, day, start, end, exclude_patient=None):
+        """[start, end) と重なる訪問のリスト（exclude_patient の訪問は除く）"""
+        key = (therapist, day)
+        bucket = self._buckets.get(key)
+        if not bucket:
+            return []
+        # 開始が start - 最長の訪問時間 より前の訪問は、start までに必ず終わっている
+        lo = bisect_left(bucket, (start - self._longest[key],))
+        hi = bisect_left(bucket, (end,))
+        return [Visit(therapist, p, day, s, e, k)
+                for s, e, p, k in bucket[lo:hi]
+                if e > start and p != exclude_patient]
+
+    def conflicts(self):
+        """
+        重なっている訪問の組をすべて返す（日ごとのスイープライン）
+        [(訪問, 訪問), ...]（同じ利用者どうしの重なりも含む）
+        """
+        pairs = []
+        for (therapist, day), bucket in sorted(self._buckets.items()):
+            active = []  # 今の開始時刻の時点でまだ終わっていない訪問
+            for s, e, p, k in bucket:
+                active = [a for a in active if a[1] > s]
+                visit = Visit(therapist, p, day, s, e, k)
+                pairs.extend((Visit(therapist, a[2], day, a[0], a[1], a[3]), visit) for a in active)
+                active.append((s, e, p, k))
+        return pairs
+
+
+def format_visit(visit):
+    """'12日 11:00-11:40 山田 太郎（振替）' のような表示用の文字列"""
+    kind = '振替' if visit.kind == 'makeup' else '定期'
+    return (f"{visit.day}日 {visit.start // 60}:{visit.start % 60:02d}-{visit.end // 60}:{visit.end % 60:02d} "
+            f"{visit.patient}（{kind}）")
@@ -0,0 +1,181 @@
+"""日本の祝日表（scripts/gen_holidays.py で生成。手で編集しない）
+
+1955〜2099年。HOLIDAYS[年] は「月日4桁 + HOLIDAY_NAMES の番号（36進1文字）」を並べた文字列
+"""
+FIRST_YEAR = 1955
+LAST_YEAR = 2099
+
+HOLIDAY_NAMES = (
+    "こどもの日",
+    "みどりの日",
+    "スポーツの日",
+    "体育の日",
+    "元日",
+    "勤労感謝の日",
+    "即位礼正殿の儀",
+    "国民の休日",
+    "天皇の即位の日",
+    "天皇誕生日",
+    "山の日",
+    "建国記念の日",
+    "憲法記念日",
+    "成人の日",
+    "振替休日",
+    "敬老の日",
+    "文化の日",
+    "春分の日",
+    "昭和の日",
+    "昭和天皇の大喪の礼",
+    "海の日",
+    "皇太子徳仁親王の結婚の儀",
+    "皇太子明仁親王の結婚の儀",
+    "秋分の日",
+)
+
+HOLIDAYS = {
+    1955: '010140115d0321h042990503c050500924n1103g11235',
+    1956: '010140115d0321h042990503c050500923n1103g11235',
+    1957: '010140115d0321h042990503c050500923n1103g11235',
+    1958: '010140115d0321h042990503c050500923n1103g11235',
+    1959: '010140115d0321h0410m042990503c050500924n1103g11235',
+    1960: '010140115d0320h042990503c050500923n1103g11235',
+    1961: '010140115d0321h042990503c050500923n1103g11235',
+    1962: '010140115d0321h042990503c050500923n1103g11235',
+    1963: '010140115d0321h042990503c050500924n1103g11235',
+    1964: '010140115d0320h042990503c050500923n1103g11235',
+    1965: '010140115d0321h042990503c050500923n1103g11235',
+    1966: '010140115d0321h042990503c050500915f0923n101031103g11235',
+    1967: '010140115d0211b0321h042990503c050500915f0924n101031103g11235',
+    1968: '010140115d0211b0320h042990503c050500915f0923n101031103g11235',
+    1969: '010140115d0211b0321h042990503c050500915f0923n101031103g11235',
+    1970: '010140115d0211b0321h042990503c050500915f0923n101031103g11235',
+    1971: '010140115d0211b0321h042990503c050500915f0924n101031103g11235',
+    1972: '010140115d0211b0320h042990503c050500915f0923n101031103g11235',
+    1973: '010140115d0211b0321h042990430e0503c050500915f0923n0924e101031103g11235',
+    1974: '010140115d0211b0321h042990503c050500506e0915f0916e0923n101031103g1104e11235',
+    1975: '010140115d0211b0321h042990503c050500915f0924n101031103g112351124e',
+    1976: '010140115d0211b0320h042990503c050500915f0923n101031011e1103g11235',
+    1977: '010140115d0211b0321h042990503c050500915f0923n101031103g11235',
+    1978: '010140102e0115d0116e0211b0321h042990503c050500915f0923n101031103g11235',
+    1979: '010140115d0211b0212e0321h042990430e0503c050500915f0924n101031103g11235',
+    1980: '010140115d0211b0320h042990503c050500915f0923n101031103g112351124e',
+    1981: '010140115d0211b0321h042990503c0504e050500915f0923n101031103g11235',
+    1982: '010140115d0211b0321h0322e042990503c050500915f0923n101031011e1103g11235',
+    1983: '010140115d0211b0321h042990503c050500915f0923n101031103g11235',
+    1984: '010140102e0115d0116e0211b0320h042990430e0503c050500915f0923n0924e101031103g11235',
+    1985: '010140115d0211b0321h042990503c050500506e0915f0916e0923n101031103g1104e11235',
+    1986: '010140115d0211b0321h042990503c050500915f0923n101031103g112351124e',
+    1987: '010140115d0211b0321h042990503c05047050500915f0923n101031103g11235',
+    1988: '010140115d0211b0320h0321e042990503c05047050500915f0923n101031103g11235',
+    1989: '010140102e0115d0116e0211b0224j0321h042910503c05047050500915f0923n101031103g1123512239',
+    1990: '010140115d0211b0212e0321h042910430e0503c05047050500915f0923n0924e101031103g1112611235122391224e',
+    1991: '010140115d0211b0321h042910503c05047050500506e0915f0916e0923n101031103g1104e1123512239',
+    1992: '010140115d0211b0320h042910503c05047050500915f0923n101031103g1123512239',
+    1993: '010140115d0211b0320h042910503c05047050500609l0915f0923n101031011e1103g1123512239',
+    1994: '010140115d0211b0321h042910503c05047050500915f0923n101031103g1123512239',
+    1995: '010140102e0115d0116e0211b0321h042910503c05047050500915f0923n101031103g1123512239',
+    1996: '010140115d0211b0212e0320h042910503c05047050500506e0720k0915f0916e0923n101031103g1104e1123512239',
+    1997: '010140115d0211b0320h042910503c050500720k0721e0915f0923n101031103g112351124e12239',
+    1998: '010140115d0211b0321h042910503c05047050500720k0915f0923n101031103g1123512239',
+    1999: '010140115d0211b0321h0322e042910503c05047050500720k0915f0923n101031011e1103g1123512239',
+    2000: '010140110d0211b0320h042910503c05047050500720k0915f0923n100931103g1123512239',
+    2001: '010140108d0211b0212e0320h042910430e0503c05047050500720k0915f0923n0924e100831103g11235122391224e',
+    2002: '010140114d0211b0321h042910503c05047050500506e0720k0915f0916e0923n101431103g1104e1123512239',
+    2003: '010140113d0211b0321h042910503c050500721k0915f0923n101331103g112351124e12239',
+    2004: '010140112d0211b0320h042910503c05047050500719k0920f0923n101131103g1123512239',
+    2005: '010140110d0211b0320h0321e042910503c05047050500718k0919f0923n101031103g1123512239',
+    2006: '010140102e0109d0211b0321h042910503c05047050500717k0918f0923n100931103g1123512239',
+    2007: '010140108d0211b0212e0321h0429i0430e0503c05041050500716k0917f0923n0924e100831103g11235122391224e',
+    2008: '010140114d0211b0320h0429i0503c05041050500506e0721k0915f0923n101331103g112351124e12239',
+    2009: '010140112d0211b0320h0429i0503c05041050500506e0720k0921f092270923n101231103g1123512239',
+    2010: '010140111d0211b0321h0322e0429i0503c05041050500719k0920f0923n101131103g1123512239',
+    2011: '010140110d0211b0321h0429i0503c05041050500718k0919f0923n101031103g1123512239',
+    2012: '010140102e0109d0211b0320h0429i0430e0503c05041050500716k0917f0922n100831103g11235122391224e',
+    2013: '010140114d0211b0320h0429i0503c05041050500506e0715k0916f0923n101431103g1104e1123512239',
+    2014: '010140113d0211b0321h0429i0503c05041050500506e0721k0915f0923n101331103g112351124e12239',
+    2015: '010140112d0211b0321h0429i0503c05041050500506e0720k0921f092270923n101231103g1123512239',
+    2016: '010140111d0211b0320h0321e0429i0503c05041050500718k0811a0919f0922n101031103g1123512239',
+    2017: '010140102e0109d0211b0320h0429i0503c05041050500717k0811a0918f0923n100931103g1123512239',
+    2018: '010140108d0211b0212e0321h0429i0430e0503c05041050500716k0811a0917f0923n0924e100831103g11235122391224e',
+    2019: '010140114d0211b0321h0429i0430705018050270503c05041050500506e0715k0811a0812e0916f0923n10143102261103g1104e11235',
+    2020: '010140113d0211b022390224e0320h0429i0503c05041050500506e0723k072420810a0921f0922n1103g11235',
+    2021: '010140111d0211b022390320h0429i0503c05041050500722k072320808a0809e0920f0923n1103g11235',
+    2022: '010140110d0211b022390321h0429i0503c05041050500718k0811a0919f0923n101021103g11235',
+    2023: '010140102e0109d0211b022390321h0429i0503c05041050500717k0811a0918f0923n100921103g11235',
+    2024: '010140108d0211b0212e022390320h0429i0503c05041050500506e0715k0811a0812e0916f0922n0923e101421103g1104e11235',
+    2025: '010140113d0211b022390224e0320h0429i0503c05041050500506e0721k0811a0915f0923n101321103g112351124e',
+    2026: '010140112d0211b022390320h0429i0503c05041050500506e0720k0811a0921f092270923n101221103g11235',
+    2027: '010140111d0211b022390321h0322e0429i0503c05041050500719k0811a0920f0923n101121103g11235',
+    2028: '010140110d0211b022390320h0429i0503c05041050500717k0811a0918f0922n100921103g11235',
+    2029: '010140108d0211b0212e022390320h0429i0430e0503c05041050500716k0811a0917f0923n0924e100821103g11235',
+    2030: '010140114d0211b022390320h0429i0503c05041050500506e0715k0811a0812e0916f0923n101421103g1104e11235',
+    2031: '010140113d0211b022390224e0321h0429i0503c05041050500506e0721k0811a0915f0923n101321103g112351124e',
+    2032: '010140112d0211b022390320h0429i0503c05041050500719k0811a0920f092170922n101121103g11235',
+    2033: '010140110d0211b022390320h0321e0429i0503c05041050500718k0811a0919f0923n101021103g11235',
+    2034: '010140102e0109d0211b022390320h0429i0503c05041050500717k0811a0918f0923n100921103g11235',
+    2035: '010140108d0211b0212e022390321h0429i0430e0503c05041050500716k0811a0917f0923n0924e100821103g11235',
+    2036: '010140114d0211b022390320h0429i0503c05041050500506e0721k0811a0915f0922n101321103g112351124e',
+    2037: '010140112d0211b022390320h0429i0503c05041050500506e0720k0811a0921f092270923n101221103g11235',
+    2038: '010140111d0211b022390320h0429i0503c05041050500719k0811a0920f0923n101121103g11235',
+    2039: '010140110d0211b022390321h0429i0503c05041050500718k0811a0919f0923n101021103g11235',
+    2040: '010140102e0109d0211b022390320h0429i0430e0503c05041050500716k0811a0917f0922n100821103g11235',
+    2041: '010140114d0211b022390320h0429i0503c05041050500506e0715k0811a0812e0916f0923n101421103g1104e11235',
+    2042: '010140113d0211b022390224e0320h0429i0503c05041050500506e0721k0811a0915f0923n101321103g112351124e',
+    2043: '010140112d0211b022390321h0429i0503c05041050500506e0720k0811a0921f092270923n101221103g11235',
+    2044: '010140111d0211b022390320h0321e0429i0503c05041050500718k0811a0919f0922n101021103g11235',
+    2045: '010140102e0109d0211b022390320h0429i0503c05041050500717k0811a0918f0922n100921103g11235',
+    2046: '010140108d0211b0212e022390320h0429i0430e0503c05041050500716k0811a0917f0923n0924e100821103g11235',
+    2047: '010140114d0211b022390321h0429i0503c05041050500506e0715k0811a0812e0916f0923n101421103g1104e11235',
+    2048: '010140113d0211b022390224e0320h0429i0503c05041050500506e0720k0811a0921f0922n101221103g11235',
+    2049: '010140111d0211b022390320h0429i0503c05041050500719k0811a0920f092170922n101121103g11235',
+    2050: '010140110d0211b022390320h0321e0429i0503c05041050500718k0811a0919f0923n101021103g11235',
+    2051: '010140102e0109d0211b022390321h0429i0503c05041050500717k0811a0918f0923n100921103g11235',
+    2052: '010140108d0211b0212e022390320h0429i0503c05041050500506e0715k0811a0812e0916f0922n0923e101421103g1104e11235',
+    2053: '010140113d0211b022390224e0320h0429i0503c05041050500506e0721k0811a0915f0922n101321103g112351124e',
+    2054: '010140112d0211b022390320h0429i0503c05041050500506e0720k0811a0921f092270923n101221103g11235',
+    2055: '010140111d0211b022390321h0322e0429i0503c05041050500719k0811a0920f0923n101121103g11235',
+    2056: '010140110d0211b022390320h0429i0503c05041050500717k0811a0918f0922n100921103g11235',
+    2057: '010140108d0211b0212e022390320h0429i0430e0503c05041050500716k0811a0917f0922n100821103g11235',
+    2058: '010140114d0211b022390320h0429i0503c05041050500506e0715k0811a0812e0916f0923n101421103g1104e11235',
+    2059: '010140113d0211b022390224e0320h0429i0503c05041050500506e0721k0811a0915f0923n101321103g112351124e',
+    2060: '010140112d0211b022390320h0429i0503c05041050500719k0811a0920f092170922n101121103g11235',
+    2061: '010140110d0211b022390320h0321e0429i0503c05041050500718k0811a0919f0922n101021103g11235',
+    2062: '010140102e0109d0211b022390320h0429i0503c05041050500717k0811a0918f0923n100921103g11235',
+    2063: '010140108d0211b0212e022390320h0429i0430e0503c05041050500716k0811a0917f0923n0924e100821103g11235',
+    2064: '010140114d0211b022390320h0429i0503c05041050500506e0721k0811a0915f0922n101321103g112351124e',
+    2065: '010140112d0211b022390320h0429i0503c05041050500506e0720k0811a0921f0922n101221103g11235',
+    2066: '010140111d0211b022390320h0429i0503c05041050500719k0811a0920f0923n101121103g11235',
+    2067: '010140110d0211b022390320h0321e0429i0503c05041050500718k0811a0919f0923n101021103g11235',
+    2068: '010140102e0109d0211b022390320h0429i0430e0503c05041050500716k0811a0917f0922n100821103g11235',
+    2069: '010140114d0211b022390320h0429i0503c05041050500506e0715k0811a0812e0916f0922n0923e101421103g1104e11235',
+    2070: '010140113d0211b022390224e0320h0429i0503c05041050500506e0721k0811a0915f0923n101321103g112351124e',
+    2071: '010140112d0211b022390320h0429i0503c05041050500506e0720k0811a0921f092270923n101221103g11235',
+    2072: '010140111d0211b022390320h0321e0429i0503c05041050500718k0811a0919f0922n101021103g11235',
+    2073: '010140102e0109d0211b022390320h0429i0503c05041050500717k0811a0918f0922n100921103g11235',
+    2074: '010140108d0211b0212e022390320h0429i0430e0503c05041050500716k0811a0917f0923n0924e100821103g11235',
+    2075: '010140114d0211b022390320h0429i0503c05041050500506e0715k0811a0812e0916f0923n101421103g1104e11235',
+    2076: '010140113d0211b022390224e0320h0429i0503c05041050500506e0720k0811a0921f0922n101221103g11235',
+    2077: '010140111d0211b022390320h0429i0503c05041050500719k0811a0920f092170922n101121103g11235',
+    2078: '010140110d0211b022390320h0321e0429i0503c05041050500718k0811a0919f0922n101021103g11235',
+    2079: '010140102e0109d0211b022390320h0429i0503c05041050500717k0811a0918f0923n100921103g11235',
+    2080: '010140108d0211b0212e022390320h0429i0503c05041050500506e0715k0811a0812e0916f0922n0923e101421103g1104e11235',
+    2081: '010140113d0211b022390224e0320h0429i0503c05041050500506e0721k0811a0915f0922n101321103g112351124e',
+    2082: '010140112d0211b022390320h0429i0503c05041050500506e0720k0811a0921f0922n101221103g11235',
+    2083: '010140111d0211b022390320h0429i0503c05041050500719k0811a0920f0923n101121103g11235',
+    2084: '010140110d0211b022390320h0429i0503c05041050500717k0811a0918f0922n100921103g11235',
+    2085: '010140108d0211b0212e022390320h0429i0430e0503c05041050500716k0811a0917f0922n100821103g11235',
+    2086: '010140114d0211b022390320h0429i0503c05041050500506e0715k0811a0812e0916f0922n0923e101421103g1104e11235',
+    2087: '010140113d0211b022390224e0320h0429i0503c05041050500506e0721k0811a0915f0923n101321103g112351124e',
+    2088: '010140112d0211b022390320h0429i0503c05041050500719k0811a0920f092170922n101121103g11235',
+    2089: '010140110d0211b022390320h0321e0429i0503c05041050500718k0811a0919f0922n101021103g11235',
+    2090: '010140102e0109d0211b022390320h0429i0503c05041050500717k0811a0918f0922n100921103g11235',
+    2091: '010140108d0211b0212e022390320h0429i0430e0503c05041050500716k0811a0917f0923n0924e100821103g11235',
+    2092: '010140114d0211b022390319h0429i0503c05041050500506e0721k0811a0915f0922n101321103g112351124e',
+    2093: '010140112d0211b022390320h0429i0503c05041050500506e0720k0811a0921f0922n101221103g11235',
+    2094: '010140111d0211b022390320h0429i0503c05041050500719k0811a0920f092170922n101121103g11235',
+    2095: '010140110d0211b022390320h0321e0429i0503c05041050500718k0811a0919f0923n101021103g11235',
+    2096: '010140102e0109d0211b022390319h0429i0430e0503c05041050500716k0811a0917f0922n100821103g11235',
+    2097: '010140114d0211b022390320h0429i0503c05041050500506e0715k0811a0812e0916f0922n0923e101421103g1104e11235',
+    2098: '010140113d0211b022390224e0320h0429i0503c05041050500506e0721k0811a0915f0922n101321103g112351124e',
+    2099: '010140112d0211b022390320h0429i0503c05041050500506e0720k0811a0921f092270923n101221103g11235',
+}
@@ -0,0 +1,234 @@
+"""訪問予定のiCalendar（.ics）書き出し（標準ライブラリのみ）
+
+解決済みの1か月分の予定（schedule.MonthSchedule）から、次の VEVENT を作る。
+  定期訪問   休みでない定期訪問の枠ごとに1件
+  振替訪問   振替1件ごとに1件（説明に振替元の日）
+  休み       休みになった定期訪問（振替元・祝日）。定期訪問と同じ UID で STATUS:CANCELLED にするので、
+             購読しているカレンダーでは元の予定が「キャンセル」に変わる
+UID は利用者名・日付・時刻（振替訪問は振替元の日付）から作るので、作り直しても同じ予定は同じ UID になる。
+
+1人分・ケースロード全体・担当者ごとのどれでも、月ごと・1件ごとに文字列を返すジェネレータで作るので、
+1年分・数百人分でも全体をメモリに持たずに書き出せる。
+
+使い方:
+    python ics_export.py caseload.csv --start 2025-10 --end 2026-03 --out 訪問予定.ics
+    python ics_export.py --db rehab_calendar.db --start 2025-04 --end 2026-03 --therapist 担当A --out 担当A.ics
+    python ics_export.py --db rehab_calendar.db --start 2025-10 --end 2025-10 --patient "山田 太郎" --out -
+
+CSVの transfers は --start の月の振替として扱う（batch.py の --year / --month と同じ）。
+データベースからは月ごとに保存されている振替を使う。
+"""
+import argparse
+import hashlib
+import sys
+from datetime import datetime, timezone
+
+from schedule import WEEKDAY_SHORT, month_range, parse_time_range, resolve_month
+
+PRODID = '-//rehab-calendar//訪問リハビリ予定表//JA'
+TZID = 'Asia/Tokyo'
+UID_DOMAIN = 'rehab-calendar'
+
+# 日本は夏時間がないので、標準時だけの VTIMEZONE で足りる
+VTIMEZONE = (
+    'BEGIN:VTIMEZONE\r\n'
+    f'TZID:{TZID}\r\n'
+    'BEGIN:STANDARD\r\n'
+    'DTSTART:19700101T000000\r\n'
+    'TZOFFSETFROM:+0900\r\n'
+    'TZOFFSETTO:+0900\r\n'
+    'TZNAME:JST\r\n'
+    'END:STANDARD\r\n'
+    'END:VTIMEZONE\r\n'
+)
+
+_ESCAPES = str.maketrans({'\\': '\\\\', ';': '\\;', ',': '\\,', '\n': '\\n'})
+
+
+def escape_text(text):
+    """TEXT型の値のエスケープ（\\ ; , 改行）"""
+    return text.translate(_ESCAPES)
+
+
+def fold(line):
+    """75オクテットを超える行を折り返す（UTF-8の文字の途中では切らない）"""
+    data = line.encode('utf-8')
+    if len(data) <= 75:
+        return line + '\r\n'
+    parts = []
+    start = 0
+    limit = 75
+    while len(data) - start > limit:
+        end = start + limit
+        while data[end] & 0xC0 == 0x80:  # 続きのバイトなら文字の先頭まで戻る
+            end -= 1
+        parts.append(data[start:end].decode('utf-8'))
+        start = end
+        limit = 74  # 2行目以降は先頭の空白の分だけ短くする
+    parts.append(data[start:].decode('utf-8'))
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def patient_id(patient):
+    """UID に使う利用者の識別子（名前のハッシュ）"""
+    return hashlib.sha1(patient.encode('utf-8')).hexdigest()[:12]
+
+
+def format_stamp(moment=None):
+    """DTSTAMP の値（UTC）"""
+    return (moment or datetime.now(timezone.utc)).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _event(uid, stamp, date, start, end, summary, description='', canceled=False):
+    # 折り返しが必要になりうるのは件名と説明だけ（ほかは英数字で75オクテットに収まる）
+    text = (
+        f'BEGIN:VEVENT\r\nUID:{uid}\r\nDTSTAMP:{stamp}\r\n'
+        f'DTSTART;TZID={TZID}:{date}T{start // 60:02d}{start % 60:02d}00\r\n'
+        f'DTEND;TZID={TZID}:{date}T{end // 60:02d}{end % 60:02d}00\r\n'
+        + fold(f'SUMMARY:{escape_text(summary)}')
+    )
+    if description:
+        text += fold(f'DESCRIPTION:{escape_text(description)}')
+    if canceled:
+        # 元の予定より新しい版として扱われるように SEQUENCE を上げる
+        text += 'STATUS:CANCELLED\r\nSEQUENCE:1\r\n'
+    return text + 'END:VEVENT\r\n'
+
+
+def month_events(schedule, patient='', therapist='', stamp=None, show_patient=True):
+    """
+    1か月分の予定の VEVENT を日付順に返す（ジェネレータ。1件ごとに文字列）
+    show_patient=True なら件名に利用者名を入れる（担当者・ケースロード全体のカレンダー用）
+    """
+    stamp = stamp or format_stamp()
+    pid = patient_id(patient)
+    year, month = schedule.year, schedule.month
+    label = f"訪問リハビリ（{patient}）" if patient and show_patient else "訪問リハビリ"
+    who = f"担当: {therapist}" if therapist else ''
+    times = [parse_time_range(slot['time']) for slot in schedule.slots]
+    # 振替元の日 → 振替（休みの説明と振替訪問の説明に使う）
+    transfers = {from_day: (to_day, time_range) for from_day, to_day, time_range in schedule.transfers}
+    makeup_from = {to_day: from_day for from_day, (to_day, _) in transfers.items()}
+
+    for day in range(1, schedule.num_days + 1):
+        date = f'{year:04d}{month:02d}{day:02d}'
+        mask = schedule.slot_mask[day]
+        canceled = schedule.is_canceled(day)
+        for i, (start, end) in enumerate(times):
+            if not mask >> i & 1:
+                continue
+            uid = f'r{date}{start // 60:02d}{start % 60:02d}-{pid}@{UID_DOMAIN}'
+            if not canceled:
+                yield _event(uid, stamp, date, start, end, label, who)
+                continue
+            if day in transfers:
+                to_day, time_range = transfers[day]
+                reason = f"{to_day}日（{WEEKDAY_SHORT[_weekday(year, month, to_day)]}）{time_range} に振替"
+            else:
+                reason = schedule.holiday_name(day) or "休み"
+            yield _event(uid, stamp, date, start, end, f"お休み: {label}", reason, canceled=True)
+        if schedule.is_makeup(day):
+            start, end = parse_time_range(schedule.makeup[day])
+            from_day = makeup_from.get(day, day)
+            uid = f'm{year:04d}{month:02d}{from_day:02d}-{pid}@{UID_DOMAIN}'
+            note = f"{from_day}日（{WEEKDAY_SHORT[_weekday(year, month, from_day)]}）の振替"
+            yield _event(uid, stamp, date, start, end, f"振替訪問: {label}", '\n'.join(filter(None, [note, who])))
+
+
+def _weekday(year, month, day):
+    return datetime(year, month, day).weekday()
+
+
+def iter_calendar(entries, name=None, stamp=None, show_patient=True):
+    """
+    VCALENDAR全体を少しずつ返す（ジェネレータ）
+    entries は (MonthSchedule, 利用者名, 担当者) を順に返すもの（ジェネレータでよい）
+    """
+    stamp = stamp or format_stamp()
+    header = ['BEGIN:VCALENDAR', 'VERSION:2.0', f'PRODID:{PRODID}', 'CALSCALE:GREGORIAN', 'METHOD:PUBLISH',
+              f'X-WR-TIMEZONE:{TZID}']
+    if name:
+        header.append(f'X-WR-CALNAME:{escape_text(name)}')
+    yield ''.join(fold(line) for line in header) + VTIMEZONE
+    for schedule, patient, therapist in entries:
+        yield from month_events(schedule, patient, therapist, stamp, show_patient)
+    yield 'END:VCALENDAR\r\n'
+
+
+def caseload_entries(months, load_month, therapist=None, patient=None):
+    """
+    月ごとに load_month(年, 月)（batch.read_caseload と同じ形式のリストを返す）を呼び、
+    担当者・利用者で絞り込んだ (MonthSchedule, 利用者名, 担当者) を返す（ジェネレータ）
+    """
+    for year, month in months:
+        for entry in load_month(year, month):
+            if therapist is not None and entry.get('therapist', '') != therapist:
+                continue
+            if patient is not None and entry['patient'] != patient:
+                continue
+            schedule = resolve_month(year, month, entry['slots'], entry['transfers'])
+            yield schedule, entry['patient'], entry.get('therapist', '')
+
+
+def write_ics(chunks, out):
+    """iter_calendar の出力をバイナリのファイルに書き込む。書き込んだ VEVENT の数を返す"""
+    events = 0
+    for chunk in chunks:
+        out.write(chunk.encode('utf-8'))
+        events += chunk.startswith('BEGIN:VEVENT')
+    return events
+
+
+def parse_month(text):
+    """'2025-10' → (2025, 10)"""
+    year, _, month = text.partition('-')
+    year, month = int(year), int(month)
+    if not 1 <= month <= 12:
+        raise ValueError(f"月が正しくありません: {text}")
+    return year, month
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="訪問予定をiCalendar（.ics）に書き出す")
+    parser.add_argument('caseload', nargs='?', help="ケースロードCSVファイル")
+    parser.add_argument('--db', help="CSVの代わりに、アプリで保存したデータベース（SQLite）から読み込む")
+    parser.add_argument('--start', type=parse_month, required=True, help="最初の月（例: 2025-10）")
+    parser.add_argument('--end', type=parse_month, help="最後の月（省略時は --start と同じ）")
+    parser.add_argument('--therapist', help="この担当者の利用者だけ")
+    parser.add_argument('--patient', help="この利用者だけ（件名に利用者名を入れない）")
+    parser.add_argument('--name', help="カレンダーの名前（X-WR-CALNAME）")
+    parser.add_argument('--out', default='-', help="出力先（- なら標準出力）")
+    args = parser.parse_args(argv)
+    if (args.caseload is None) == (args.db is None):
+        parser.error("ケースロードCSVか --db のどちらか一方を指定してください")
+    months = month_range(args.start, args.end or args.start)
+    if not months:
+        parser.error("--end が --start より前です")
+
+    if args.db:
+        from store import ScheduleStore
+        load_month = ScheduleStore(args.db).load_month
+    else:
+        from batch import read_caseload
+        patients = read_caseload(args.caseload)
+        no_transfers = [dict(p, transfers=[]) for p in patients]
+
+        def load_month(year, month):
+            return patients if (year, month) == args.start else no_transfers
+
+    entries = caseload_entries(months, load_month, args.therapist, args.patient)
+    name = args.name or args.patient or (f"訪問リハビリ（{args.therapist}）" if args.therapist else "訪問リハビリ")
+
+    out = sys.stdout.buffer if args.out == '-' else open(args.out, 'wb')
+    try:
+        # 1人分のカレンダーでは件名に利用者名を入れない
+        events = write_ics(iter_calendar(entries, name, show_patient=not args.patient), out)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+    print(f"{len(months)}か月・{events}件の予定を書き出しました", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
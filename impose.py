@@ -0,0 +1,194 @@
+"""面付け（1枚の用紙に2人分・4人分の予定表を並べて印刷する）
+
+予定表の1ページ（A4横）をフォームXObjectにして、用紙のページから縮小して配置する。
+ページは1回だけ描き、描いたものを置くだけなので、面付けのために描き直すことはない
+（--copies で同じ予定表を複数回置く場合も、フォームは1つ）。
+  2面: A4縦に上下2つ（縮小率 約71%）
+  4面: A4横に2×2（縮小率 約50%）
+それぞれの予定表の四隅の外側にトンボ（裁断の目印）を入れる。
+
+native バックエンドは NativePdfDocument(nup=...) で書き出すときにフォームにする（フォントの埋め込みは1回）。
+matplotlib で作ったPDFや、作成済みのPDFは impose_pdfs で面付けする（pypdf が必要）。
+
+使い方:
+    python impose.py 2025年10月.pdf --nup 4 --out 2025年10月_4面.pdf
+    python impose.py 2025年10月.pdf --nup 2 --copies 2 --out 控え付き.pdf
+"""
+import argparse
+import io
+import sys
+import time
+
+try:
+    from pypdf import PdfReader, PdfWriter
+    from pypdf.generic import ArrayObject, DecodedStreamObject, DictionaryObject, FloatObject, NameObject
+except ImportError:
+    PdfReader = PdfWriter = None
+
+# A4（ポイント単位）
+A4_PORTRAIT = (595, 842)
+A4_LANDSCAPE = (842, 595)
+
+# 面数 → (用紙の大きさ, 列数, 行数)
+LAYOUTS = {
+    2: (A4_PORTRAIT, 1, 2),
+    4: (A4_LANDSCAPE, 2, 2),
+}
+
+SHEET_MARGIN = 24   # 用紙の端からの余白（トンボを入れる分）
+GUTTER = 20         # 予定表どうしの間隔
+MARK_OFFSET = 2     # トンボと予定表の角の間隔
+MARK_LENGTH = 7     # トンボの長さ（間隔の半分に収まるようにする）
+
+
+def sheet_layout(nup, page_size):
+    """
+    nup 面付けの (用紙の大きさ, [(x, y, 縮小率), ...])
+    配置は左上から右へ、上から下への順（PDFの座標は左下が原点）
+    """
+    if nup not in LAYOUTS:
+        raise ValueError(f"面付けは {' / '.join(map(str, LAYOUTS))} 面のどれかです: {nup}")
+    (sheet_width, sheet_height), cols, rows = LAYOUTS[nup]
+    page_width, page_height = page_size
+    cell_width = (sheet_width - 2 * SHEET_MARGIN - (cols - 1) * GUTTER) / cols
+    cell_height = (sheet_height - 2 * SHEET_MARGIN - (rows - 1) * GUTTER) / rows
+    scale = min(cell_width / page_width, cell_height / page_height)
+    width, height = page_width * scale, page_height * scale
+    cells = []
+    for row in range(rows):
+        for col in range(cols):
+            # セルの中央に置く
+            x = SHEET_MARGIN + col * (cell_width + GUTTER) + (cell_width - width) / 2
+            top = sheet_height - SHEET_MARGIN - row * (cell_height + GUTTER)
+            y = top - cell_height + (cell_height - height) / 2
+            cells.append((x, y, scale))
+    return (sheet_width, sheet_height), cells
+
+
+def crop_marks(x, y, width, height):
+    """(x, y) から幅 width・高さ height の四隅の外側のトンボ（コンテンツストリームの演算子）"""
+    ops = []
+    for cx, dx in ((x, -1), (x + width, 1)):
+        for cy, dy in ((y, -1), (y + height, 1)):
+            near, far = MARK_OFFSET, MARK_OFFSET + MARK_LENGTH
+            ops.append(f"{cx + dx * near:.2f} {cy:.2f} m {cx + dx * far:.2f} {cy:.2f} l")
+            ops.append(f"{cx:.2f} {cy + dy * near:.2f} m {cx:.2f} {cy + dy * far:.2f} l")
+    return ops
+
+
+def sheet_content(placements, page_size, marks=True):
+    """
+    用紙1枚分のコンテンツストリーム
+    placements は [(フォームのリソース名, (x, y, 縮小率)), ...]
+    """
+    ops = []
+    page_width, page_height = page_size
+    for name, (x, y, scale) in placements:
+        ops.append(f"q {scale:.5f} 0 0 {scale:.5f} {x:.2f} {y:.2f} cm /{name} Do Q")
+    if marks:
+        ops.append("q 0.25 w 0 G")
+        for _, (x, y, scale) in placements:
+            ops.extend(crop_marks(x, y, page_width * scale, page_height * scale))
+        ops.append("S Q")
+    return '\n'.join(ops).encode('ascii')
+
+
+def sheet_count(pages, nup, copies=1):
+    """pages ページを nup 面付け・copies 部ずつ置いたときの用紙の枚数"""
+    return -(-pages * copies // nup)
+
+
+class PdfImposer:
+    """
+    作成済みのPDFのページを順に面付けする（pypdf を使う）
+    1人分ずつのPDFを add していけば、全員分を1つのPDFにまとめてから面付けする必要はない
+    """
+
+    def __init__(self, nup, copies=1, marks=True):
+        if PdfWriter is None:
+            raise RuntimeError("作成済みのPDFの面付けには pypdf が必要です（pip install pypdf）")
+        self.nup = nup
+        self.copies = copies
+        self.marks = marks
+        self.writer = PdfWriter()
+        self.pages = 0
+        self.sheets = 0
+        self._pending = []  # まだ用紙に置いていない (フォームの参照, ページの大きさ)
+
+    def add(self, pdf):
+        """PDF（バイト列・ファイル・PdfReader）の全ページを追加する"""
+        reader = pdf if isinstance(pdf, PdfReader) else PdfReader(io.BytesIO(pdf) if isinstance(pdf, bytes) else pdf)
+        for page in reader.pages:
+            form = self._page_form(page)
+            size = (float(page.mediabox.width), float(page.mediabox.height))
+            self.pages += 1
+            for _ in range(self.copies):
+                self._pending.append((form, size))
+                if len(self._pending) == self.nup:
+                    self._flush()
+
+    def _page_form(self, page):
+        """ページをフォームXObjectにする（リソースはそのまま引き継ぐ。同じPDFのフォントは1回だけコピーされる）"""
+        box = page.mediabox
+        form = DecodedStreamObject()
+        form.set_data(page.get_contents().get_data())
+        form.update({
+            NameObject('/Type'): NameObject('/XObject'),
+            NameObject('/Subtype'): NameObject('/Form'),
+            NameObject('/BBox'): ArrayObject(FloatObject(v) for v in (box.left, box.bottom, box.right, box.top)),
+            NameObject('/Resources'): page['/Resources'].clone(self.writer),
+        })
+        return self.writer._add_object(form.flate_encode())
+
+    def _flush(self):
+        if not self._pending:
+            return
+        page_size = self._pending[0][1]
+        (width, height), cells = sheet_layout(self.nup, page_size)
+        sheet = self.writer.add_blank_page(width, height)
+        xobjects = DictionaryObject()
+        placements = []
+        for i, ((form, _), cell) in enumerate(zip(self._pending, cells)):
+            xobjects[NameObject(f'/P{i}')] = form
+            placements.append((f'P{i}', cell))
+        sheet[NameObject('/Resources')] = DictionaryObject({NameObject('/XObject'): xobjects})
+        content = DecodedStreamObject()
+        content.set_data(sheet_content(placements, page_size, self.marks))
+        sheet[NameObject('/Contents')] = self.writer._add_object(content.flate_encode())
+        self._pending = []
+        self.sheets += 1
+
+    def write(self, out):
+        """残りのページを置いて書き出す（out はパスかバイナリのファイル）"""
+        self._flush()
+        self.writer.write(out)
+
+
+def impose_pdfs(pdfs, out, nup, copies=1, marks=True):
+    """PDF（バイト列など）を順に面付けして out に書き出す。(ページ数, 用紙の枚数) を返す"""
+    imposer = PdfImposer(nup, copies, marks)
+    for pdf in pdfs:
+        imposer.add(pdf)
+    imposer.write(out)
+    return imposer.pages, imposer.sheets
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="作成済みの予定表PDFを2面・4面に面付けする")
+    parser.add_argument('pdf', nargs='+', help="面付けするPDF（複数なら順につなげる）")
+    parser.add_argument('--nup', type=int, choices=sorted(LAYOUTS), default=4, help="1枚に並べる数")
+    parser.add_argument('--copies', type=int, default=1, help="同じ予定表を続けて何部置くか")
+    parser.add_argument('--no-marks', action='store_true', help="トンボを入れない")
+    parser.add_argument('--out', required=True, help="出力先")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    pages, sheets = impose_pdfs(args.pdf, args.out, args.nup, args.copies, not args.no_marks)
+    elapsed = time.perf_counter() - start
+    print(f"{pages}ページ → 用紙{sheets}枚（{args.nup}面） / {elapsed:.2f}秒 ({pages / elapsed:.1f} pages/sec)",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""処理時間の計測（スパン）とヒストグラム（標準ライブラリのみ）
+
+    with metrics.span('pdf.savefig'):
+        pdf.savefig(fig)
+
+環境変数 REHAB_CALENDAR_METRICS=1（または enable()）のときだけ記録する。
+オフのときの span() は使い回しの何もしないコンテキストマネージャを返すだけなので、ほぼコストがない。
+集計はスパン名ごとの累積ヒストグラムで、Prometheusのテキスト形式で書き出せる
+（server.py の GET /metrics、または REHAB_CALENDAR_METRICS_FILE に指定したファイル）。
+"""
+import bisect
+import contextlib
+import os
+import threading
+import time
+
+ENABLED = os.environ.get('REHAB_CALENDAR_METRICS', '') not in ('', '0')
+# 起動時に有効にしていたか（アプリの計測パネルはこのときだけ表示する。enable() では変わらない）
+ENABLED_AT_START = ENABLED
+METRICS_FILE = os.environ.get('REHAB_CALENDAR_METRICS_FILE')
+
+# ヒストグラムの区切り（秒）
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_NULL_SPAN = contextlib.nullcontext()
+
+
+def enable(on=True):
+    global ENABLED
+    ENABLED = on
+
+
+class Histogram:
+    """1つのスパンの時間の分布（区切りごとの件数・合計・最大）"""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # 最後は BUCKETS[-1] を超えたもの
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q):
+        """区切りの中で線形補間した q 分位点の推定値（秒）"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = BUCKETS[i - 1] if i else 0.0
+                upper = BUCKETS[i] if i < len(BUCKETS) else self.max
+                return min(self.max, lower + (upper - lower) * (rank - seen) / n)
+            seen += n
+        return self.max
+
+
+class Registry:
+    """スパン名 → Histogram（スレッドセーフ）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    def observe(self, name, seconds):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def summary(self):
+        """画面表示用 [{'span', 'count', 'mean_ms', 'p50_ms', 'p95_ms', 'max_ms', 'total_s'}, ...]（合計時間の多い順）"""
+        with self._lock:
+            items = list(self._histograms.items())
+            rows = [{
+                'span': name,
+                'count': h.count,
+                'mean_ms': h.sum / h.count * 1000,
+                'p50_ms': h.quantile(0.5) * 1000,
+                'p95_ms': h.quantile(0.95) * 1000,
+                'max_ms': h.max * 1000,
+                'total_s': h.sum,
+            } for name, h in items]
+        return sorted(rows, key=lambda row: -row['total_s'])
+
+    def prometheus(self):
+        """Prometheusのテキスト形式（text/plain; version=0.0.4）"""
+        lines = [
+            '# HELP rehab_calendar_span_seconds Time spent in each instrumented phase.',
+            '# TYPE rehab_calendar_span_seconds histogram',
+        ]
+        with self._lock:
+            for name in sorted(self._histograms):
+                h = self._histograms[name]
+                label = name.replace('\\', '\\\\').replace('"', '\\"')
+                cumulative = 0
+                for bound, n in zip(BUCKETS, h.counts):
+                    cumulative += n
+                    lines.append(f'rehab_calendar_span_seconds_bucket{{span="{label}",le="{bound}"}} {cumulative}')
+                lines.append(f'rehab_calendar_span_seconds_bucket{{span="{label}",le="+Inf"}} {h.count}')
+                lines.append(f'rehab_calendar_span_seconds_sum{{span="{label}"}} {h.sum:.6f}')
+                lines.append(f'rehab_calendar_span_seconds_count{{span="{label}"}} {h.count}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """Prometheusのテキスト形式でファイルに書き出す（node_exporterのtextfileコレクタで読める）"""
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus())
+        os.replace(tmp, path)
+
+
+REGISTRY = Registry()
+
+
+class _Span:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        REGISTRY.observe(self.name, time.perf_counter() - self.start)
+
+
+def span(name):
+    """with で囲んだ範囲の時間を name のヒストグラムに記録する（オフのときは何もしない）"""
+    if not ENABLED:
+        return _NULL_SPAN
+    return _Span(name)
+
+
+def observe(name, seconds):
+    """計測済みの時間を記録する"""
+    if ENABLED:
+        REGISTRY.observe(name, seconds)
+
+
+def start_file_export(path=None, interval=15.0):
+    """
+    interval 秒ごとに path（省略時は REHAB_CALENDAR_METRICS_FILE）へ書き出すスレッドを始める
+    path がなければ何もせず None を返す
+    """
+    path = path or METRICS_FILE
+    if not path:
+        return None
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                REGISTRY.write(path)
+            except OSError:
+                pass
+
+    thread = threading.Thread(target=loop, name="metrics-export", daemon=True)
+    thread.start()
+    return thread
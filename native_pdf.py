@@ -0,0 +1,450 @@
+"""matplotlibを通さずにPDFを直接書き出す軽量バックエンド
+
+予定表は四角形と文字だけなので、PDFのコンテンツストリーム演算子を直接書く。
+日本語フォントは文書全体で使った文字だけをサブセット化し、1回だけ埋め込む。
+ページは作成した順にファイルへ書き出し、フォントは文書を閉じるときに書く。
+nup を指定すると、ページをフォームXObjectとして書き、用紙1枚に2面・4面並べる（impose.py）。
+"""
+import functools
+import importlib.util
+import io
+import os
+import struct
+import zlib
+
+from fontTools import subset
+from fontTools.ttLib import TTFont
+
+# A4横（ポイント単位）
+A4_LANDSCAPE = (842, 595)
+
+NOTO_CJK_PATH = '/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc'
+
+COLORS = {
+    'black': (0, 0, 0),
+    'red': (1, 0, 0),
+    'blue': (0, 0, 1),
+    'green': (0, 0.5, 0),
+}
+
+
+def find_cjk_font():
+    """埋め込む日本語フォントのパスを探す（japanize-matplotlib同梱のIPAexゴシック → Noto CJK）"""
+    spec = importlib.util.find_spec('japanize_matplotlib')
+    if spec and spec.origin:
+        path = os.path.join(os.path.dirname(spec.origin), 'fonts', 'ipaexg.ttf')
+        if os.path.exists(path):
+            return path
+    if os.path.exists(NOTO_CJK_PATH):
+        return NOTO_CJK_PATH
+    raise FileNotFoundError("日本語フォントが見つかりません（japanize-matplotlib または fonts-noto-cjk が必要です）")
+
+
+@functools.lru_cache(maxsize=4)
+def _load_font_data(path):
+    """フォントファイルと、文字→グリフ・グリフ幅の対応表を読み込む（読み取り専用なのでプロセス内で共有）"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    font = TTFont(io.BytesIO(data), fontNumber=0, lazy=True)
+    units = font['head'].unitsPerEm
+    cmap = font.getBestCmap()
+    glyph_order = font.getGlyphOrder()
+    gid_of = {name: gid for gid, name in enumerate(glyph_order)}
+    hmtx = font['hmtx']
+    char_to_gid = {code: gid_of[name] for code, name in cmap.items()}
+    widths = [round(hmtx[name][0] * 1000 / units) for name in glyph_order]
+    head = font['head']
+    hhea = font['hhea']
+    cap_height = getattr(font['OS/2'], 'sCapHeight', 0) if 'OS/2' in font else 0
+    info = {
+        'name': font['name'].getDebugName(6) or 'CJKFont',
+        'is_cff': 'CFF ' in font,
+        'bbox': [round(v * 1000 / units) for v in (head.xMin, head.yMin, head.xMax, head.yMax)],
+        'ascent': round(hhea.ascent * 1000 / units),
+        'descent': round(hhea.descent * 1000 / units),
+        'cap_height': round((cap_height or hhea.ascent) * 1000 / units),
+    }
+    font.close()
+    return data, char_to_gid, widths, info
+
+
+# TrueTypeのサブセットに残すテーブル（CIDFontType2の埋め込みに必要なもの）
+_TRUETYPE_TABLES = (b'head', b'hhea', b'maxp', b'hmtx', b'cvt ', b'fpgm', b'prep')
+
+
+def _subset_truetype(data, gids):
+    """
+    glyf形式のTrueTypeから、指定したグリフ（と合成グリフの部品）だけを残す。
+    GIDは変えずに使わないグリフを空にするので、fontTools.subsetより大幅に速い。
+    """
+    num_tables = struct.unpack_from('>H', data, 4)[0]
+    tables = {}
+    for i in range(num_tables):
+        tag, _, offset, length = struct.unpack_from('>4sLLL', data, 12 + 16 * i)
+        tables[tag] = data[offset:offset + length]
+
+    head = bytearray(tables[b'head'])
+    long_loca = struct.unpack_from('>h', head, 50)[0] == 1
+    num_glyphs = struct.unpack_from('>H', tables[b'maxp'], 4)[0]
+    loca_raw = tables[b'loca']
+    if long_loca:
+        loca = struct.unpack(f'>{num_glyphs + 1}L', loca_raw[:4 * (num_glyphs + 1)])
+    else:
+        loca = [v * 2 for v in struct.unpack(f'>{num_glyphs + 1}H', loca_raw[:2 * (num_glyphs + 1)])]
+    glyf = tables[b'glyf']
+
+    # 合成グリフが参照する部品グリフも残す
+    keep = set()
+    pending = [g for g in gids if g < num_glyphs]
+    while pending:
+        gid = pending.pop()
+        if gid in keep:
+            continue
+        keep.add(gid)
+        start, end = loca[gid], loca[gid + 1]
+        if end - start < 10 or struct.unpack_from('>h', glyf, start)[0] >= 0:
+            continue
+        pos = start + 10
+        while True:
+            flags, component = struct.unpack_from('>HH', glyf, pos)
+            pending.append(component)
+            pos += 4 + (4 if flags & 0x0001 else 2)
+            if flags & 0x0008:
+                pos += 2
+            elif flags & 0x0040:
+                pos += 4
+            elif flags & 0x0080:
+                pos += 8
+            if not flags & 0x0020:
+                break
+
+    new_glyf = bytearray()
+    new_loca = []
+    for gid in range(num_glyphs):
+        new_loca.append(len(new_glyf))
+        if gid in keep:
+            new_glyf += glyf[loca[gid]:loca[gid + 1]]
+            new_glyf += b'\0' * (-len(new_glyf) % 4)
+    new_loca.append(len(new_glyf))
+
+    # 使わないグリフの幅も0にする（PDF側の幅は /W で指定するので影響しない。圧縮が効くようにするため）
+    num_metrics = struct.unpack_from('>H', tables[b'hhea'], 34)[0]
+    hmtx = bytearray(len(tables[b'hmtx']))
+    for gid in keep:
+        if gid < num_metrics:
+            hmtx[4 * gid:4 * gid + 4] = tables[b'hmtx'][4 * gid:4 * gid + 4]
+        else:
+            pos = 4 * num_metrics + 2 * (gid - num_metrics)
+            hmtx[pos:pos + 2] = tables[b'hmtx'][pos:pos + 2]
+
+    struct.pack_into('>h', head, 50, 1)  # locaは常に4バイト形式で書く
+    struct.pack_into('>L', head, 8, 0)   # checkSumAdjustmentは最後に計算し直す
+    out_tables = {tag: tables[tag] for tag in _TRUETYPE_TABLES if tag in tables}
+    out_tables[b'head'] = bytes(head)
+    out_tables[b'hmtx'] = bytes(hmtx)
+    out_tables[b'loca'] = struct.pack(f'>{len(new_loca)}L', *new_loca)
+    out_tables[b'glyf'] = bytes(new_glyf)
+    return _build_sfnt(out_tables)
+
+
+def _table_checksum(data):
+    data += b'\0' * (-len(data) % 4)
+    return sum(struct.unpack(f'>{len(data) // 4}L', data)) & 0xFFFFFFFF
+
+
+def _build_sfnt(tables):
+    tags = sorted(tables)
+    num_tables = len(tags)
+    entry_selector = num_tables.bit_length() - 1
+    search_range = (1 << entry_selector) * 16
+    header = struct.pack('>LHHHH', 0x00010000, num_tables, search_range, entry_selector,
+                         num_tables * 16 - search_range)
+    directory = bytearray()
+    body = bytearray()
+    offset = 12 + 16 * num_tables
+    head_offset = None
+    for tag in tags:
+        data = tables[tag]
+        if tag == b'head':
+            head_offset = offset + len(body)
+        directory += struct.pack('>4sLLL', tag, _table_checksum(data), offset + len(body), len(data))
+        body += data + b'\0' * (-len(data) % 4)
+    font = bytearray(header + directory + body)
+    adjustment = (0xB1B0AFBA - _table_checksum(bytes(font))) & 0xFFFFFFFF
+    struct.pack_into('>L', font, head_offset + 8, adjustment)
+    return bytes(font)
+
+
+class _EmbeddedFont:
+    """文書内で使ったグリフを記録し、最後にサブセットを作る"""
+
+    def __init__(self, path):
+        self.path = path
+        self.data, self.char_to_gid, self.widths, self.info = _load_font_data(path)
+        self.used = {0: None}  # gid -> 文字（ToUnicode用）
+
+    def encode(self, text):
+        """文字列をIdentity-Hの2バイトGID列（16進）に変換"""
+        out = []
+        for ch in text:
+            gid = self.char_to_gid.get(ord(ch), 0)
+            self.used.setdefault(gid, ch)
+            out.append(f"{gid:04X}")
+        return ''.join(out)
+
+    def text_width(self, text, size):
+        return sum(self.widths[self.char_to_gid.get(ord(ch), 0)] for ch in text) * size / 1000
+
+    def subset_bytes(self):
+        """使ったグリフだけを残したフォントファイル（GIDは元のまま）"""
+        if not self.info['is_cff'] and self.data[:4] in (b'\x00\x01\x00\x00', b'true'):
+            return _subset_truetype(self.data, self.used)
+        # CFF形式（Noto CJKなど）はfontToolsでサブセット化する
+        font = TTFont(io.BytesIO(self.data), fontNumber=0)
+        options = subset.Options()
+        options.retain_gids = True  # ページはGIDを先に書き出しているので番号を変えない
+        options.notdef_outline = True
+        options.hinting = False
+        options.layout_features = []
+        options.name_IDs = []
+        subsetter = subset.Subsetter(options)
+        subsetter.populate(gids=sorted(self.used))
+        subsetter.subset(font)
+        buf = io.BytesIO()
+        font.save(buf)
+        font.close()
+        return buf.getvalue()
+
+    def to_unicode_cmap(self):
+        entries = [(gid, ch) for gid, ch in sorted(self.used.items()) if ch is not None]
+        lines = [
+            "/CIDInit /ProcSet findresource begin",
+            "12 dict begin",
+            "begincmap",
+            "/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> def",
+            "/CMapName /Adobe-Identity-UCS def",
+            "/CMapType 2 def",
+            "1 begincodespacerange",
+            "<0000> <FFFF>",
+            "endcodespacerange",
+        ]
+        for i in range(0, len(entries), 100):
+            chunk = entries[i:i + 100]
+            lines.append(f"{len(chunk)} beginbfchar")
+            for gid, ch in chunk:
+                utf16 = ch.encode('utf-16-be').hex().upper()
+                lines.append(f"<{gid:04X}> <{utf16}>")
+            lines.append("endbfchar")
+        lines += ["endcmap", "CMapName currentdict /CMap defineresource pop", "end", "end"]
+        return '\n'.join(lines).encode('ascii')
+
+
+class NativeCanvas:
+    """1ページ分の描画命令をためる。座標はデータ座標（xlim/ylim）で指定する"""
+
+    def __init__(self, font, xlim, ylim, page_size=A4_LANDSCAPE, margin=36):
+        self.font = font
+        self.page_size = page_size
+        width, height = page_size
+        self._sx = (width - 2 * margin) / (xlim[1] - xlim[0])
+        self._sy = (height - 2 * margin) / (ylim[1] - ylim[0])
+        self._ox = margin - xlim[0] * self._sx
+        self._oy = margin - ylim[0] * self._sy
+        self._ops = []
+
+    def _point(self, x, y):
+        return self._ox + x * self._sx, self._oy + y * self._sy
+
+    def rect(self, x, y, width, height, linewidth=1.0):
+        px, py = self._point(x, y)
+        self._ops.append(f"{linewidth:g} w 0 0 0 RG {px:.2f} {py:.2f} "
+                         f"{width * self._sx:.2f} {height * self._sy:.2f} re S")
+
+    def text(self, x, y, s, ha='left', va='baseline', fontsize=10, fontweight='normal', color='black'):
+        """matplotlibのAxes.textと同じ引数で文字を置く（改行で複数行）"""
+        r, g, b = COLORS[color]
+        px, py = self._point(x, y)
+        lines = s.split('\n')
+        leading = fontsize * 1.2
+        # 行の上下中央は、グリフの高さ（キャップハイト）の半分で近似する
+        half_cap = fontsize * self.font.info['cap_height'] / 2000
+        if va == 'center':
+            first_baseline = py + (len(lines) - 1) * leading / 2 - half_cap
+        elif va == 'top':
+            first_baseline = py - fontsize * self.font.info['ascent'] / 1000
+        else:
+            first_baseline = py
+
+        # 太字はフォントに太字がないため、塗り + 細い線で太らせる
+        mode = f"2 Tr {fontsize * 0.02:.2f} w" if fontweight == 'bold' else "0 Tr"
+        self._ops.append(f"BT /F1 {fontsize:g} Tf {mode} {r:g} {g:g} {b:g} rg {r:g} {g:g} {b:g} RG")
+        for i, line in enumerate(lines):
+            line_width = self.font.text_width(line, fontsize)
+            if ha == 'center':
+                lx = px - line_width / 2
+            elif ha == 'right':
+                lx = px - line_width
+            else:
+                lx = px
+            ly = first_baseline - i * leading
+            self._ops.append(f"1 0 0 1 {lx:.2f} {ly:.2f} Tm <{self.font.encode(line)}> Tj")
+        self._ops.append("ET")
+
+    def content(self):
+        return '\n'.join(self._ops).encode('ascii')
+
+
+class NativePdfDocument:
+    """PdfPagesと同じように with で使う、複数ページPDFの書き出し"""
+
+    def __init__(self, file, font_path=None, compress=True, nup=None, copies=1, crop_marks=True):
+        if isinstance(file, (str, os.PathLike)):
+            self._file = open(file, 'wb')
+            self._owns_file = True
+        else:
+            self._file = file
+            self._owns_file = False
+        # True はレベル9（従来どおり）、0〜9 の数値はその圧縮レベル、False / 0 は圧縮なし
+        self.compress = 9 if compress is True else int(compress)
+        self.font = _EmbeddedFont(font_path or find_cjk_font())
+        self._start = self._file.tell()
+        self._offsets = {}
+        # 1: Catalog, 2: Pages, 3: フォント（Type0）は先に番号だけ決めておく
+        self._next_id = 4
+        self._page_ids = []
+        # 面付け（nup 面・copies 部ずつ）。まだ用紙に置いていない (フォームの番号, ページの大きさ)
+        self.nup = nup
+        self.copies = copies
+        self.crop_marks = crop_marks
+        self._pending = []
+        if nup:
+            import impose
+            self._impose = impose
+        self._file.write(b"%PDF-1.6\n%\xe2\xe3\xcf\xd3\n")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _alloc(self):
+        obj_id = self._next_id
+        self._next_id += 1
+        return obj_id
+
+    def _write_object(self, obj_id, body):
+        self._offsets[obj_id] = self._file.tell() - self._start
+        self._file.write(f"{obj_id} 0 obj\n".encode('ascii'))
+        self._file.write(body)
+        self._file.write(b"\nendobj\n")
+
+    def _write_stream(self, obj_id, data, extra=''):
+        if self.compress:
+            data = zlib.compress(data, self.compress)
+            extra += ' /Filter /FlateDecode'
+        header = f"<< /Length {len(data)}{extra} >>\nstream\n".encode('ascii')
+        self._write_object(obj_id, header + data + b"\nendstream")
+
+    def new_page(self, xlim, ylim, page_size=A4_LANDSCAPE):
+        return NativeCanvas(self.font, xlim, ylim, page_size)
+
+    def add_page(self, canvas):
+        """描き終わったページをすぐにファイルへ書き出す"""
+        content_id = self._alloc()
+        width, height = canvas.page_size
+        if self.nup:
+            # 面付けではページをフォームにして、用紙がいっぱいになったら用紙のページを書く
+            self._write_stream(content_id, canvas.content(), (
+                f" /Type /XObject /Subtype /Form /BBox [0 0 {width} {height}]"
+                " /Resources << /Font << /F1 3 0 R >> >>"
+            ))
+            for _ in range(self.copies):
+                self._pending.append((content_id, canvas.page_size))
+                if len(self._pending) == self.nup:
+                    self._write_sheet()
+            return
+        self._write_stream(content_id, canvas.content())
+        page_id = self._alloc()
+        self._write_object(page_id, (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {width} {height}] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>"
+        ).encode('ascii'))
+        self._page_ids.append(page_id)
+
+    def _write_sheet(self):
+        """まだ置いていないフォームを用紙1枚に並べて書き出す"""
+        if not self._pending:
+            return
+        page_size = self._pending[0][1]
+        (width, height), cells = self._impose.sheet_layout(self.nup, page_size)
+        placements = [(f'P{i}', cell) for i, cell in enumerate(cells[:len(self._pending)])]
+        content_id = self._alloc()
+        self._write_stream(content_id, self._impose.sheet_content(placements, page_size, self.crop_marks))
+        xobjects = ' '.join(f"/P{i} {form_id} 0 R" for i, (form_id, _) in enumerate(self._pending))
+        page_id = self._alloc()
+        self._write_object(page_id, (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {width} {height}] "
+            f"/Resources << /XObject << {xobjects} >> >> /Contents {content_id} 0 R >>"
+        ).encode('ascii'))
+        self._page_ids.append(page_id)
+        self._pending = []
+
+    def _write_font(self):
+        font = self.font
+        info = font.info
+        base_name = 'AAAAAA+' + ''.join(c for c in info['name'] if c.isalnum() or c == '-')
+
+        file_id = self._alloc()
+        if info['is_cff']:
+            self._write_stream(file_id, font.subset_bytes(), ' /Subtype /OpenType')
+            font_file_key, cid_subtype = 'FontFile3', 'CIDFontType0'
+        else:
+            self._write_stream(file_id, font.subset_bytes())
+            font_file_key, cid_subtype = 'FontFile2', 'CIDFontType2'
+
+        descriptor_id = self._alloc()
+        bbox = ' '.join(str(v) for v in info['bbox'])
+        self._write_object(descriptor_id, (
+            f"<< /Type /FontDescriptor /FontName /{base_name} /Flags 4 /FontBBox [{bbox}] "
+            f"/ItalicAngle 0 /Ascent {info['ascent']} /Descent {info['descent']} "
+            f"/CapHeight {info['cap_height']} /StemV 80 /{font_file_key} {file_id} 0 R >>"
+        ).encode('ascii'))
+
+        widths = ' '.join(f"{gid} [{font.widths[gid]}]" for gid in sorted(font.used))
+        cid_id = self._alloc()
+        cid_to_gid = ' /CIDToGIDMap /Identity' if cid_subtype == 'CIDFontType2' else ''
+        self._write_object(cid_id, (
+            f"<< /Type /Font /Subtype /{cid_subtype} /BaseFont /{base_name} "
+            f"/CIDSystemInfo << /Registry (Adobe) /Ordering (Identity) /Supplement 0 >> "
+            f"/FontDescriptor {descriptor_id} 0 R /DW 1000 /W [{widths}]{cid_to_gid} >>"
+        ).encode('ascii'))
+
+        to_unicode_id = self._alloc()
+        self._write_stream(to_unicode_id, font.to_unicode_cmap())
+
+        self._write_object(3, (
+            f"<< /Type /Font /Subtype /Type0 /BaseFont /{base_name} /Encoding /Identity-H "
+            f"/DescendantFonts [{cid_id} 0 R] /ToUnicode {to_unicode_id} 0 R >>"
+        ).encode('ascii'))
+
+    def close(self):
+        if self._file is None:
+            return
+        self._write_sheet()
+        self._write_font()
+        kids = ' '.join(f"{page_id} 0 R" for page_id in self._page_ids)
+        self._write_object(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(self._page_ids)} >>".encode('ascii'))
+        self._write_object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+
+        xref_offset = self._file.tell() - self._start
+        count = self._next_id
+        xref = [f"xref\n0 {count}\n", "0000000000 65535 f \n"]
+        for obj_id in range(1, count):
+            xref.append(f"{self._offsets[obj_id]:010d} 00000 n \n")
+        xref.append(f"trailer\n<< /Size {count} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n")
+        self._file.write(''.join(xref).encode('ascii'))
+
+        if self._owns_file:
+            self._file.close()
+        self._file = None
@@ -0,0 +1,218 @@
+"""1回分の処理（画面の再実行・PDF作成）のプロファイルを取る（調査用・標準ライブラリのみ）
+
+    with profiling.capture('pdf'):
+        create_schedule_pdf(schedule)
+
+1回ごとに REHAB_CALENDAR_PROFILE_DIR（デフォルトはアプリと同じフォルダの profiles/）の下に
+フォルダを作り、次のファイルを書き出す。古いものから消して最新 KEEP 件だけ残す。
+  profile.pstats     cProfileの結果（python -m pstats や snakeviz で読む）
+  stacks.collapsed   1ミリ秒ごとにスタックを記録した折りたたみ形式（flamegraph.pl や speedscope で読む）
+  summary.json       経過時間・tracemallocのピーク・matplotlibのアーティスト数・時間のかかった関数
+
+有効にする方法:
+  - 環境変数 REHAB_CALENDAR_PROFILE=pdf（PDF作成ごと）/ rerun（画面の再実行ごと）/ all（両方）
+  - アプリのURLに ?profile=1（その1回の再実行と、そのときのPDF作成）
+  - server.py の GET /calendar に &profile=1（その1件。キャッシュを使わずに作成する）
+
+cProfile・tracemallocはプロセスで1つなので（Python 3.12以降は2つ目のcProfileがエラーになる）、
+プロファイルは同時に1つだけ取る。ほかのスレッドで取っている最中に始めたものは何もしない（path は None）。
+"""
+import contextlib
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import shutil
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+
+MODES = {'pdf': {'pdf'}, 'rerun': {'rerun'}, 'all': {'pdf', 'rerun'}, '1': {'pdf', 'rerun'}}
+ENABLED_FOR = MODES.get(os.environ.get('REHAB_CALENDAR_PROFILE', '').lower(), set())
+
+PROFILE_DIR = os.environ.get(
+    'REHAB_CALENDAR_PROFILE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles')
+)
+KEEP = 20
+SAMPLE_INTERVAL = 0.001
+
+_local = threading.local()
+_active_lock = threading.Lock()  # プロファイル中のあいだ持つ
+_tracemalloc_owned = False
+
+
+def enabled_for(kind):
+    """環境変数で kind（'pdf' / 'rerun'）のプロファイルが有効になっているか"""
+    return kind in ENABLED_FOR
+
+
+def _frame_name(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class _Sampler(threading.Thread):
+    """対象のスレッドのスタックを一定間隔で記録する"""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame.f_code).replace(';', ':'))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+def _start_tracemalloc():
+    global _tracemalloc_owned
+    # ほかで始めたtracemallocは止めない
+    _tracemalloc_owned = not tracemalloc.is_tracing()
+    if _tracemalloc_owned:
+        tracemalloc.start()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def _stop_tracemalloc():
+    peak = tracemalloc.get_traced_memory()[1]
+    if _tracemalloc_owned:
+        tracemalloc.stop()
+    return peak
+
+
+class Capture:
+    """
+    with で囲んだ範囲のプロファイルを取って書き出す
+    同じスレッドで既に取っている最中なら何もしない（外側のプロファイルに含まれる）。
+    ほかのスレッドで取っている最中も何もしない（同時に取れるのは1つだけ）
+    tracemallocはプロセス全体で1つなので、ピークには同時に動いているほかのスレッドの割り当ても入る
+    """
+
+    def __init__(self, label, directory=None, interval=SAMPLE_INTERVAL, keep=KEEP):
+        self.label = label
+        self.directory = directory or PROFILE_DIR
+        self.interval = interval
+        self.keep = keep
+        self.path = None
+        self.artists = Counter()
+        self.figures = 0
+        self._active = False
+
+    def start(self):
+        if getattr(_local, 'capture', None) is not None or not _active_lock.acquire(blocking=False):
+            return self
+        _local.capture = self
+        self._active = True
+        self._base_memory = _start_tracemalloc()
+        self._sampler = _Sampler(threading.get_ident(), self.interval)
+        self._sampler.start()
+        self._profile = cProfile.Profile()
+        self._start = time.perf_counter()
+        self._profile.enable()
+        return self
+
+    def stop(self, write=True):
+        """プロファイルを止めて書き出す（write=False なら捨てる）。書き出したフォルダを返す"""
+        if not self._active:
+            return None
+        self._profile.disable()
+        elapsed = time.perf_counter() - self._start
+        self._sampler.stop()
+        peak = _stop_tracemalloc()
+        _local.capture = None
+        self._active = False
+        _active_lock.release()
+        if write:
+            try:
+                self._write(elapsed, max(0, peak - self._base_memory))
+            except OSError:
+                pass  # プロファイルが書けなくても本来の処理は止めない
+        return self.path
+
+    __enter__ = start
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def note_figure(self, fig):
+        self.figures += 1
+        self.artists.update(type(artist).__name__ for artist in fig.findobj())
+
+    def _write(self, elapsed, peak_bytes):
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        self.path = os.path.join(self.directory, f"{stamp}_{self.label}")
+        os.makedirs(self.path)
+
+        self._profile.dump_stats(os.path.join(self.path, 'profile.pstats'))
+        with open(os.path.join(self.path, 'stacks.collapsed'), 'w', encoding='utf-8') as f:
+            for stack, count in sorted(self._sampler.stacks.items()):
+                f.write(f"{stack} {count}\n")
+
+        stats = pstats.Stats(self._profile, stream=io.StringIO())
+        top = sorted(stats.stats.items(), key=lambda item: -item[1][3])[:15]  # 累積時間の多い順
+        summary = {
+            'label': self.label,
+            'elapsed_ms': elapsed * 1000,
+            'peak_alloc_kb': peak_bytes / 1024,
+            'samples': sum(self._sampler.stacks.values()),
+            'figures': self.figures,
+            'artists': dict(self.artists.most_common()),
+            'top_cumulative': [
+                {'function': f"{func} ({os.path.basename(file)}:{line})", 'calls': calls, 'cumulative_ms': cumtime * 1000}
+                for (file, line, func), (_, calls, _, cumtime, _) in top
+            ],
+        }
+        with open(os.path.join(self.path, 'summary.json'), 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        self._rotate()
+
+    def _rotate(self):
+        """最新 keep 件より古いプロファイルを消す"""
+        entries = sorted(entry for entry in os.listdir(self.directory)
+                         if os.path.isdir(os.path.join(self.directory, entry)))
+        for entry in entries[:-self.keep]:
+            shutil.rmtree(os.path.join(self.directory, entry), ignore_errors=True)
+
+
+def capture(label, **options):
+    return Capture(label, **options)
+
+
+def maybe_capture(kind):
+    """環境変数で kind のプロファイルが有効なら Capture、そうでなければ何もしないコンテキストマネージャ"""
+    if kind in ENABLED_FOR:
+        return Capture(kind)
+    return contextlib.nullcontext()
+
+
+def profiled(func, label):
+    """func の呼び出しを1回ごとにプロファイルするラッパー（別スレッドで実行されるものに使う）"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with Capture(label):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def note_figure(fig):
+    """プロファイル中ならmatplotlibのFigureのアーティスト数を記録する（calendar_pdfから呼ぶ）"""
+    current = getattr(_local, 'capture', None)
+    if current is not None:
+        current.note_figure(fig)
@@ -0,0 +1,182 @@
+"""create_pdfの結果を入力のハッシュで保存するキャッシュ
+
+メモリ上のLRUと、Streamlitの再起動後も残るディスク上のキャッシュの2段構成。
+どちらも上限バイト数を超えると、最も長く使われていないものから削除する。
+"""
+import functools
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from importlib.metadata import version
+
+from calendar_pdf import DEFAULT_BACKEND, PDF_OPTIONS, create_pdf
+from schedule import resolve_month
+
+# レイアウトを変えたときはこの値を上げて古いキャッシュを無効にする
+CACHE_VERSION = 2
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    'REHAB_CALENDAR_CACHE_DIR',
+    os.path.join(tempfile.gettempdir(), 'rehab-calendar-cache')
+)
+DEFAULT_MEMORY_LIMIT = 32 * 1024 * 1024
+DEFAULT_DISK_LIMIT = 256 * 1024 * 1024
+
+
+@functools.lru_cache(maxsize=None)
+def _matplotlib_version():
+    # matplotlib本体をimportせずにバージョンだけ調べる（起動を遅くしないため）
+    return version('matplotlib')
+
+
+def render_key(year, month, transfers_list, visit1_config, visit2_config, backend=None):
+    """create_pdfの入力から正規化したハッシュキーを作る"""
+    payload = {
+        'version': CACHE_VERSION,
+        'backend': backend or DEFAULT_BACKEND,
+        'matplotlib': _matplotlib_version(),
+        'pdf_options': PDF_OPTIONS,
+        'year': year,
+        'month': month,
+        'transfers': [list(t) for t in transfers_list],
+        'visit1': {k: visit1_config.get(k) for k in ('weekday', 'time', 'days')},
+        'visit2': {k: visit2_config.get(k) for k in ('weekday', 'time', 'days')},
+    }
+    canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def schedule_key(year, month, slots, transfers=(), backend=None):
+    """定期訪問の枠（いくつでも）と振替から正規化したハッシュキーを作る（ETagにも使う）"""
+    payload = {
+        'version': CACHE_VERSION,
+        'backend': backend or DEFAULT_BACKEND,
+        'matplotlib': _matplotlib_version(),
+        'pdf_options': PDF_OPTIONS,
+        'year': year,
+        'month': month,
+        'slots': [{k: slot.get(k) for k in ('weekday', 'time', 'days')} for slot in slots],
+        'transfers': [list(t) for t in transfers],
+    }
+    canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class RenderCache:
+    """メモリ（LRU）とディスクの2段キャッシュ"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR,
+                 memory_limit=DEFAULT_MEMORY_LIMIT, disk_limit=DEFAULT_DISK_LIMIT):
+        self.cache_dir = cache_dir
+        self.memory_limit = memory_limit
+        self.disk_limit = disk_limit
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0}
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pdf")
+
+    def _remember(self, key, data):
+        """メモリ側に追加し、上限を超えた分を古い順に捨てる"""
+        if len(data) > self.memory_limit:
+            return
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key))
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.memory_limit:
+            _, old = self._memory.popitem(last=False)
+            self._memory_bytes -= len(old)
+            self.stats['evictions'] += 1
+
+    def get(self, key):
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return data
+
+        if self.cache_dir:
+            path = self._path(key)
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                os.utime(path)  # 最終利用時刻を更新（LRU用）
+            except OSError:
+                data = None
+            if data is not None:
+                with self._lock:
+                    self._remember(key, data)
+                    self.stats['disk_hits'] += 1
+                return data
+
+        with self._lock:
+            self.stats['misses'] += 1
+        return None
+
+    def put(self, key, data):
+        with self._lock:
+            self._remember(key, data)
+
+        if self.cache_dir and len(data) <= self.disk_limit:
+            # 書きかけのファイルを読まれないよう、一時ファイルに書いてから置き換える
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+            self._evict_disk()
+
+    def _evict_disk(self):
+        """ディスク側の合計が上限を超えたら、最終利用時刻の古い順に削除"""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.pdf'):
+                st = entry.stat()
+                entries.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+        if total <= self.disk_limit:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.disk_limit:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            with self._lock:
+                self.stats['evictions'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+        if self.cache_dir:
+            for entry in os.scandir(self.cache_dir):
+                if entry.name.endswith('.pdf'):
+                    os.remove(entry.path)
+
+
+def cached_create_pdf(cache, year, month, transfers_list, visit1_config, visit2_config, backend=None):
+    """create_pdfと同じ戻り値で、PDF本体だけキャッシュから返す"""
+    schedule = resolve_month(year, month, [visit1_config, visit2_config], transfers_list)
+
+    key = render_key(year, month, transfers_list, visit1_config, visit2_config, backend)
+    data = cache.get(key)
+    if data is None:
+        pdf_buffer, _, _, _ = create_pdf(year, month, transfers_list, visit1_config, visit2_config, backend)
+        data = pdf_buffer.getvalue()
+        cache.put(key, data)
+
+    return io.BytesIO(data), schedule.actual_days(0), schedule.actual_days(1), schedule.canceled_dates
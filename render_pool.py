@@ -0,0 +1,45 @@
+"""PDF作成を決まった数のスレッドで実行するプール
+
+同じStreamlitサーバーで複数のスタッフが同時にPDFを作っても、
+同時に走る描画の数と待ち行列の長さに上限をかける。
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_WORKERS = int(os.environ.get('REHAB_CALENDAR_RENDER_WORKERS', min(4, os.cpu_count() or 1)))
+
+
+class RenderPool:
+    """上限付きのスレッドプール（実行中 + 待ち行列が max_pending を超えると submit が待つ）"""
+
+    def __init__(self, workers=DEFAULT_WORKERS, max_pending=None):
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='render')
+        self._slots = threading.BoundedSemaphore(max_pending or workers * 4)
+
+    def submit(self, fn, *args, **kwargs):
+        self._slots.acquire()
+        return self._start(fn, *args, **kwargs)
+
+    def try_submit(self, fn, *args, **kwargs):
+        """待ち行列に空きがなければ待たずに None を返す submit"""
+        if not self._slots.acquire(blocking=False):
+            return None
+        return self._start(fn, *args, **kwargs)
+
+    def _start(self, fn, *args, **kwargs):
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def run(self, fn, *args, **kwargs):
+        """submitして結果を待つ"""
+        return self.submit(fn, *args, **kwargs).result()
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
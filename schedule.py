@@ -0,0 +1,312 @@
+"""訪問予定の計算（Streamlitにも描画にも依存しない）
+
+定期訪問の枠（曜日 + 時間）はいくつでも持てる。
+1か月分を1回のループで解決し、日付ごとの状態を配列とビットマスクで持つので、
+「この日は休み？振替？定期訪問？」はどれも O(1) で引ける。
+UI・PDF作成・バッチ処理はすべてこのモジュールを使う。
+
+祝日は holiday_table.py（scripts/gen_holidays.py で生成）を月ごとに1回だけ展開してキャッシュする。
+祝日の定期訪問は自動的に「お休み」になる。
+"""
+import calendar
+from datetime import date, timedelta
+from functools import lru_cache
+
+from holiday_table import FIRST_YEAR, HOLIDAY_NAMES, HOLIDAYS, LAST_YEAR
+
+WEEKDAY_NAMES = ['月曜日', '火曜日', '水曜日', '木曜日', '金曜日']
+WEEKDAY_SHORT = ['月', '火', '水', '木', '金', '土', '日']
+
+# 定時（9:00〜17:30）
+WORK_START_MINUTES = 9 * 60
+WORK_END_MINUTES = 17 * 60 + 30
+
+# 日曜始まりのカレンダーでの列番号（日=0, 月=1, ... 土=6）
+_SUNDAY_FIRST_COLUMN = {name: i + 1 for i, name in enumerate(WEEKDAY_NAMES)}
+
+
+def end_time(start_hour, start_min, duration):
+    """開始時刻と訪問時間（分）から終了時刻 (時, 分) を計算"""
+    end_total = start_hour * 60 + start_min + duration
+    return end_total // 60, end_total % 60
+
+
+def format_time_range(start_hour, start_min, duration):
+    """'11:20-12:00' 形式の時間帯文字列"""
+    end_hour, end_min = end_time(start_hour, start_min, duration)
+    return f"{start_hour}:{start_min:02d}-{end_hour}:{end_min:02d}"
+
+
+def parse_time_range(time_range):
+    """'11:20-12:00' を (開始分, 終了分)（0時からの分）に変換"""
+    start, end = time_range.split('-')
+    start_hour, start_min = start.split(':')
+    end_hour, end_min = end.split(':')
+    return int(start_hour) * 60 + int(start_min), int(end_hour) * 60 + int(end_min)
+
+
+def is_within_hours(start_hour, start_min, duration):
+    """終了時刻が定時（17:30）を超えていないか"""
+    end_hour, end_min = end_time(start_hour, start_min, duration)
+    return not (end_hour > 17 or (end_hour == 17 and end_min > 30))
+
+
+def month_weeks(year, month):
+    """日曜始まりの週ごとの日付（0は前後の月）"""
+    # calendar.setfirstweekday() はプロセス全体の設定を変えるので使わない
+    return calendar.Calendar(firstweekday=6).monthdayscalendar(year, month)
+
+
+def get_visit_days(year, month, weekday_name):
+    """指定した曜日の日付リストを取得"""
+    weekday_num = _SUNDAY_FIRST_COLUMN[weekday_name]
+    return [week[weekday_num] for week in month_weeks(year, month) if week[weekday_num] != 0]
+
+
+@lru_cache(maxsize=None)
+def _month_holidays(year, month):
+    """その月の祝日の (ビットマスク, 日付を添字にした名前のタプル)。表の範囲外の年は祝日なし"""
+    names = [None] * 32
+    mask = 0
+    if FIRST_YEAR <= year <= LAST_YEAR:
+        packed = HOLIDAYS[year]
+        prefix = f"{month:02d}"
+        for i in range(0, len(packed), 5):
+            if packed[i:i + 2] == prefix:
+                day = int(packed[i + 2:i + 4])
+                names[day] = HOLIDAY_NAMES[int(packed[i + 4], 36)]
+                mask |= 1 << day
+    return mask, tuple(names)
+
+
+def holiday_mask(year, month):
+    """祝日のビットマスク（ビット day）"""
+    return _month_holidays(year, month)[0]
+
+
+def month_holidays(year, month):
+    """その月の祝日 {日: 名前}"""
+    return {day: name for day, name in enumerate(_month_holidays(year, month)[1]) if name}
+
+
+def is_holiday(year, month, day):
+    return bool(_month_holidays(year, month)[0] >> day & 1)
+
+
+def holiday_name(year, month, day):
+    """祝日の名前（祝日でなければ None）"""
+    return _month_holidays(year, month)[1][day]
+
+
+def get_weekdays_in_same_week(year, month, day):
+    """同じ週（月〜金）の、同じ月のほかの平日（祝日を除く）"""
+    target_date = date(year, month, day)
+    monday = target_date - timedelta(days=target_date.weekday())
+    holidays = holiday_mask(year, month)
+
+    weekdays = []
+    for i in range(5):
+        d = monday + timedelta(days=i)
+        if d.month == month and d.day != day and not holidays >> d.day & 1:
+            weekdays.append(d.day)
+
+    return weekdays
+
+
+def month_range(start, end):
+    """(年, 月) から (年, 月) までの各月（両端を含む）。例: (2026, 4)〜(2027, 3) で12か月"""
+    year, month = start
+    months = []
+    while (year, month) <= tuple(end):
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def parse_transfers(text):
+    """「10>12 14:00-14:40; 17>19 11:00-11:40」形式を振替タプルのリストに変換"""
+    transfers = []
+    for item in (text or '').split(';'):
+        item = item.strip()
+        if not item:
+            continue
+        days, time_range = item.split()
+        from_day, to_day = days.split('>')
+        transfers.append((int(from_day), int(to_day), time_range))
+    return transfers
+
+
+def _time_range_errors(label, time_range):
+    """時間帯の形式と定時（9:00〜17:30）のチェック"""
+    try:
+        start, end = parse_time_range(time_range)
+    except (AttributeError, ValueError):
+        return [f"{label}: 時間帯 '{time_range}' は '11:20-12:00' の形式で指定してください"]
+    if not start < end:
+        return [f"{label}: 終了時刻が開始時刻より前です（{time_range}）"]
+    if start < WORK_START_MINUTES:
+        return [f"{label}: 開始時刻が定時（9:00）より前です（{time_range}）"]
+    if end > WORK_END_MINUTES:
+        return [f"{label}: 終了時刻が定時（17:30）を超えています（{time_range}）"]
+    return []
+
+
+def validate_schedule(year, month, slots, transfers=()):
+    """
+    予定の入力チェック。エラーメッセージのリストを返す（空ならOK）
+    アプリの入力欄と同じルール（定時・振替元は定期訪問日・振替先は同じ週の平日・振替元の重複なし）
+    """
+    if not (isinstance(year, int) and isinstance(month, int) and 1 <= month <= 12 and 1 <= year <= 9999):
+        return [f"年月が正しくありません（{year}年{month}月）"]
+
+    errors = []
+    for n, slot in enumerate(slots, 1):
+        if slot.get('weekday') not in WEEKDAY_NAMES:
+            errors.append(f"訪問日{n}: 曜日 '{slot.get('weekday')}' は {'・'.join(WEEKDAY_NAMES)} のいずれかです")
+        errors += _time_range_errors(f"訪問日{n}", slot.get('time'))
+    if errors:
+        return errors
+
+    schedule = MonthSchedule(year, month, slots)
+    seen = set()
+    for from_day, to_day, time_range in transfers:
+        label = f"振替 {from_day}日→{to_day}日"
+        if not (isinstance(from_day, int) and 1 <= from_day <= schedule.num_days and schedule.slot_mask[from_day]):
+            errors.append(f"{label}: 振替元が定期訪問日ではありません")
+        elif isinstance(to_day, int) and 1 <= to_day <= schedule.num_days and to_day in schedule.holidays:
+            errors.append(f"{label}: 振替先が祝日（{schedule.holidays[to_day]}）です")
+        elif to_day not in get_weekdays_in_same_week(year, month, from_day):
+            errors.append(f"{label}: 振替先は振替元と同じ週の平日にしてください")
+        if from_day in seen:
+            errors.append(f"{label}: この日付の振替は既に登録されています")
+        seen.add(from_day)
+        errors += _time_range_errors(label, time_range)
+    return errors
+
+
+def weekday_short(year, month, day):
+    """'月' などの1文字の曜日"""
+    return WEEKDAY_SHORT[calendar.weekday(year, month, day)]
+
+
+class MonthSchedule:
+    """
+    1か月分の解決済みの予定
+
+    slots      定期訪問の枠のリスト [{'weekday': '月曜日', 'time': '11:20-12:00'}, ...]
+    transfers  振替のリスト [(振替元の日, 振替先の日, '14:00-14:40'), ...]
+    holidays   False にすると祝日の定期訪問を休みにしない
+
+    日付（1〜31）を添字にした配列で持つ:
+      slot_mask[day]  その日の定期訪問の枠（ビット i = slots[i]、休みも含む）
+      makeup[day]     振替訪問の時間帯（なければ None）
+      canceled_mask   休みの日のビットマスク（ビット day。振替元と、定期訪問がある祝日）
+      holidays        祝日 {日: 名前}
+    """
+
+    def __init__(self, year, month, slots, transfers=(), holidays=True):
+        self.year = year
+        self.month = month
+        self.slots = list(slots)
+        self.transfers = list(transfers)
+        self.weeks = month_weeks(year, month)
+        self.num_days = calendar.monthrange(year, month)[1]
+        self.holidays = month_holidays(year, month)
+
+        self.slot_mask = [0] * (self.num_days + 1)
+        self.makeup = [None] * (self.num_days + 1)
+        self.canceled_mask = 0
+        self.holiday_canceled_mask = 0
+        self._resolve(holidays)
+
+    def _resolve(self, holidays):
+        # 日曜始まりの列番号 → その曜日に入っている枠のビット
+        column_mask = [0] * 7
+        explicit = []
+        for i, slot in enumerate(self.slots):
+            if 'days' in slot:
+                # 日付が指定されている枠はそれを使う（create_pdfの互換用）
+                explicit.append((i, slot['days']))
+            else:
+                column_mask[_SUNDAY_FIRST_COLUMN[slot['weekday']]] |= 1 << i
+
+        for week in self.weeks:
+            for column, day in enumerate(week):
+                if day:
+                    self.slot_mask[day] = column_mask[column]
+        for i, days in explicit:
+            for day in days:
+                self.slot_mask[day] |= 1 << i
+
+        if holidays:
+            for day in self.holidays:
+                if self.slot_mask[day]:
+                    self.holiday_canceled_mask |= 1 << day
+            self.canceled_mask = self.holiday_canceled_mask
+
+        for from_day, to_day, time_range in self.transfers:
+            self.canceled_mask |= 1 << from_day
+            self.makeup[to_day] = time_range
+
+    def is_canceled(self, day):
+        return bool(self.canceled_mask >> day & 1)
+
+    def holiday_name(self, day):
+        """祝日の名前（祝日でなければ None）"""
+        return self.holidays.get(day)
+
+    def is_makeup(self, day):
+        return self.makeup[day] is not None
+
+    def is_regular_visit(self, day):
+        """休みではない定期訪問がある日か"""
+        return bool(self.slot_mask[day]) and not self.is_canceled(day)
+
+    def regular_slots(self, day):
+        """その日の定期訪問の枠（休みの日は空）"""
+        if self.is_canceled(day):
+            return []
+        mask = self.slot_mask[day]
+        return [slot for i, slot in enumerate(self.slots) if mask >> i & 1]
+
+    def visit_days(self, slot_index):
+        """枠ごとの定期訪問日（休みも含む）"""
+        bit = 1 << slot_index
+        return [day for day in range(1, self.num_days + 1) if self.slot_mask[day] & bit]
+
+    def actual_days(self, slot_index):
+        """枠ごとの、休みを除いた訪問日"""
+        bit = 1 << slot_index
+        return [day for day in range(1, self.num_days + 1)
+                if self.slot_mask[day] & bit and not self.canceled_mask >> day & 1]
+
+    @property
+    def canceled_dates(self):
+        """休みの日（振替の登録順、続けて振替のない祝日の休み）"""
+        dates = [t[0] for t in self.transfers]
+        return dates + [day for day in sorted(self.holidays)
+                        if self.holiday_canceled_mask >> day & 1 and day not in dates]
+
+    @property
+    def makeup_visits(self):
+        """振替先の日 → 時間帯"""
+        return {t[1]: t[2] for t in self.transfers}
+
+    def transfer_options(self):
+        """振替元に選べる日（いずれかの定期訪問がある日。祝日の休みも振り替えられる）"""
+        return [day for day in range(1, self.num_days + 1) if self.slot_mask[day]]
+
+
+def resolve_month(year, month, slots, transfers=()):
+    """定期訪問の枠と振替から、1か月分の予定を解決する"""
+    return MonthSchedule(year, month, slots, transfers)
+
+
+def resolve_months(months, slots, transfers_by_month=None):
+    """
+    複数月の予定を解決する（ジェネレータ）
+    transfers_by_month は {(年, 月): [振替, ...]}。振替のない月は省略できる
+    """
+    transfers_by_month = transfers_by_month or {}
+    for year, month in months:
+        yield MonthSchedule(year, month, slots, transfers_by_month.get((year, month), ()))
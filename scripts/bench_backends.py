@@ -0,0 +1,82 @@
+"""matplotlib と native のPDFバックエンドを比較するベンチマーク
+
+レイテンシ（1ページあたり）、ピークRSS、ファイルサイズを表示する。
+ピークRSSはプロセス全体の値なので、バックエンドごとに別プロセスで計測する。
+
+使い方:
+    python scripts/bench_backends.py --pages 20
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+
+def measure(backend, pages):
+    """このプロセス内で1ページのPDFを pages 回作成して計測する"""
+    from calendar_pdf import create_pdf
+    from schedule import get_visit_days
+
+    year, month = 2025, 11  # 6週の月
+    visit1_config = {'weekday': '月曜日', 'time': '11:20-12:00',
+                     'days': get_visit_days(year, month, '月曜日')}
+    visit2_config = {'weekday': '水曜日', 'time': '11:00-11:40',
+                     'days': get_visit_days(year, month, '水曜日')}
+    transfers = [(3, 4, '9:00-9:40'), (12, 14, '16:00-17:00')]
+
+    # 1回目はフォント読み込みなどを含むので別に記録する
+    start = time.perf_counter()
+    pdf_buffer, _, _, _ = create_pdf(year, month, transfers, visit1_config, visit2_config, backend)
+    first = time.perf_counter() - start
+
+    latencies = []
+    for _ in range(pages):
+        start = time.perf_counter()
+        pdf_buffer, _, _, _ = create_pdf(year, month, transfers, visit1_config, visit2_config, backend)
+        latencies.append(time.perf_counter() - start)
+
+    return {
+        'backend': backend,
+        'first_ms': first * 1000,
+        'mean_ms': statistics.mean(latencies) * 1000,
+        'p50_ms': statistics.median(latencies) * 1000,
+        'max_ms': max(latencies) * 1000,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'bytes': len(pdf_buffer.getvalue()),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=20, help="バックエンドごとの作成回数")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(measure(args.child, args.pages)))
+        return 0
+
+    results = []
+    for backend in ('matplotlib', 'native'):
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--pages', str(args.pages), '--child', backend],
+            check=True, capture_output=True, text=True
+        ).stdout
+        results.append(json.loads(out.strip().splitlines()[-1]))
+
+    print(f"{'backend':<12}{'初回(ms)':>10}{'平均(ms)':>10}{'p50(ms)':>10}{'最大(ms)':>10}{'RSS(MB)':>10}{'サイズ(B)':>11}")
+    for r in results:
+        print(f"{r['backend']:<12}{r['first_ms']:>10.1f}{r['mean_ms']:>10.1f}{r['p50_ms']:>10.1f}"
+              f"{r['max_ms']:>10.1f}{r['peak_rss_mb']:>10.1f}{r['bytes']:>11}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""ケースロードの入力チェック（caseload_import.validate_rows）のベンチマーク
+
+--rows 行のケースロードCSVを作り（--error-rate の割合で、定時外・土曜・別の週への振替・
+同じ日の振替の重複などの誤りを混ぜる）、読み込みと全行のチェックの時間を計測する。
+比較用に、1行ずつ schedule.validate_schedule でチェックする時間も計測し、
+同じエラーが見つかることを確認する（定期訪問の枠にエラーがある行は、validate_schedule が
+振替のチェックを省くので、validate_schedule のエラーがすべて含まれていればよいとする）。
+
+使い方:
+    python scripts/bench_caseload_import.py --rows 1000 10000 50000
+"""
+import argparse
+import csv
+import io
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from caseload_import import read_rows, validate_rows  # noqa: E402
+from schedule import (  # noqa: E402
+    WEEKDAY_NAMES, format_time_range, get_visit_days, get_weekdays_in_same_week, parse_transfers, validate_schedule
+)
+
+YEAR, MONTH = 2025, 11
+
+
+def make_csv(rows, error_rate, seed=0):
+    """週2回の定期訪問と0〜2件の振替がある利用者 rows 人分のCSV（一部に誤りを入れる）"""
+    rng = random.Random(seed)
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(['patient', 'therapist', 'visit1_weekday', 'visit1_time', 'visit2_weekday', 'visit2_time',
+                     'transfers'])
+    for i in range(rows):
+        weekdays = rng.sample(WEEKDAY_NAMES, 2)
+        times = []
+        for _ in weekdays:
+            duration = rng.choice([40, 60])
+            start = rng.randrange(9 * 60, 17 * 60 + 30 - duration + 1, 5)
+            times.append(format_time_range(start // 60, start % 60, duration))
+        transfers = []
+        for from_day in rng.sample(get_visit_days(YEAR, MONTH, weekdays[0]), rng.randrange(3)):
+            targets = get_weekdays_in_same_week(YEAR, MONTH, from_day)
+            if targets:
+                transfers.append(f"{from_day}>{rng.choice(targets)} {times[0]}")
+
+        if rng.random() < error_rate:
+            kind = rng.randrange(5)
+            if kind == 0:
+                times[1] = '17:00-18:00'            # 定時外
+            elif kind == 1:
+                weekdays[1] = '土曜日'              # 平日でない
+            elif kind == 2 and transfers:
+                day = int(transfers[0].split('>')[0])
+                transfers.append(f"{day}>{day + 7} 10:00-10:40")  # 別の週・同じ日の振替の重複
+            elif kind == 3:
+                transfers.append("2>3 8:00-8:40")   # 振替元が定期訪問日でないことが多い・定時外
+            else:
+                transfers.append("いつか")          # 形式の誤り
+        writer.writerow([f"利用者{i:05d}", f"担当{i % 50}", weekdays[0], times[0], weekdays[1], times[1],
+                         '; '.join(transfers)])
+    return out.getvalue().encode('utf-8')
+
+
+def per_row_errors(rows):
+    """1行ずつ validate_schedule でチェックした {行番号: {エラー}}（比較用）"""
+    found = {}
+    for i, row in enumerate(rows):
+        slots = [{'weekday': row[f'visit{n}_weekday'], 'time': row[f'visit{n}_time']} for n in (1, 2)]
+        try:
+            transfers = parse_transfers(row['transfers'])
+        except ValueError:
+            found[i + 2] = None  # 形式の誤り（validate_schedule の前に失敗する）
+            continue
+        errors = validate_schedule(YEAR, MONTH, slots, transfers)
+        if errors:
+            found[i + 2] = set(errors)
+    return found
+
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return result, statistics.median(samples) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--error-rate', type=float, default=0.05, help="誤りを入れる行の割合")
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"{'行数':>8}{'読み込み(ms)':>14}{'チェック(ms)':>14}{'1行ずつ(ms)':>14}{'エラー':>8}  一致")
+    mismatches = 0
+    for n in args.rows:
+        data = make_csv(n, args.error_rate)
+        rows, read_ms = timed(lambda: read_rows(data), args.runs)
+        errors, check_ms = timed(lambda: validate_rows(rows, YEAR, MONTH), args.runs)
+        reference, naive_ms = timed(lambda: per_row_errors(rows), 1)
+
+        mine = {}
+        for error in errors:
+            mine.setdefault(error['row'], set()).add(error['message'])
+        bad = 0
+        for row, expected in reference.items():
+            got = mine.get(row, set())
+            if expected is None:
+                bad += not any('形式で指定' in message for message in got)
+            elif not expected <= got:
+                bad += 1
+        # validate_schedule でエラーのない行は、こちらでもエラーなし
+        bad += sum(1 for row in mine if row not in reference)
+        mismatches += bad
+        print(f"{n:>8}{read_ms:>14.1f}{check_ms:>14.1f}{naive_ms:>14.1f}{len(errors):>8}  {'OK' if not bad else f'{bad}行不一致'}")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""訪問の重なりチェック（conflicts.ConflictIndex）のベンチマーク
+
+ケースロードの人数を増やしながら、次の時間を計測する。
+- 区間の作成（全員分の予定の展開 + ソート）
+- 振替1件のチェック（振替入力中に毎回行うもの）
+- ケースロード全体の重なりの列挙（スイープライン）
+- 比較用: 全訪問の総当たり（--naive-limit 件以下のときだけ）
+
+使い方:
+    python scripts/bench_conflicts.py --patients 100 500 1000 2000 --therapists 1
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from conflicts import ConflictIndex, caseload_visits  # noqa: E402
+from schedule import WEEKDAY_NAMES, format_time_range  # noqa: E402
+
+
+def make_caseload(patients, therapists, seed=0):
+    """週2回・40分または60分の訪問をする利用者を patients 人作る"""
+    rng = random.Random(seed)
+    caseload = []
+    for i in range(patients):
+        slots = []
+        for weekday in rng.sample(WEEKDAY_NAMES, 2):
+            start = rng.randrange(9 * 60, 16 * 60 + 50, 5)
+            slots.append({'weekday': weekday,
+                          'time': format_time_range(start // 60, start % 60, rng.choice([40, 60]))})
+        caseload.append({'patient': f"利用者{i:05d}", 'therapist': f"担当{i % therapists}",
+                         'slots': slots, 'transfers': []})
+    return caseload
+
+
+def naive_conflicts(visits):
+    """総当たりで重なりを数える（比較用）"""
+    count = 0
+    for i, a in enumerate(visits):
+        for b in visits[i + 1:]:
+            if a.therapist == b.therapist and a.day == b.day and a.start < b.end and b.start < a.end:
+                count += 1
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--patients', type=int, nargs='+', default=[100, 500, 1000, 2000])
+    parser.add_argument('--therapists', type=int, default=10, help="担当者の数（1人が全員を担当するのが最も重い）")
+    parser.add_argument('--queries', type=int, default=2000, help="振替チェックの回数")
+    parser.add_argument('--naive-limit', type=int, default=5000, help="総当たりを計測する訪問数の上限")
+    parser.add_argument('--year', type=int, default=2025)
+    parser.add_argument('--month', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(1)
+    print(f"{'人数':>6}{'訪問数':>8}{'作成(ms)':>10}{'チェック(µs)':>14}{'p99(µs)':>10}"
+          f"{'全列挙(ms)':>12}{'重なり':>8}{'総当たり(ms)':>14}")
+    for patients in args.patients:
+        caseload = make_caseload(patients, args.therapists)
+
+        start = time.perf_counter()
+        visits = caseload_visits(args.year, args.month, caseload)
+        index = ConflictIndex(visits)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        # 振替入力中のチェック: ランダムな担当者・日・時間帯との重なり
+        latencies = []
+        for _ in range(args.queries):
+            therapist = f"担当{rng.randrange(args.therapists)}"
+            day = rng.randrange(1, 29)
+            begin = rng.randrange(9 * 60, 16 * 60 + 50, 5)
+            t = time.perf_counter()
+            index.overlapping(therapist, day, begin, begin + 40, exclude_patient="利用者00000")
+            latencies.append(time.perf_counter() - t)
+        latencies.sort()
+
+        start = time.perf_counter()
+        pairs = index.conflicts()
+        sweep_ms = (time.perf_counter() - start) * 1000
+
+        naive = "-"
+        if len(visits) <= args.naive_limit:
+            start = time.perf_counter()
+            assert naive_conflicts(visits) == len(pairs)
+            naive = f"{(time.perf_counter() - start) * 1000:.1f}"
+
+        print(f"{patients:>6}{len(visits):>8}{build_ms:>10.1f}{statistics.mean(latencies) * 1e6:>14.1f}"
+              f"{latencies[int(len(latencies) * 0.99)] * 1e6:>10.1f}{sweep_ms:>12.1f}{len(pairs):>8}{naive:>14}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
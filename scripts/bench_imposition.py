@@ -0,0 +1,67 @@
+"""面付け（batch.py --nup）のベンチマーク
+
+--patients 人分のケースロードを作り、バックエンドと面数ごとに batch.py --out を別プロセスで実行して、
+経過時間・pages/sec・用紙の枚数・CPU時間（ワーカープロセスを含む）・ファイルサイズを比べる。
+面付けはページを1回描いてフォームとして置くだけなので、CPU時間は面付けなしとほぼ同じで、用紙は 1/面数 になる。
+
+使い方:
+    python scripts/bench_imposition.py --patients 300 --backends native matplotlib --workers 4
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_caseload_import import YEAR, MONTH, make_csv  # noqa: E402
+from impose import sheet_count  # noqa: E402
+
+
+def run(caseload, out, backend, nup, workers):
+    """batch.py を別プロセスで実行して (経過秒, CPU秒) を返す"""
+    command = [sys.executable, os.path.join(ROOT, 'batch.py'), caseload, '--year', str(YEAR), '--month', str(MONTH),
+               '--out', out, '--backend', backend, '--workers', str(workers)]
+    if nup > 1:
+        command += ['--nup', str(nup)]
+    before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    start = time.perf_counter()
+    subprocess.run(command, check=True, capture_output=True)
+    elapsed = time.perf_counter() - start
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+    return elapsed, cpu
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--patients', type=int, default=300)
+    parser.add_argument('--backends', nargs='+', default=['native', 'matplotlib'])
+    parser.add_argument('--nups', type=int, nargs='+', default=[1, 2, 4], help="面数（1 は面付けなし）")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        caseload = os.path.join(tmp, 'caseload.csv')
+        with open(caseload, 'wb') as f:
+            f.write(make_csv(args.patients, 0))
+        print(f"{args.patients}人分（{args.workers}プロセス）")
+        print(f"{'バックエンド':<12}{'面数':>4}{'用紙(枚)':>10}{'時間(秒)':>10}{'pages/sec':>11}"
+              f"{'CPU(秒)':>10}{'サイズ(KB)':>12}")
+        for backend in args.backends:
+            for nup in args.nups:
+                out = os.path.join(tmp, f'{backend}_{nup}.pdf')
+                elapsed, cpu = run(caseload, out, backend, nup, args.workers)
+                sheets = sheet_count(args.patients, nup)
+                print(f"{backend:<12}{nup:>4}{sheets:>10}{elapsed:>10.2f}{args.patients / elapsed:>11.1f}"
+                      f"{cpu:>10.2f}{os.path.getsize(out) / 1024:>12.0f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
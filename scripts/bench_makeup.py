@@ -0,0 +1,80 @@
+"""振替先の候補探し（slot_finder.FreeTimeIndex）のベンチマーク
+
+ケースロードの全訪問を1件ずつ「休み」にして振替先の候補を探し、1件あたりの時間を計測する。
+比較用に、候補の日・5分刻みの開始時刻ごとに担当者の全訪問と重なりを調べる総当たりも計測し、
+空き時間が一致することを確認する。
+
+使い方:
+    python scripts/bench_makeup.py --patients 100 500 1000 2000 --therapists 10
+"""
+import argparse
+import os
+import sys
+import time
+from collections import defaultdict
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from bench_conflicts import make_caseload  # noqa: E402
+from conflicts import caseload_visits  # noqa: E402
+from schedule import WORK_END_MINUTES, WORK_START_MINUTES, get_weekdays_in_same_week  # noqa: E402
+from slot_finder import SLOT_MINUTES, FreeTimeIndex  # noqa: E402
+
+
+def brute_force_starts(visits_by_therapist, therapist, year, month, from_day, duration):
+    """候補の日・開始時刻ごとに担当者の全訪問と比べる（比較用）"""
+    found = []
+    for day in get_weekdays_in_same_week(year, month, from_day):
+        for begin in range(WORK_START_MINUTES, WORK_END_MINUTES - duration + 1, SLOT_MINUTES):
+            if all(not (v.day == day and v.start < begin + duration and begin < v.end)
+                   for v in visits_by_therapist[therapist]):
+                found.append((day, begin))
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--patients', type=int, nargs='+', default=[100, 500, 1000, 2000])
+    parser.add_argument('--therapists', type=int, default=10)
+    parser.add_argument('--brute-limit', type=int, default=300, help="総当たりで調べる休みの件数")
+    parser.add_argument('--year', type=int, default=2025)
+    parser.add_argument('--month', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    print(f"{'人数':>6}{'訪問数':>8}{'索引作成(ms)':>14}{'候補探し(µs/件)':>18}{'総当たり(µs/件)':>18}{'倍率':>8}")
+    for patients in args.patients:
+        visits = caseload_visits(args.year, args.month, make_caseload(patients, args.therapists))
+
+        start = time.perf_counter()
+        index = FreeTimeIndex(visits)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        for v in visits:
+            index.suggest(args.year, args.month, v.day, f"{v.start // 60}:{v.start % 60:02d}-"
+                          f"{v.end // 60}:{v.end % 60:02d}", v.therapist, v.patient)
+        fast_us = (time.perf_counter() - start) / len(visits) * 1e6
+
+        visits_by_therapist = defaultdict(list)
+        for v in visits:
+            visits_by_therapist[v.therapist].append(v)
+        sample = visits[:args.brute_limit]
+        start = time.perf_counter()
+        expected = [brute_force_starts(visits_by_therapist, v.therapist, args.year, args.month, v.day, v.end - v.start)
+                    for v in sample]
+        brute_us = (time.perf_counter() - start) / len(sample) * 1e6
+
+        # 空き時間が総当たりと一致するか（訪問の時刻は5分刻みなので完全に一致する）
+        for v, found in zip(sample, expected):
+            fast = [(day, begin) for day in get_weekdays_in_same_week(args.year, args.month, v.day)
+                    for begin in index.free_starts(v.therapist, day, v.end - v.start)]
+            assert fast == found, (v, fast[:5], found[:5])
+
+        print(f"{patients:>6}{len(visits):>8}{build_ms:>14.1f}{fast_us:>18.1f}{brute_us:>18.1f}"
+              f"{brute_us / fast_us:>7.0f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
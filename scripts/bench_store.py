@@ -0,0 +1,112 @@
+"""SQLiteの保存先（store.ScheduleStore）のベンチマーク
+
+利用者を --patients 人登録し（週2回の定期訪問 + 月に数件の振替）、--months か月分の visits を展開してから、
+よく使う読み込みのレイテンシ（p50 / p99）を計測する。
+- 1か月分の全員の予定（load_month。ケースロード全体の重なりチェック用）
+- 1人・1か月分の予定（patient_month。アプリで利用者を選んだとき）
+- 担当者の1日・1週間の訪問（therapist_visits。索引 (therapist, date) を使う）
+- 1人分の保存（save_patient。振替を追加したとき）
+
+使い方:
+    python scripts/bench_store.py --patients 6000 --months 2 --therapists 200
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from bench_conflicts import make_caseload  # noqa: E402
+from schedule import get_visit_days, get_weekdays_in_same_week, month_range  # noqa: E402
+from store import ScheduleStore  # noqa: E402
+
+
+def add_transfers(caseload, year, month, rng):
+    """利用者ごとに0〜2件の振替（同じ週の平日へ）を付ける"""
+    for patient in caseload:
+        transfers = []
+        for slot in rng.sample(patient['slots'], rng.randint(0, 2)):
+            days = get_visit_days(year, month, slot['weekday'])
+            from_day = rng.choice(days)
+            targets = get_weekdays_in_same_week(year, month, from_day)
+            if targets and from_day not in [t[0] for t in transfers]:
+                transfers.append((from_day, rng.choice(targets), slot['time']))
+        patient['transfers'] = transfers
+
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return samples[len(samples) // 2] * 1000, samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--patients', type=int, default=6000)
+    parser.add_argument('--therapists', type=int, default=200)
+    parser.add_argument('--months', type=int, default=2, help="展開する月数（2025年10月から）")
+    parser.add_argument('--runs', type=int, default=200, help="読み込みごとの計測回数")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(0)
+    months = month_range((2025, 10), (2025 + (10 + args.months - 2) // 12, (10 + args.months - 2) % 12 + 1))
+    caseload = make_caseload(args.patients, args.therapists)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ScheduleStore(os.path.join(tmp, 'bench.db'))
+
+        start = time.perf_counter()
+        for year, month in months:
+            add_transfers(caseload, year, month, rng)
+            store.save_patients(caseload, year, month)
+        save_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        total = sum(store.count_visits(year, month) for year, month in months)
+        expand_s = time.perf_counter() - start
+        print(f"利用者 {args.patients}人・担当者 {args.therapists}人・{len(months)}か月 → visits {total}件")
+        print(f"  まとめて保存 {save_s * 1000:.0f} ms / visitsの展開 {expand_s * 1000:.0f} ms"
+              f" / DB {os.path.getsize(os.path.join(tmp, 'bench.db')) / 1e6:.1f} MB")
+
+        year, month = months[0]
+        names = [p['patient'] for p in caseload]
+        therapists = sorted({p['therapist'] for p in caseload})
+        first = date(year, month, 1)
+
+        def one_day():
+            day = (first + timedelta(days=rng.randrange(28))).isoformat()
+            store.therapist_visits(rng.choice(therapists), day, day)
+
+        def one_week():
+            day = first + timedelta(days=rng.randrange(21))
+            store.therapist_visits(rng.choice(therapists), day.isoformat(), (day + timedelta(days=6)).isoformat())
+
+        def save_one():
+            patient = rng.choice(caseload)
+            store.save_patient(patient['patient'], patient['slots'], year, month, patient['transfers'])
+
+        print(f"{'読み込み':<28}{'p50(ms)':>10}{'p99(ms)':>10}")
+        for label, fn, runs in [
+            ("1か月分の全員 (load_month)", lambda: store.load_month(year, month), max(5, args.runs // 20)),
+            ("1人・1か月 (patient_month)", lambda: store.patient_month(rng.choice(names), year, month), args.runs),
+            ("担当者の1日 (therapist_visits)", one_day, args.runs),
+            ("担当者の1週間 (therapist_visits)", one_week, args.runs),
+            ("1人分の保存 (save_patient)", save_one, max(10, args.runs // 4)),
+        ]:
+            p50, p99 = timed(fn, runs)
+            print(f"{label:<28}{p50:>10.2f}{p99:>10.2f}")
+        store.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
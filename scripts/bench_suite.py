@@ -0,0 +1,273 @@
+"""変更で遅くなっていないかを確認するベンチマーク一式
+
+計測するもの:
+  - schedule.get_visit_days / get_weekdays_in_same_week（1回あたり）
+  - create_pdf（4週・5週・6週の月 × 振替なし・振替多数 × バックエンド）
+      cold: 新しいプロセスでの初回（ライブラリ・フォントの読み込みを含む）
+      warm: 読み込み済みのプロセスでの2回目以降
+  - AppTest での app.py 全体の再実行
+
+それぞれ時間（ミリ秒。繰り返しの中央値）、ピークメモリ（tracemallocで計測したPythonの割り当て。KB）、
+PDFのサイズ（バイト）を記録し、JSONに書き出す。--baseline を指定すると基準値と比べ、
+しきい値を超えて悪くなった項目があれば終了コード1を返す（時間は繰り返しの最小値で比べる）。
+ネットワークは使わない。
+
+時間は実行するマシンで大きく変わるので、基準値は同じマシンで作ったものと比べる:
+    python scripts/bench_suite.py --update-baseline           # scripts/bench_baseline.json を作り直す
+    python scripts/bench_suite.py --baseline scripts/bench_baseline.json --out bench_result.json
+    python scripts/bench_suite.py --baseline scripts/bench_baseline.json --time-threshold 0.3 --only pdf
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, ROOT)
+
+DEFAULT_BASELINE = os.path.join(ROOT, 'scripts', 'bench_baseline.json')
+
+# 日曜始まりで4週・5週・6週になる月
+MONTHS = {'4週': (2026, 2), '5週': (2025, 10), '6週': (2025, 11)}
+BACKENDS = ('matplotlib', 'native')
+VISIT1 = {'weekday': '月曜日', 'time': '11:20-12:00'}
+VISIT2 = {'weekday': '水曜日', 'time': '11:00-11:40'}
+
+
+def many_transfers(year, month):
+    """月曜の定期訪問をすべて同じ週の最後の平日に振り替える"""
+    from schedule import get_visit_days, get_weekdays_in_same_week
+
+    transfers = []
+    for day in get_visit_days(year, month, VISIT1['weekday']):
+        targets = get_weekdays_in_same_week(year, month, day)
+        if targets:
+            transfers.append((day, targets[-1], '16:00-16:40'))
+    return transfers
+
+
+def pdf_args(label, transfers):
+    year, month = MONTHS[label]
+    return year, month, many_transfers(year, month) if transfers == 'many' else []
+
+
+def measure(fn, repeat, number=1):
+    """fn を number 回呼ぶのを repeat 回計測し、1回あたりの時間（中央値・最小）とピークメモリを返す"""
+    result = fn()  # 計測前に1回（キャッシュの作成などを含めない）
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, {
+        'time_ms': statistics.median(samples) * 1000,
+        'min_ms': min(samples) * 1000,
+        'peak_kb': peak / 1024,
+    }
+
+
+def bench_schedule(repeat):
+    from schedule import WEEKDAY_NAMES, get_visit_days, get_weekdays_in_same_week
+
+    def visit_days():
+        for year, month in MONTHS.values():
+            for weekday in WEEKDAY_NAMES:
+                get_visit_days(year, month, weekday)
+
+    def same_week():
+        for year, month in MONTHS.values():
+            for day in (1, 9, 17, 25):
+                get_weekdays_in_same_week(year, month, day)
+
+    # 1回あたりの時間にするため、呼び出し回数で割る
+    calls = {'get_visit_days': (visit_days, len(MONTHS) * len(WEEKDAY_NAMES)),
+             'get_weekdays_in_same_week': (same_week, len(MONTHS) * 4)}
+    results = {}
+    for name, (fn, count) in calls.items():
+        _, stats = measure(fn, repeat, number=200)
+        stats['time_ms'] /= count
+        stats['min_ms'] /= count
+        results[f'schedule/{name}'] = stats
+    return results
+
+
+def bench_pdf_warm(repeat):
+    from calendar_pdf import create_pdf
+
+    results = {}
+    for backend in BACKENDS:
+        for label in MONTHS:
+            for transfers in ('0', 'many'):
+                year, month, transfer_list = pdf_args(label, transfers)
+                pdf, stats = measure(
+                    lambda: create_pdf(year, month, transfer_list, VISIT1, VISIT2, backend)[0], repeat)
+                stats['bytes'] = len(pdf.getvalue())
+                results[f'pdf/warm/{backend}/{label}/振替{transfers}'] = stats
+    return results
+
+
+def pdf_cold(backend, trace=False):
+    """このプロセスで初めて PDF を作る時間（import・フォントの読み込みを含む）"""
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    from calendar_pdf import create_pdf
+    year, month, transfer_list = pdf_args('6週', 'many')
+    pdf = create_pdf(year, month, transfer_list, VISIT1, VISIT2, backend)[0]
+    elapsed = time.perf_counter() - start
+    result = {'time_ms': elapsed * 1000, 'bytes': len(pdf.getvalue())}
+    if trace:
+        result['peak_kb'] = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+    return result
+
+
+def bench_pdf_cold(repeat):
+    """
+    バックエンドごとに新しいプロセスを repeat 回起動して初回の作成時間を計る
+    tracemalloc はimportを数倍遅くするので、ピークメモリは別のプロセスで計る
+    """
+    def child(backend, *extra):
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child-cold', backend, *extra],
+            check=True, capture_output=True, text=True, cwd=ROOT
+        ).stdout
+        return json.loads(out.strip().splitlines()[-1])
+
+    results = {}
+    for backend in BACKENDS:
+        runs = [child(backend) for _ in range(repeat)]
+        times = [r['time_ms'] for r in runs]
+        results[f'pdf/cold/{backend}'] = {
+            'time_ms': statistics.median(times), 'min_ms': min(times),
+            'peak_kb': child(backend, '--trace')['peak_kb'], 'bytes': runs[-1]['bytes'],
+        }
+    return results
+
+
+def bench_app(repeat):
+    """AppTest で年月を変えてページ全体を再実行する時間"""
+    from streamlit.testing.v1 import AppTest
+
+    from calendar_pdf import warm_up
+
+    # app.py はPDF作成用ライブラリをバックグラウンドで読み込むので、計測とぶつからないよう先に済ませる
+    warm_up()
+    at = AppTest.from_file(os.path.join(ROOT, 'app.py'), default_timeout=60)
+    at.run()  # 1回目はimportやキャッシュの作成を含むので捨てる
+    months = iter(range(10 ** 6))
+
+    def rerun():
+        at.selectbox(key="month").set_value(next(months) % 12 + 1).run()
+        assert not at.exception, at.exception
+
+    _, stats = measure(rerun, repeat)
+    return {'app/rerun': stats}
+
+
+SUITES = {'schedule': bench_schedule, 'pdf': bench_pdf_warm, 'cold': bench_pdf_cold, 'app': bench_app}
+
+
+def environment():
+    return {'python': platform.python_version(), 'machine': platform.machine(),
+            'system': platform.system(), 'cpus': os.cpu_count()}
+
+
+def compare(results, baseline, thresholds, time_floor_ms):
+    """基準値より悪くなった項目のリスト [(項目, 指標, 基準値, 今回, 比率), ...]"""
+    regressions = []
+    for name, stats in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for metric, threshold in thresholds.items():
+            if metric not in stats or not base.get(metric):
+                continue
+            old, new = base[metric], stats[metric]
+            # ごく短い時間はぶれが大きいので、差が time_floor_ms 未満なら無視する
+            if metric == 'min_ms' and new - old < time_floor_ms:
+                continue
+            if new > old * (1 + threshold):
+                regressions.append((name, metric, old, new, new / old))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--only', nargs='+', choices=sorted(SUITES), help="実行するグループ（省略時はすべて）")
+    parser.add_argument('--repeat', type=int, default=5, help="計測の繰り返し回数")
+    parser.add_argument('--out', help="結果を書き出すJSONファイル")
+    parser.add_argument('--baseline', help="比べる基準値のJSONファイル")
+    parser.add_argument('--update-baseline', nargs='?', const=DEFAULT_BASELINE, metavar='PATH',
+                        help=f"結果を基準値として保存する（省略時は {os.path.relpath(DEFAULT_BASELINE, ROOT)}）")
+    parser.add_argument('--time-threshold', type=float, default=0.25, help="時間の悪化の許容割合")
+    parser.add_argument('--memory-threshold', type=float, default=0.25, help="ピークメモリの悪化の許容割合")
+    parser.add_argument('--size-threshold', type=float, default=0.05, help="PDFサイズの増加の許容割合")
+    parser.add_argument('--time-floor-ms', type=float, default=0.05, help="これより小さい時間の差は無視する")
+    parser.add_argument('--child-cold', help=argparse.SUPPRESS)
+    parser.add_argument('--trace', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child_cold:
+        print(json.dumps(pdf_cold(args.child_cold, args.trace)))
+        return 0
+
+    # app.py が作るデータベースをリポジトリに置かないように一時ファイルにする
+    os.environ.setdefault('REHAB_CALENDAR_DB', os.path.join(tempfile.mkdtemp(), 'bench.db'))
+
+    results = {}
+    for name in args.only or SUITES:
+        start = time.perf_counter()
+        results.update(SUITES[name](args.repeat))
+        print(f"{name}: {time.perf_counter() - start:.1f}秒", file=sys.stderr)
+
+    print(f"{'項目':<40}{'時間(ms)':>12}{'最小(ms)':>12}{'ピーク(KB)':>12}{'サイズ(B)':>10}")
+    for name, stats in results.items():
+        size = stats.get('bytes', '')
+        print(f"{name:<40}{stats['time_ms']:>12.4f}{stats['min_ms']:>12.4f}{stats['peak_kb']:>12.1f}{size:>10}")
+
+    report = {'environment': environment(), 'results': results}
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.update_baseline:
+        with open(args.update_baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+            f.write('\n')
+        print(f"基準値を保存しました: {args.update_baseline}", file=sys.stderr)
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get('environment') != report['environment']:
+        print(f"※ 基準値は別の環境で計測されています: {baseline.get('environment')}", file=sys.stderr)
+    # 時間はほかの処理に割り込まれたぶれを除くため、中央値ではなく最小値で比べる
+    thresholds = {'min_ms': args.time_threshold, 'peak_kb': args.memory_threshold, 'bytes': args.size_threshold}
+    regressions = compare(results, baseline['results'], thresholds, args.time_floor_ms)
+    missing = [name for name in results if name not in baseline['results']]
+    if missing:
+        print(f"※ 基準値にない項目: {', '.join(missing)}", file=sys.stderr)
+    if regressions:
+        print("\n■ 基準値より悪くなった項目")
+        for name, metric, old, new, ratio in regressions:
+            print(f"  {name} {metric}: {old:.4g} → {new:.4g}（{ratio:.2f}倍）")
+        return 1
+    print("\n基準値と比べて悪くなった項目はありません")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
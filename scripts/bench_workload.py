@@ -0,0 +1,153 @@
+"""訪問の集計（workload.Workload）のベンチマーク
+
+担当者 --therapists 人・1人あたり --patients 人の利用者の --months か月分（月ごとに振替あり）について、
+次の時間を計測する。
+- 配列の作成（全員分の予定の展開。ケースロードやデータベースが変わったときだけ）
+- 絞り込みを変えたときの集計（担当者・週・月ごと、時間帯ごと。ランダムな担当者・期間で --queries 回）
+- 比較用: 1人・1か月ずつ MonthSchedule をたどって担当者ごとに集計する時間
+比較用の集計と、担当者ごとの件数・時間・休み・振替・稼働率が一致することも確認する（不一致なら終了コード1）。
+
+使い方:
+    python scripts/bench_workload.py --therapists 50 --patients 20 --months 12
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from collections import defaultdict
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from ics_export import caseload_entries  # noqa: E402
+from schedule import (  # noqa: E402
+    WEEKDAY_NAMES, WORK_START_MINUTES, format_time_range, get_visit_days, get_weekdays_in_same_week, month_range,
+    parse_time_range, resolve_month
+)
+from slot_finder import SLOT_MINUTES, SLOTS_PER_DAY  # noqa: E402
+from workload import GROUPS, build_workload  # noqa: E402
+
+
+def make_caseload(therapists, patients, months, seed=0):
+    """週2回の利用者と、月ごとの振替（利用者の3割が月に1回）"""
+    rng = random.Random(seed)
+    caseload = []
+    for t in range(therapists):
+        for p in range(patients):
+            slots = []
+            for weekday in rng.sample(WEEKDAY_NAMES, 2):
+                duration = rng.choice([40, 60])
+                start = rng.randrange(9 * 60, 17 * 60 + 30 - duration + 1, 5)
+                slots.append({'weekday': weekday, 'time': format_time_range(start // 60, start % 60, duration)})
+            caseload.append({'patient': f"利用者{t:02d}-{p:02d}", 'therapist': f"担当{t:02d}", 'slots': slots})
+    by_month = {}
+    for year, month in months:
+        entries = []
+        for patient in caseload:
+            transfers = []
+            if rng.random() < 0.3:
+                from_day = rng.choice(get_visit_days(year, month, patient['slots'][0]['weekday']))
+                targets = get_weekdays_in_same_week(year, month, from_day)
+                if targets:
+                    transfers.append((from_day, rng.choice(targets), patient['slots'][0]['time']))
+            entries.append(dict(patient, transfers=transfers))
+        by_month[(year, month)] = entries
+    return by_month
+
+
+def per_patient_summary(months, by_month):
+    """1人・1か月ずつたどった担当者ごとの集計（比較用）"""
+    totals = defaultdict(lambda: {'regular': 0, 'makeup': 0, 'canceled': 0, 'minutes': 0})
+    busy = defaultdict(set)  # 担当者 → {(年, 月, 日, 5分枠)}
+    workdays = 0
+    for year, month in months:
+        for patient in by_month[(year, month)]:
+            schedule = resolve_month(year, month, patient['slots'], patient['transfers'])
+            row = totals[patient['therapist']]
+            for day in range(1, schedule.num_days + 1):
+                visits = []
+                for i, slot in enumerate(schedule.slots):
+                    if schedule.slot_mask[day] >> i & 1:
+                        if schedule.is_canceled(day):
+                            row['canceled'] += 1
+                        else:
+                            row['regular'] += 1
+                            visits.append(parse_time_range(slot['time']))
+                if schedule.is_makeup(day):
+                    row['makeup'] += 1
+                    visits.append(parse_time_range(schedule.makeup[day]))
+                for start, end in visits:
+                    row['minutes'] += end - start
+                    first = (start - WORK_START_MINUTES) // SLOT_MINUTES
+                    last = -(-(end - WORK_START_MINUTES) // SLOT_MINUTES)
+                    busy[patient['therapist']].update((year, month, day, s) for s in range(first, last))
+        schedule = resolve_month(year, month, [])
+        workdays += sum(1 for week in schedule.weeks for day in week[1:6]
+                        if day and schedule.holiday_name(day) is None)
+    for therapist, row in totals.items():
+        row['utilization'] = len(busy[therapist]) / (workdays * SLOTS_PER_DAY)
+    return totals
+
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return result, statistics.median(samples) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--therapists', type=int, default=50)
+    parser.add_argument('--patients', type=int, default=20, help="担当者1人あたりの利用者の数")
+    parser.add_argument('--months', type=int, default=12)
+    parser.add_argument('--start', default='2025-04', help="最初の月")
+    parser.add_argument('--queries', type=int, default=50, help="絞り込みを変える回数")
+    args = parser.parse_args(argv)
+
+    year, month = map(int, args.start.split('-'))
+    end_year, end_month = divmod(year * 12 + month - 1 + args.months - 1, 12)
+    months = month_range((year, month), (end_year, end_month + 1))
+    by_month = make_caseload(args.therapists, args.patients, months)
+
+    workload, build_ms = timed(
+        lambda: build_workload(months, caseload_entries(months, lambda y, m: by_month[(y, m)])), 3)
+    print(f"{len(months)}か月・担当者{len(workload.therapists)}人・{workload.size}件の訪問"
+          f"（休みを含む）: 配列の作成 {build_ms:.0f} ms")
+
+    rng = random.Random(1)
+    names = workload.therapists
+    for by in GROUPS + ('hourly',):
+        samples = []
+        for _ in range(args.queries):
+            selected = rng.sample(names, rng.randint(1, len(names)))
+            first, last = sorted(rng.sample(range(len(months)), 2)) if len(months) > 1 else (0, 0)
+            start = time.perf_counter()
+            if by == 'hourly':
+                workload.hourly(selected, months[first], months[last])
+            else:
+                workload.summary(by, selected, months[first], months[last])
+            samples.append(time.perf_counter() - start)
+        _, all_ms = timed(lambda: workload.hourly() if by == 'hourly' else workload.summary(by), 5)
+        print(f"  {by:<10} 絞り込みあり p50 {statistics.median(samples) * 1000:6.2f} ms / "
+              f"最大 {max(samples) * 1000:6.2f} ms   全員・全期間 {all_ms:6.2f} ms")
+
+    reference, naive_ms = timed(lambda: per_patient_summary(months, by_month), 1)
+    print(f"比較用（1人・1か月ずつ）: {naive_ms:.0f} ms")
+    mismatches = 0
+    for row in workload.summary('therapist'):
+        expected = reference[row['group']]
+        if any(row[key] != expected[key] for key in ('regular', 'makeup', 'canceled', 'minutes')) \
+                or abs(row['utilization'] - expected['utilization']) > 1e-9:
+            mismatches += 1
+            print(f"  不一致: {row['group']} {row} {dict(expected)}")
+    print("担当者ごとの集計: " + ("一致" if not mismatches else f"{mismatches}人不一致"))
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""コールドスタートの時間を計測し、予算を超えていないか確認する
+
+- 画面表示までに必要なimport（streamlit + アプリのモジュール）のモジュール別時間
+- PDF作成用ライブラリの読み込み・フォント設定にかかる時間（初回PDF作成時／事前読み込み時）
+
+画面表示前に matplotlib などの重いライブラリが読み込まれていたり、
+予算（--budget-ms）を超えていたりすると終了コード1を返す。
+
+使い方:
+    python scripts/cold_start.py --budget-ms 2000
+"""
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# 画面表示前に読み込まれてはいけないもの
+HEAVY_MODULES = ('matplotlib', 'japanize_matplotlib', 'fontTools', 'numpy')
+
+
+def ui_imports(path=os.path.join(ROOT, 'app.py')):
+    """app.py がトップレベルで読み込むモジュール（画面表示前に読み込まれるもの）のimport文"""
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            names = [node.module]
+        else:
+            continue
+        modules += [name for name in names if name not in modules]
+    return "import " + ", ".join(modules)
+
+
+def import_times(statement):
+    """python -X importtime の出力を (モジュール名, 自身のμs, 累積μs) のリストにする"""
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((name[1:].rstrip(), int(self_us), int(cumulative_us)))  # 先頭の空白はネストの深さ
+    return rows
+
+
+def render_stack_timings():
+    """別プロセスでPDF作成用ライブラリを読み込み、calendar_pdf.STARTUP_TIMINGSを返す"""
+    code = "import json, calendar_pdf; print(json.dumps(calendar_pdf.warm_up()))"
+    proc = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--budget-ms', type=float, default=2000,
+                        help="画面表示前のimport時間の上限（ミリ秒）")
+    parser.add_argument('--top', type=int, default=15, help="表示するモジュール数")
+    args = parser.parse_args(argv)
+
+    rows = import_times(ui_imports())
+    # トップレベル（インデントなし）のimportの累積時間の合計 = 全体のimport時間
+    total_ms = sum(cumulative for name, _, cumulative in rows if not name.startswith(' ')) / 1000
+    print(f"■ 画面表示前のimport: {total_ms:.0f} ms（予算 {args.budget_ms:.0f} ms）")
+    for name, self_us, cumulative_us in sorted(rows, key=lambda r: -r[2])[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms（自身 {self_us / 1000:6.1f} ms）  {name.strip()}")
+
+    heavy = sorted({name.strip() for name, _, _ in rows
+                    if name.strip().split('.')[0] in HEAVY_MODULES})
+
+    print("■ PDF作成用ライブラリ（初回PDF作成時 / 事前読み込み）")
+    for key, seconds in render_stack_timings().items():
+        print(f"  {seconds * 1000:8.1f} ms  {key}")
+
+    failed = False
+    if heavy:
+        print(f"NG: 画面表示前に重いモジュールが読み込まれています: {', '.join(heavy[:5])}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print(f"NG: import時間が予算を超えています（{total_ms:.0f} ms > {args.budget_ms:.0f} ms）")
+        failed = True
+    if not failed:
+        print("OK")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""フォントの埋め込み方・圧縮レベルごとのPDFのサイズと作成時間を比べる
+
+設定（バックエンド × fonttype × 圧縮レベル）ごとに別プロセスで、次の3つを作って計測する。
+  1ページ        create_pdf の時間（中央値）と、そのうち savefig の時間・サイズ
+  12か月         render_months で1つの文書にした12ページ
+  N人まとめ      batch.py --out と同じ作り方（1人ずつ作ってpypdfでつなげる）と、--single-document
+埋め込まれたフォントの数も数えるので、1つの文書でフォントが1回だけ埋め込まれているか確認できる。
+
+使い方:
+    python scripts/font_report.py --runs 5 --patients 10
+    python scripts/font_report.py --json font_report.json
+"""
+import argparse
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, ROOT)
+
+# (バックエンド, fonttype, 圧縮レベル)。native は常にTrueTypeのサブセット
+CONFIGS = [
+    ('matplotlib', 3, 0), ('matplotlib', 3, 6), ('matplotlib', 3, 9),
+    ('matplotlib', 42, 0), ('matplotlib', 42, 6), ('matplotlib', 42, 9),
+    ('native', 42, 0), ('native', 42, 6), ('native', 42, 9),
+]
+VISIT1 = {'weekday': '月曜日', 'time': '11:20-12:00'}
+VISIT2 = {'weekday': '水曜日', 'time': '11:00-11:40'}
+
+
+def count_fonts(data):
+    """PDF内のページから参照されているフォント（重複を除く）の数"""
+    from pypdf import PdfReader
+
+    fonts = set()
+    for page in PdfReader(io.BytesIO(data)).pages:
+        resources = page.get('/Resources') or {}
+        for ref in (resources.get('/Font') or {}).values():
+            fonts.add(getattr(ref, 'idnum', id(ref)))
+    return len(fonts)
+
+
+def measure(backend, runs, patients):
+    """このプロセスの設定（環境変数）で計測する"""
+    import metrics
+    from batch import render_merged
+    from calendar_pdf import create_pdf, render_months, warm_up
+    from schedule import month_range, resolve_months
+
+    warm_up(backend)
+    metrics.enable()
+    year, month = 2025, 11
+    transfers = [(10, 11, '9:00-9:40'), (17, 19, '16:00-16:40')]
+
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        pdf = create_pdf(year, month, transfers, VISIT1, VISIT2, backend)[0].getvalue()
+        times.append(time.perf_counter() - start)
+    savefig = {row['span']: row['mean_ms'] for row in metrics.REGISTRY.summary()}
+    result = {
+        'page_ms': statistics.median(times) * 1000,
+        'savefig_ms': savefig.get('pdf.savefig', savefig.get('pdf.native_write', 0.0)),
+        'page_bytes': len(pdf),
+        'page_fonts': count_fonts(pdf),
+    }
+
+    buffer = io.BytesIO()
+    start = time.perf_counter()
+    render_months(buffer, resolve_months(month_range((2025, 1), (2025, 12)), [VISIT1, VISIT2]), backend)
+    result.update(year_ms=(time.perf_counter() - start) * 1000, year_bytes=len(buffer.getvalue()),
+                  year_fonts=count_fonts(buffer.getvalue()))
+
+    caseload = [{'patient': f"利用者{i}", 'slots': [VISIT1, VISIT2], 'transfers': transfers} for i in range(patients)]
+    path = os.path.join(ROOT, f".font_report_{os.getpid()}.pdf")
+    try:
+        for label, single in (('merged', False), ('single', True)):
+            start = time.perf_counter()
+            render_merged(caseload, year, month, path, os.cpu_count() or 1, backend, single_document=single)
+            elapsed = time.perf_counter() - start
+            with open(path, 'rb') as f:
+                data = f.read()
+            result.update({f'{label}_ms': elapsed * 1000, f'{label}_bytes': len(data),
+                           f'{label}_fonts': count_fonts(data)})
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help="1ページの作成回数")
+    parser.add_argument('--patients', type=int, default=10, help="まとめて作る人数")
+    parser.add_argument('--json', help="結果を書き出すJSONファイル")
+    parser.add_argument('--child', nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(measure(args.child[0], args.runs, args.patients)))
+        return 0
+
+    results = []
+    for backend, fonttype, compression in CONFIGS:
+        env = dict(os.environ, REHAB_CALENDAR_PDF_FONTTYPE=str(fonttype),
+                   REHAB_CALENDAR_PDF_COMPRESSION=str(compression))
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--runs', str(args.runs), '--patients', str(args.patients),
+             '--child', backend, str(fonttype), str(compression)],
+            env=env, check=True, capture_output=True, text=True, cwd=ROOT
+        ).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        result.update(backend=backend, fonttype=fonttype, compression=compression)
+        results.append(result)
+        print(f"{backend} fonttype={fonttype} compression={compression}: 完了", file=sys.stderr)
+
+    n = args.patients
+    print(f"{'設定':<22}{'1ページ(ms)':>12}{'savefig':>9}{'サイズ':>9}{'12か月':>9}{'フォント':>9}"
+          f"{f'{n}人つなげ':>10}{'フォント':>9}{f'{n}人1文書':>10}{'フォント':>9}")
+    for r in results:
+        label = f"{r['backend']} {r['fonttype']} z{r['compression']}"
+        print(f"{label:<22}{r['page_ms']:>12.0f}{r['savefig_ms']:>9.0f}{r['page_bytes']:>9}"
+              f"{r['year_bytes']:>9}{r['year_fonts']:>9}{r['merged_bytes']:>10}{r['merged_fonts']:>9}"
+              f"{r['single_bytes']:>10}{r['single_fonts']:>9}")
+    print("\nサイズはバイト。フォントは埋め込まれたフォントの数（1つの文書なら1回だけになる）")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
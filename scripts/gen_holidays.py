@@ -0,0 +1,184 @@
+"""日本の祝日表（holiday_table.py）を作る
+
+「国民の祝日に関する法律」のルール（春分・秋分の日の計算式、振替休日、国民の休日、
+ハッピーマンデー、東京オリンピックの年の移動、皇室行事による休日）から、
+--start〜--end 年の祝日を計算して holiday_table.py に書き出す。
+
+春分・秋分の日は、正式には前年2月の官報で決まる。将来の年は計算式による予測値なので、
+法改正や官報の発表があったときは、このスクリプトを直して作り直す。
+
+使い方:
+    python scripts/gen_holidays.py --start 1955 --end 2099
+"""
+import argparse
+import os
+import sys
+from datetime import date, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# 皇室行事などで1回だけ休日になった日
+SPECIAL_HOLIDAYS = {
+    date(1959, 4, 10): "皇太子明仁親王の結婚の儀",
+    date(1989, 2, 24): "昭和天皇の大喪の礼",
+    date(1990, 11, 12): "即位礼正殿の儀",
+    date(1993, 6, 9): "皇太子徳仁親王の結婚の儀",
+    date(2019, 5, 1): "天皇の即位の日",
+    date(2019, 10, 22): "即位礼正殿の儀",
+}
+
+
+def nth_monday(year, month, n):
+    first = date(year, month, 1)
+    return first + timedelta(days=(7 - first.weekday()) % 7 + 7 * (n - 1))
+
+
+def vernal_equinox(year):
+    """春分の日（1900〜2099年の近似式）"""
+    if year <= 1979:
+        return int(20.8357 + 0.242194 * (year - 1980) - int((year - 1983) / 4))
+    return int(20.8431 + 0.242194 * (year - 1980) - (year - 1980) // 4)
+
+
+def autumnal_equinox(year):
+    """秋分の日（1900〜2099年の近似式）"""
+    if year <= 1979:
+        return int(23.2588 + 0.242194 * (year - 1980) - int((year - 1983) / 4))
+    return int(23.2488 + 0.242194 * (year - 1980) - (year - 1980) // 4)
+
+
+def statutory_holidays(year):
+    """その年の「国民の祝日」（振替休日・国民の休日を除く）"""
+    h = {date(year, 1, 1): "元日"}
+
+    h[date(year, 1, 15) if year < 2000 else nth_monday(year, 1, 2)] = "成人の日"
+    if year >= 1967:
+        h[date(year, 2, 11)] = "建国記念の日"
+    if year >= 2020:
+        h[date(year, 2, 23)] = "天皇誕生日"
+    h[date(year, 3, vernal_equinox(year))] = "春分の日"
+
+    if year <= 1988:
+        h[date(year, 4, 29)] = "天皇誕生日"
+    elif year <= 2006:
+        h[date(year, 4, 29)] = "みどりの日"
+    else:
+        h[date(year, 4, 29)] = "昭和の日"
+    h[date(year, 5, 3)] = "憲法記念日"
+    if year >= 2007:
+        h[date(year, 5, 4)] = "みどりの日"
+    h[date(year, 5, 5)] = "こどもの日"
+
+    if year == 2020:
+        h[date(year, 7, 23)] = "海の日"
+    elif year == 2021:
+        h[date(year, 7, 22)] = "海の日"
+    elif year >= 2003:
+        h[nth_monday(year, 7, 3)] = "海の日"
+    elif year >= 1996:
+        h[date(year, 7, 20)] = "海の日"
+
+    if year == 2020:
+        h[date(year, 8, 10)] = "山の日"
+    elif year == 2021:
+        h[date(year, 8, 8)] = "山の日"
+    elif year >= 2016:
+        h[date(year, 8, 11)] = "山の日"
+
+    if year >= 2003:
+        h[nth_monday(year, 9, 3)] = "敬老の日"
+    elif year >= 1966:
+        h[date(year, 9, 15)] = "敬老の日"
+    h[date(year, 9, autumnal_equinox(year))] = "秋分の日"
+
+    if year == 2020:
+        h[date(year, 7, 24)] = "スポーツの日"
+    elif year == 2021:
+        h[date(year, 7, 23)] = "スポーツの日"
+    elif year >= 2020:
+        h[nth_monday(year, 10, 2)] = "スポーツの日"
+    elif year >= 2000:
+        h[nth_monday(year, 10, 2)] = "体育の日"
+    elif year >= 1966:
+        h[date(year, 10, 10)] = "体育の日"
+
+    h[date(year, 11, 3)] = "文化の日"
+    h[date(year, 11, 23)] = "勤労感謝の日"
+    if 1989 <= year <= 2018:
+        h[date(year, 12, 23)] = "天皇誕生日"
+
+    for day, name in SPECIAL_HOLIDAYS.items():
+        if day.year == year:
+            h[day] = name
+    return h
+
+
+def year_holidays(year):
+    """振替休日・国民の休日を含めたその年の祝日 {date: 名前}"""
+    # 年をまたぐ振替休日はないが、前後の年も入れて計算しておく
+    h = {}
+    for y in (year - 1, year, year + 1):
+        h.update(statutory_holidays(y))
+
+    # 国民の休日: 祝日にはさまれた平日（1985年12月27日施行。日曜は除く）
+    for day in sorted(h):
+        between = day + timedelta(days=1)
+        if (between >= date(1985, 12, 27) and between not in h and between + timedelta(days=1) in h
+                and between.weekday() != 6):
+            h[between] = "国民の休日"
+
+    # 振替休日: 祝日が日曜なら翌日（1973年4月12日施行）。2007年からは翌日以降の最初の祝日でない日
+    for day in sorted(d for d in h if d.weekday() == 6 and d >= date(1973, 4, 12)):
+        substitute = day + timedelta(days=1)
+        if day.year >= 2007:
+            while substitute in h:
+                substitute += timedelta(days=1)
+        if substitute not in h:
+            h[substitute] = "振替休日"
+
+    return {day: name for day, name in h.items() if day.year == year}
+
+
+def encode(start, end):
+    """holiday_table.py の中身（年ごとに 'MMDD' + 名前の番号（36進1文字）を並べた文字列）"""
+    table = {year: sorted(year_holidays(year).items()) for year in range(start, end + 1)}
+    names = sorted({name for entries in table.values() for _, name in entries})
+    digits = '0123456789abcdefghijklmnopqrstuvwxyz'
+    assert len(names) <= len(digits)
+
+    lines = [
+        '"""日本の祝日表（scripts/gen_holidays.py で生成。手で編集しない）',
+        '',
+        f'{start}〜{end}年。HOLIDAYS[年] は「月日4桁 + HOLIDAY_NAMES の番号（36進1文字）」を並べた文字列',
+        '"""',
+        f'FIRST_YEAR = {start}',
+        f'LAST_YEAR = {end}',
+        '',
+        'HOLIDAY_NAMES = (',
+    ]
+    lines += [f'    "{name}",' for name in names]
+    lines += [')', '', 'HOLIDAYS = {']
+    for year, entries in table.items():
+        packed = ''.join(f"{d.month:02d}{d.day:02d}{digits[names.index(n)]}" for d, n in entries)
+        lines.append(f"    {year}: '{packed}',")
+    lines += ['}', '']
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--start', type=int, default=1955)
+    parser.add_argument('--end', type=int, default=2099)
+    parser.add_argument('--out', default=os.path.join(ROOT, 'holiday_table.py'))
+    args = parser.parse_args(argv)
+    if not (1900 <= args.start <= args.end <= 2099):
+        parser.error("春分・秋分の日の計算式は1900〜2099年のものです")
+
+    with open(args.out, 'w', encoding='utf-8') as f:
+        f.write(encode(args.start, args.end))
+    print(f"{args.out}: {args.start}〜{args.end}年", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
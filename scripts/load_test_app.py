@@ -0,0 +1,288 @@
+"""Streamlitアプリ（app.py）の同時利用の負荷試験
+
+streamlit run で起動したアプリに、ブラウザの代わりの軽いクライアントを N 個同時につなぐ
+（ブラウザと同じ WebSocket・protobuf のメッセージを送る）。キャッシュ・PDF作成用のスレッドプールは
+実際の運用と同じように、サーバーの中で全セッションに共有される。
+各セッションは次の操作を --rounds 回くり返す（年月・振替はセッションごとに乱数で選ぶ）。
+  1. 年・月を変える
+  2. 「🗑️ 全てクリア」のあと、振替元・振替先を選んで「➕ 振替を追加」を --transfers 回
+  3. 「📥 PDFを作成」（「📥 PDFをダウンロード」が表示されるまで）
+同時セッション数（--sessions に複数指定）ごとに、再実行とPDF作成の p50 / p95 / p99、
+1秒あたりのPDF作成数、サーバーのRSSの増加（1セッションあたり）を表示する。
+同時数を増やしていき、p95 が急に伸びるところが今の構成の上限の目安になる。
+
+--max-pdf-p95-ms / --max-rerun-p95-ms / --max-growth-mb を超えると終了コード1（変更で悪くなっていないかの確認用）。
+--url で起動済みのサーバーにつなぐこともできる（その場合RSSは計測しない）。
+
+使い方:
+    python scripts/load_test_app.py --sessions 1 4 8 12 --rounds 2 --backend native
+    REHAB_CALENDAR_RENDER_WORKERS=2 python scripts/load_test_app.py --sessions 12
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, ROOT)
+
+try:
+    from websockets.asyncio.client import connect
+    from streamlit.proto.BackMsg_pb2 import BackMsg
+    from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+    from streamlit.proto.WidgetStates_pb2 import WidgetState
+except ImportError:
+    connect = None
+
+YEARS = ['2024', '2025', '2026', '2027', '2028']
+FINISHED = {ForwardMsg.FINISHED_SUCCESSFULLY, ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY} if connect else set()
+
+
+def percentile(values, p):
+    if not values:
+        return float('nan')
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def process_rss_mb(pid):
+    """プロセス pid のRSS（MB）。/proc がなければ None"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(port, env, timeout=60):
+    """streamlit run でアプリを起動して、応答するまで待つ"""
+    command = [sys.executable, '-m', 'streamlit', 'run', os.path.join(ROOT, 'app.py'),
+               '--server.headless', 'true', '--server.port', str(port), '--server.address', '127.0.0.1',
+               '--server.enableXsrfProtection', 'false', '--browser.gatherUsageStats', 'false',
+               '--server.fileWatcherType', 'none']
+    server = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"streamlit が起動しませんでした: {server.stderr.read().decode(errors='replace')[-500:]}")
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/_stcore/health', timeout=1):
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("streamlit の起動がタイムアウトしました")
+
+
+class Session:
+    """
+    ブラウザの代わりに1セッション分の操作をするクライアント
+    ウィジェットの値はブラウザと同じように覚えておき、再実行のたびに全部送る
+    """
+
+    def __init__(self, ws, timeout):
+        self.ws = ws
+        self.timeout = timeout
+        self.values = {}       # ウィジェットのID → 送る WidgetState
+        self.widgets = {}      # 直前の実行で表示された (種類, ラベルかキー) → 要素
+        self.fragments = {}    # (種類, ラベルかキー) → フラグメントのID
+        self.page_hash = ''
+
+    async def rerun(self, trigger=None, fragment_id=''):
+        """再実行して、終わるまで待つ。trigger はそのときだけ押すボタンのID"""
+        msg = BackMsg()
+        state = msg.rerun_script
+        state.page_script_hash = self.page_hash
+        state.fragment_id = fragment_id
+        for value in self.values.values():
+            state.widget_states.widgets.add().CopyFrom(value)
+        if trigger:
+            widget = state.widget_states.widgets.add()
+            widget.id = trigger
+            widget.trigger_value = True
+        # 再実行する範囲（全体かフラグメント）で表示されていたものは、表示し直されるまで消しておく
+        self.widgets = {name: proto for name, proto in self.widgets.items()
+                        if fragment_id and self.fragments.get(name) != fragment_id}
+        await self.ws.send(msg.SerializeToString())
+        await asyncio.wait_for(self._receive_until_finished(), self.timeout)
+
+    async def _receive_until_finished(self):
+        while True:
+            msg = ForwardMsg()
+            msg.ParseFromString(await self.ws.recv())
+            kind = msg.WhichOneof('type')
+            if kind == 'new_session':
+                self.page_hash = msg.new_session.main_script_hash
+            elif kind == 'delta' and msg.delta.WhichOneof('type') == 'new_element':
+                self._add_element(msg.delta.new_element, msg.delta.fragment_id)
+            elif kind == 'script_finished':
+                if msg.script_finished == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    continue
+                if msg.script_finished not in FINISHED:
+                    raise RuntimeError("スクリプトがエラーで終了しました")
+                return
+
+    def _add_element(self, element, fragment_id):
+        kind = element.WhichOneof('type')
+        if kind == 'exception':
+            where = element.exception.stack_trace[-1].strip() if element.exception.stack_trace else ''
+            raise RuntimeError(f"{element.exception.type}: {element.exception.message} {where}")
+        if kind in ('selectbox', 'button', 'download_button'):
+            proto = getattr(element, kind)
+            # キー付きのウィジェットはIDの末尾がキーになる
+            name = proto.id.split('-', 2)[-1] if kind == 'selectbox' else proto.label
+            self.widgets[(kind, name)] = proto
+            self.fragments[(kind, name)] = fragment_id
+
+    def widget(self, kind, name):
+        try:
+            return self.widgets[(kind, name)]
+        except KeyError:
+            raise RuntimeError(f"{name} が表示されていません") from None
+
+    async def select(self, key, option):
+        selectbox = self.widget('selectbox', key)
+        self.values[selectbox.id] = WidgetState(id=selectbox.id, string_value=option)
+        await self.rerun()
+
+    async def click(self, label):
+        button = self.widget('button', label)
+        await self.rerun(button.id, self.fragments[('button', label)])
+
+
+async def run_session(url, seed, args, samples, errors):
+    """1セッション分の操作。再実行ごとの時間を samples['rerun'] / samples['pdf'] に追加する"""
+    rng = random.Random(seed)
+    try:
+        async with connect(url, subprotocols=['streamlit'], max_size=None, ping_interval=None) as ws:
+            session = Session(ws, args.timeout)
+
+            async def timed(kind, step):
+                start = time.perf_counter()
+                await step
+                samples[kind].append(time.perf_counter() - start)
+
+            await timed('rerun', session.rerun())
+            for _ in range(args.rounds):
+                await timed('rerun', session.select('year', rng.choice(YEARS)))
+                await timed('rerun', session.select('month', str(rng.randint(1, 12))))
+                await timed('rerun', session.click("🗑️ 全てクリア"))
+                for _ in range(args.transfers):
+                    transfer_from = session.widget('selectbox', 'transfer_from_select')
+                    await timed('rerun', session.select('transfer_from_select', rng.choice(transfer_from.options)))
+                    if ('selectbox', 'transfer_to_select') in session.widgets:
+                        transfer_to = session.widget('selectbox', 'transfer_to_select')
+                        await timed('rerun', session.select('transfer_to_select', rng.choice(transfer_to.options)))
+                    await timed('rerun', session.click("➕ 振替を追加"))
+                await timed('pdf', session.click("📥 PDFを作成"))
+                session.widget('download_button', "📥 PDFをダウンロード")
+    except Exception as e:  # noqa: BLE001 - 失敗した件数として数える
+        errors.append(f"{type(e).__name__}: {e}")
+
+
+async def run_level(url, sessions, seed, args):
+    """sessions 個のセッションを同時に動かして、(サンプル, エラー, 経過秒) を返す"""
+    samples = {'rerun': [], 'pdf': []}
+    errors = []
+    start = time.perf_counter()
+    await asyncio.gather(*(run_session(url, seed + i, args, samples, errors) for i in range(sessions)))
+    return samples, errors, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 4, 8, 12], help="同時セッション数")
+    parser.add_argument('--rounds', type=int, default=2, help="1セッションで年月を変えてPDFを作る回数")
+    parser.add_argument('--transfers', type=int, default=2, help="1回あたりに追加する振替の数")
+    parser.add_argument('--backend', choices=['matplotlib', 'native'], help="PDFの描画方法（省略時はアプリの既定）")
+    parser.add_argument('--url', help="起動済みのサーバー（例: http://127.0.0.1:8501）。省略時は一時的に起動する")
+    parser.add_argument('--timeout', type=float, default=120.0, help="1回の再実行のタイムアウト（秒）")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-pdf-p95-ms', type=float, help="PDF作成の p95 の上限")
+    parser.add_argument('--max-rerun-p95-ms', type=float, help="再実行の p95 の上限")
+    parser.add_argument('--max-growth-mb', type=float, help="1セッションあたりのRSSの増加の上限")
+    args = parser.parse_args(argv)
+    if connect is None:
+        print("streamlit（と依存する websockets）が必要です（pip install -r requirements.txt）", file=sys.stderr)
+        return 1
+
+    tmp = tempfile.TemporaryDirectory()
+    server = None
+    if args.url:
+        base = args.url.rstrip('/')
+    else:
+        # データベース・ディスクキャッシュは一時ディレクトリに置く（実際のデータを汚さない）
+        env = dict(os.environ,
+                   REHAB_CALENDAR_DB=os.path.join(tmp.name, 'load_test.db'),
+                   REHAB_CALENDAR_CACHE_DIR=os.path.join(tmp.name, 'cache'))
+        if args.backend:
+            env['REHAB_CALENDAR_PDF_BACKEND'] = args.backend
+        port = free_port()
+        server = start_server(port, env)
+        base = f'http://127.0.0.1:{port}'
+    url = base.replace('http', 'ws', 1) + '/_stcore/stream'
+    rss = (lambda: process_rss_mb(server.pid)) if server else (lambda: None)
+
+    failed = False
+    try:
+        # 1セッション分を先に動かして、importやフォントの読み込みを計測から外す
+        _, errors, elapsed = asyncio.run(run_level(url, 1, args.seed + 10_000, args))
+        if errors:
+            print(f"準備のセッションが失敗しました: {errors[0]}", file=sys.stderr)
+            return 1
+        before = rss()
+        print(f"準備: {elapsed:.1f}秒" + (f"（サーバーのRSS {before:.0f}MB）" if before is not None else ""))
+
+        print(f"{'同時':>4}{'再実行 p50/p95/p99 (ms)':>28}{'PDF p50/p95/p99 (ms)':>28}"
+              f"{'PDF/秒':>8}{'RSS増/セッション(MB)':>22}{'失敗':>6}")
+        seed = args.seed
+        for sessions in args.sessions:
+            before = rss()
+            samples, errors, elapsed = asyncio.run(run_level(url, sessions, seed, args))
+            after = rss()
+            seed += sessions
+            rerun = [s * 1000 for s in samples['rerun']]
+            pdf = [s * 1000 for s in samples['pdf']]
+            growth = (after - before) / sessions if before is not None and after is not None else float('nan')
+            print(f"{sessions:>4}"
+                  f"{percentile(rerun, 50):>10.0f}{percentile(rerun, 95):>9.0f}{percentile(rerun, 99):>9.0f}"
+                  f"{percentile(pdf, 50):>10.0f}{percentile(pdf, 95):>9.0f}{percentile(pdf, 99):>9.0f}"
+                  f"{len(pdf) / elapsed:>8.1f}{growth:>22.2f}{len(errors):>6}")
+            for error in errors[:3]:
+                print(f"      {error}")
+
+            failed |= bool(errors)
+            if args.max_pdf_p95_ms is not None and percentile(pdf, 95) > args.max_pdf_p95_ms:
+                print(f"      PDF作成の p95 が上限（{args.max_pdf_p95_ms:.0f}ms）を超えています")
+                failed = True
+            if args.max_rerun_p95_ms is not None and percentile(rerun, 95) > args.max_rerun_p95_ms:
+                print(f"      再実行の p95 が上限（{args.max_rerun_p95_ms:.0f}ms）を超えています")
+                failed = True
+            if args.max_growth_mb is not None and growth > args.max_growth_mb:
+                print(f"      RSSの増加が上限（{args.max_growth_mb:.1f}MB/セッション）を超えています")
+                failed = True
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+        tmp.cleanup()
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""server.py の負荷試験（localhostだけで完結）
+
+サーバーを同じプロセス内で空いているポートに起動し、複数のスレッドから同時にリクエストを送る。
+レイテンシ（p50 / p99）、requests/sec、ステータスコード別の件数、
+サーバー側の描画回数・合流（シングルフライト）・キャッシュの件数を表示する。
+
+--distinct で異なる予定の種類数を変えられる（少ないほど同じリクエストが重なり、合流・キャッシュが効く）。
+--etag を付けると2回目以降は If-None-Match を送る。
+
+使い方:
+    python scripts/load_test_server.py --requests 500 --concurrency 32 --workers 4 --queue 16 --backend native
+    python scripts/load_test_server.py --url http://127.0.0.1:8765   # 起動済みのサーバーに送る
+"""
+import argparse
+import http.client
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+from urllib.parse import quote, urlsplit
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from schedule import WEEKDAY_NAMES  # noqa: E402
+
+
+def request_paths(distinct):
+    """異なる予定のリクエストURLを distinct 種類作る"""
+    paths = []
+    for i in range(distinct):
+        year, month = 2025 + i // 12 % 3, i % 12 + 1
+        weekday = WEEKDAY_NAMES[i // 36 % 5]
+        hour = 9 + i // 180 % 8
+        slot = quote(f"{weekday} {hour}:00-{hour}:40")
+        paths.append(f"/calendar?year={year}&month={month}&slot={slot}")
+    return paths
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def run_load(host, port, paths, total, concurrency, use_etag):
+    """concurrency 本のスレッドで合計 total 件送り、(レイテンシのリスト, ステータス別件数, 経過秒) を返す"""
+    latencies = []
+    statuses = Counter()
+    etags = {}
+    lock = threading.Lock()
+    counter = iter(range(total))
+
+    def worker():
+        conn = http.client.HTTPConnection(host, port, timeout=60)
+        for i in counter:
+            path = paths[i % len(paths)]
+            headers = {'If-None-Match': etags[path]} if use_etag and path in etags else {}
+            start = time.perf_counter()
+            try:
+                conn.request('GET', path, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=60)
+                status = 'error'
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                statuses[status] += 1
+                if status == 200 and response.getheader('ETag'):
+                    etags[path] = response.getheader('ETag')
+        conn.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, statuses, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=500, help="送るリクエストの合計")
+    parser.add_argument('--concurrency', type=int, default=32, help="同時に送るクライアント数")
+    parser.add_argument('--distinct', type=int, default=50, help="異なる予定の種類数")
+    parser.add_argument('--etag', action='store_true', help="2回目以降は If-None-Match を送る")
+    parser.add_argument('--url', help="起動済みのサーバー（省略時はこのプロセス内で起動）")
+    parser.add_argument('--workers', type=int, default=4, help="（内部で起動する場合）描画ワーカー数")
+    parser.add_argument('--queue', type=int, default=16, help="（内部で起動する場合）実行中 + 待ちの上限")
+    parser.add_argument('--backend', default='native', help="（内部で起動する場合）PDFの描画方法")
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        from server import make_server
+        server = make_server('127.0.0.1', 0, workers=args.workers, queue=args.queue, backend=args.backend)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = server.server_address
+
+    latencies, statuses, elapsed = run_load(
+        host, port, request_paths(args.distinct), args.requests, args.concurrency, args.etag
+    )
+
+    print(f"{args.requests}件 / {elapsed:.2f}秒 = {args.requests / elapsed:.1f} requests/sec"
+          f"（同時 {args.concurrency}、{args.distinct}種類）")
+    print(f"  p50 {statistics.median(latencies) * 1000:.1f} ms  p99 {percentile(latencies, 99) * 1000:.1f} ms"
+          f"  最大 {max(latencies) * 1000:.1f} ms")
+    print("  ステータス: " + ', '.join(f"{status}={count}" for status, count in sorted(statuses.items(), key=str)))
+
+    conn = http.client.HTTPConnection(host, port, timeout=10)
+    conn.request('GET', '/healthz')
+    health = json.loads(conn.getresponse().read())
+    print("  サーバー: " + ', '.join(f"{k}={health[k]}" for k in
+                                    ('renders', 'coalesced', 'cache_hits', 'not_modified', 'rejected', 'timeouts')))
+
+    if server is not None:
+        server.shutdown()
+        server.service.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,51 @@
+"""操作ごとの再実行時間を、フラグメント化の前後で比べる
+
+フラグメント化の前は、どの操作でも app.py 全体が再実行されていた（= script の時間）。
+フラグメント化の後は、操作したセクションのフラグメントだけが再実行される。
+AppTest で app.py を何度か実行し、app.py が記録する各セクションの実行時間を集計する。
+
+使い方:
+    python scripts/rerun_timing.py --runs 10
+"""
+import argparse
+import os
+import statistics
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# 操作 → その操作で再実行されるセクション
+INTERACTIONS = [
+    ("定期訪問の時間を変更（振替・PDF作成も再実行）", 'schedule_sections'),
+    ("振替の追加・削除・選択", 'transfer_editor'),
+    ("PDF作成ボタン（作成時間を除く）", 'pdf_section'),
+]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10, help="計測回数")
+    args = parser.parse_args(argv)
+
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(ROOT, 'app.py'), default_timeout=60)
+    at.run()  # 1回目はimportやキャッシュの作成を含むので捨てる
+
+    samples = {name: [] for name in ['script'] + [section for _, section in INTERACTIONS]}
+    for i in range(args.runs):
+        # 年月の変更（ページ全体の再実行）で毎回すべてのセクションを通す
+        at.selectbox(key="month").set_value(i % 12 + 1).run()
+        for name, seconds in at.session_state['_section_timings'].items():
+            samples.setdefault(name, []).append(seconds)
+
+    before = statistics.median(samples['script']) * 1000
+    print(f"フラグメント化前（毎回ページ全体）: {before:7.1f} ms")
+    for label, section in INTERACTIONS:
+        after = statistics.median(samples[section]) * 1000
+        print(f"  {label:<24} → {after:7.1f} ms（{before / after if after else float('inf'):.0f}倍速）")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,55 @@
+"""同時に複数のPDFを作成しても、毎回同じバイト列になることを確認するストレステスト
+
+使い方:
+    python scripts/stress_render.py --renders 32 --workers 8
+"""
+import argparse
+import hashlib
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from calendar_pdf import create_pdf
+from schedule import get_visit_days
+from render_pool import RenderPool
+
+
+def render_case(year, month, transfers):
+    visit1_config = {'weekday': '月曜日', 'time': '11:20-12:00',
+                     'days': get_visit_days(year, month, '月曜日')}
+    visit2_config = {'weekday': '水曜日', 'time': '11:00-11:40',
+                     'days': get_visit_days(year, month, '水曜日')}
+    pdf_buffer, _, _, _ = create_pdf(year, month, transfers, visit1_config, visit2_config)
+    return hashlib.sha256(pdf_buffer.getvalue()).hexdigest()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--renders', type=int, default=32, help="同時に投げるPDF作成の数")
+    parser.add_argument('--workers', type=int, default=8, help="スレッド数")
+    args = parser.parse_args(argv)
+
+    # 4週・5週・6週の月と、振替あり/なしを混ぜる
+    cases = [
+        (2026, 2, ()),
+        (2025, 10, ((6, 8, '14:00-14:40'),)),
+        (2025, 11, ((3, 4, '9:00-9:40'), (12, 14, '16:00-17:00'))),
+    ]
+    expected = {case: render_case(*case) for case in cases}
+
+    pool = RenderPool(workers=args.workers)
+    start = time.perf_counter()
+    jobs = [(cases[i % len(cases)], pool.submit(render_case, *cases[i % len(cases)]))
+            for i in range(args.renders)]
+    mismatches = sum(1 for case, future in jobs if future.result() != expected[case])
+    elapsed = time.perf_counter() - start
+    pool.shutdown()
+
+    print(f"{args.renders}件 / {args.workers}スレッド: {elapsed:.2f}秒, 不一致 {mismatches}件")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
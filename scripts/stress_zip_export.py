@@ -0,0 +1,91 @@
+"""利用者ごとのPDFをZIPにまとめるとき、人数が増えてもメモリが増えないことを確認するストレステスト
+
+batch.write_zip で --patients 人分（デフォルト1000人）のZIPを書き出し、プロセスの最大RSSを調べる。
+先に --warmup 人分を書き出して（ライブラリ・フォントの読み込みを済ませて）そこでの最大RSSを基準にし、
+  - 最大RSSが --max-rss-mb を超えた
+  - 基準からの増加が --max-growth-mb を超えた（人数に比例してメモリを使っている）
+のどちらかなら終了コード1を返す。出力先はシークできないストリーム（書いたバイト数を数えて捨てる）。
+--workers 2 以上ではワーカープロセスの最大RSSも調べる。
+
+使い方:
+    python scripts/stress_zip_export.py
+    python scripts/stress_zip_export.py --backend native --patients 5000
+"""
+import argparse
+import io
+import os
+import resource
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from batch import iter_patient_pdfs, write_zip  # noqa: E402
+from bench_conflicts import make_caseload  # noqa: E402
+from calendar_pdf import DEFAULT_BACKEND, PDF_BACKENDS, warm_up  # noqa: E402
+
+
+class CountingSink(io.RawIOBase):
+    """書き込まれたバイト数だけ数えて捨てる（シークできない出力先の代わり）"""
+
+    def __init__(self):
+        self.size = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.size += len(data)
+        return len(data)
+
+
+def max_rss_mb(who=resource.RUSAGE_SELF):
+    # Linuxはキロバイト、macOSはバイト
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(who).ru_maxrss * scale / 1024 / 1024
+
+
+def export(patients, year, month, workers, backend):
+    sink = CountingSink()
+    start = time.perf_counter()
+    count = write_zip(iter_patient_pdfs(patients, year, month, workers, backend), sink)
+    return count, sink.size, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--patients', type=int, default=1000, help="ZIPに入れる人数")
+    parser.add_argument('--warmup', type=int, default=50, help="基準のRSSを測るために先に書き出す人数")
+    parser.add_argument('--workers', type=int, default=1, help="並列プロセス数（1ならこのプロセスで作成）")
+    parser.add_argument('--backend', choices=PDF_BACKENDS, default=DEFAULT_BACKEND)
+    parser.add_argument('--max-rss-mb', type=float, default=400.0, help="最大RSSの上限")
+    parser.add_argument('--max-growth-mb', type=float, default=20.0, help="基準からの増加の上限")
+    args = parser.parse_args(argv)
+
+    year, month = 2025, 10
+    warm_up(args.backend)
+    export(make_caseload(args.warmup, 1, seed=1), year, month, args.workers, args.backend)
+    base = max_rss_mb()
+
+    count, size, elapsed = export(make_caseload(args.patients, 1), year, month, args.workers, args.backend)
+    peak = max_rss_mb()
+    growth = peak - base
+    print(f"{count}人 / {size / 1024 / 1024:.1f}MB / {elapsed:.1f}秒 ({count / elapsed:.1f} pages/sec, {args.backend})")
+    print(f"最大RSS: {base:.1f}MB（{args.warmup}人）→ {peak:.1f}MB（{count}人）、増加 {growth:.1f}MB")
+
+    failed = peak > args.max_rss_mb or growth > args.max_growth_mb
+    if args.workers > 1:
+        # ワーカーは人数に関係なく使い回すので、1プロセスあたりの上限で見る
+        children = max_rss_mb(resource.RUSAGE_CHILDREN)
+        print(f"ワーカーの最大RSS: {children:.1f}MB")
+        failed = failed or children > args.max_rss_mb
+    if failed:
+        print(f"上限（最大 {args.max_rss_mb:.0f}MB・増加 {args.max_growth_mb:.0f}MB）を超えました")
+        return 1
+    print("メモリは上限内です")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,507 @@
+"""予定表PDFをHTTPで返すサービス（標準ライブラリのみ・Streamlit不要）
+
+使い方:
+    python server.py --port 8765 --workers 4 --queue 16 --backend native
+
+    GET  /calendar?year=2025&month=10&slot=月曜日 11:20-12:00&slot=水曜日 11:00-11:40&transfers=6>8 14:00-14:40
+    POST /calendar   （本文は cli.py と同じJSONスペック1件）
+    POST /export?year=2025&month=10 （本文はケースロードCSVかExcel。利用者ごとのPDFをまとめたZIPを少しずつ返す）
+    GET  /healthz    （実行中・待ち行列・合流・キャッシュの件数をJSONで返す）
+    GET  /calendar?...&profile=1 （キャッシュを使わずに作成し、プロファイルを profiles/ に保存。X-Profile ヘッダーにフォルダ名。
+                                  プロファイルは同時に1つだけで、ほかのプロファイル中は取らない）
+    GET  /metrics    （件数と処理時間のヒストグラムをPrometheusのテキスト形式で返す。時間は --metrics のときだけ）
+    GET  /feed.ics?therapist=担当A&start=2025-10&end=2026-03 （--db のデータベースから訪問予定のiCalendarを返す。
+                     patient=名前 で1人分。start/end を省略すると今月から3か月分）
+
+- 描画は決まった数のワーカーで行い、実行中 + 待ち行列が --queue を超えたら 429 を返す
+- 同じ内容の作成中リクエストは1回の描画にまとめる（シングルフライト）
+- ETag は入力のハッシュ。If-None-Match が一致すれば描画せずに 304 を返す
+- 入力チェックのエラーは 400（JSONでエラー一覧）、--timeout 内に作成できなければ 503
+- /export はZIPをチャンク転送で返す。作成中のPDFはワーカー数×2件までなので、人数が増えてもメモリはほぼ一定。
+  同時に行うのは --exports 件まで（超えると429）
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+from datetime import date
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, urlsplit
+
+import metrics
+import profiling
+from calendar_pdf import DEFAULT_BACKEND, PDF_BACKENDS, create_schedule_pdf, output_filename, warm_up
+from batch import iter_patient_pdfs, write_zip
+from caseload_import import read_rows, to_patients, validate_rows
+from cli import normalize_spec
+from ics_export import caseload_entries, iter_calendar, parse_month, write_ics
+from render_cache import RenderCache, schedule_key
+from render_pool import DEFAULT_WORKERS, RenderPool
+from schedule import month_range, resolve_month
+
+MAX_BODY_BYTES = 64 * 1024
+MAX_CASELOAD_BYTES = 4 * 1024 * 1024
+MAX_FEED_MONTHS = 24
+
+
+class SingleFlight:
+    """同じキーの処理が実行中なら、新しく始めずにそのFutureを返す"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, submit):
+        """(Future, 合流したか) を返す。submit() が None を返した（満杯）ときは (None, False)"""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                return future, True
+            future = submit()
+            if future is None:
+                return None, False
+            self._calls[key] = future
+        future.add_done_callback(lambda _: self._forget(key))
+        return future, False
+
+    def _forget(self, key):
+        with self._lock:
+            self._calls.pop(key, None)
+
+    def __len__(self):
+        return len(self._calls)
+
+
+class RenderService:
+    """HTTPに依存しない部分（キャッシュ・シングルフライト・ワーカープール）"""
+
+    def __init__(self, workers=DEFAULT_WORKERS, queue=None, backend=None, timeout=30.0, cache=None, exports=1,
+                 store=None):
+        self.backend = backend or DEFAULT_BACKEND
+        self.store = store
+        self.timeout = timeout
+        self.pool = RenderPool(workers, max_pending=queue or workers * 4)
+        self.cache = cache if cache is not None else RenderCache(cache_dir=None)
+        self.flights = SingleFlight()
+        self.exports = threading.BoundedSemaphore(exports)
+        self.draining = False
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'renders': 0, 'coalesced': 0, 'cache_hits': 0,
+                      'not_modified': 0, 'rejected': 0, 'timeouts': 0, 'invalid': 0, 'exports': 0, 'feeds': 0}
+
+    def count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _render(self, key, normalized):
+        data = self.cache.get(key)
+        if data is None:
+            data = create_schedule_pdf(resolve_month(*normalized), self.backend).getvalue()
+            self.cache.put(key, data)
+            self.count('renders')
+        return data
+
+    def render(self, key, normalized):
+        """
+        PDFを作成（またはキャッシュから取得）してバイト列を返す
+        満杯なら OverflowError、時間切れなら TimeoutError
+        """
+        data = self.cache.get(key)
+        if data is not None:
+            self.count('cache_hits')
+            return data
+
+        future, coalesced = self.flights.do(key, lambda: self.pool.try_submit(self._render, key, normalized))
+        if coalesced:
+            self.count('coalesced')
+        return self._result(future)
+
+    def _render_profiled(self, normalized):
+        with profiling.capture('server') as capture:
+            data = create_schedule_pdf(resolve_month(*normalized), self.backend).getvalue()
+        self.count('renders')
+        return data, capture.path
+
+    def render_profiled(self, normalized):
+        """
+        キャッシュを使わずにワーカープールで作成してプロファイルを取り、(バイト列, 保存先のフォルダ) を返す
+        プロファイルは同時に1つだけなので、ほかのプロファイル中なら取らずに作成する（フォルダは None）
+        満杯なら OverflowError、時間切れなら TimeoutError
+        """
+        return self._result(self.pool.try_submit(self._render_profiled, normalized))
+
+    def _result(self, future):
+        if future is None:
+            self.count('rejected')
+            raise OverflowError("待ち行列が満杯です")
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            self.count('timeouts')
+            raise TimeoutError("時間内に作成できませんでした") from None
+
+    def export(self, patients, year, month, out):
+        """利用者ごとのPDFをワーカープールで作り、作成順にZIPへ書き込む。書き込んだ件数を返す"""
+        self.count('exports')
+        with metrics.span('server.export'):
+            return write_zip(iter_patient_pdfs(patients, year, month, self.pool.workers, self.backend,
+                                               submit=self.pool.submit), out)
+
+    def health(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats.update(in_flight=len(self.flights), workers=self.pool.workers,
+                     backend=self.backend, draining=self.draining)
+        return stats
+
+    def prometheus(self):
+        """件数（stats）と処理時間のヒストグラムをPrometheusのテキスト形式で"""
+        with self._lock:
+            stats = dict(self.stats)
+        lines = ['# HELP rehab_calendar_server_events_total Render service events by kind.',
+                 '# TYPE rehab_calendar_server_events_total counter']
+        lines += [f'rehab_calendar_server_events_total{{event="{name}"}} {value}' for name, value in stats.items()]
+        lines += ['# HELP rehab_calendar_server_in_flight Renders currently running or queued.',
+                  '# TYPE rehab_calendar_server_in_flight gauge',
+                  f'rehab_calendar_server_in_flight {len(self.flights)}']
+        return '\n'.join(lines) + '\n' + metrics.REGISTRY.prometheus()
+
+    def shutdown(self):
+        self.draining = True
+        self.pool.shutdown(wait=True)
+
+
+def _add_months(year_month, n):
+    year, month = year_month
+    index = year * 12 + month - 1 + n
+    return index // 12, index % 12 + 1
+
+
+def query_spec(query):
+    """GETのクエリ文字列をcli.pyと同じ形式のスペックにする"""
+    params = parse_qs(query, keep_blank_values=True)
+    spec = {'slots': [], 'transfers': ';'.join(params.get('transfers', []))}
+    for name in ('year', 'month'):
+        if name in params:
+            value = params[name][0]
+            spec[name] = int(value) if value.isdigit() else value
+    if 'patient' in params:
+        spec['patient'] = params['patient'][0]
+    for slot in params.get('slot', []):
+        weekday, _, time_range = slot.strip().partition(' ')
+        spec['slots'].append({'weekday': weekday, 'time': time_range.strip()})
+    return spec
+
+
+class ChunkedWriter(io.RawIOBase):
+    """書き込んだものをHTTPのチャンク転送で送るファイル（シークはできない）"""
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        if data:
+            self.wfile.write(b'%x\r\n' % len(data) + bytes(data) + b'\r\n')
+        return len(data)
+
+    def finish(self):
+        self.wfile.write(b'0\r\n\r\n')
+
+
+class RenderRequestHandler(BaseHTTPRequestHandler):
+    server_version = 'RehabCalendar/1.0'
+    protocol_version = 'HTTP/1.1'
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status, body=b'', content_type='application/json; charset=utf-8', headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def _send_json(self, status, payload, headers=None):
+        self._send(status, json.dumps(payload, ensure_ascii=False).encode('utf-8'), headers=headers)
+
+    def _content_length(self, limit):
+        """本文の長さ。不正・上限超えならエラーを返して None"""
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.close_connection = True  # 本文の終わりが分からないので接続は使い回さない
+            self._send_json(400, {'errors': ["Content-Length が不正です"]})
+            return None
+        if length > limit:
+            self.close_connection = True  # 本文を読まずに返すので接続は使い回さない
+            self._send_json(413, {'errors': ["本文が大きすぎます"]})
+            return None
+        return length
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == '/healthz':
+            self._send_json(200, self.service.health())
+        elif url.path == '/metrics':
+            self._send(200, self.service.prometheus().encode('utf-8'), 'text/plain; version=0.0.4; charset=utf-8')
+        elif url.path == '/calendar':
+            self._calendar(query_spec(url.query), profile=parse_qs(url.query).get('profile') == ['1'])
+        elif url.path == '/feed.ics':
+            self._feed(url.query)
+        else:
+            self._send_json(404, {'errors': ["見つかりません"]})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path == '/export':
+            self._export(url.query)
+            return
+        if url.path != '/calendar':
+            self.close_connection = True  # 本文を読まずに返すので接続は使い回さない
+            self._send_json(404, {'errors': ["見つかりません"]})
+            return
+        length = self._content_length(MAX_BODY_BYTES)
+        if length is None:
+            return
+        try:
+            spec = json.loads(self.rfile.read(length) or b'null')
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            self._send_json(400, {'errors': [f"JSONとして読めません: {e}"]})
+            return
+        if not isinstance(spec, dict):
+            self._send_json(400, {'errors': ["スペックはオブジェクトで指定してください"]})
+            return
+        self._calendar(spec)
+
+    def _calendar(self, spec, profile=False):
+        service = self.service
+        service.count('requests')
+        if service.draining:
+            self._send_json(503, {'errors': ["停止中です"]}, {'Retry-After': '5'})
+            return
+
+        normalized, errors = normalize_spec(spec)
+        if errors:
+            service.count('invalid')
+            self._send_json(400, {'errors': errors})
+            return
+
+        key = schedule_key(*normalized, backend=service.backend)
+        etag = f'"{key}"'
+        headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+        if not profile and etag in [tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')]:
+            service.count('not_modified')
+            self._send(304, headers=headers)
+            return
+
+        start = time.perf_counter()
+        try:
+            if profile:
+                # キャッシュは使わずに作成する（ワーカープールの上限・429 / 503 はほかと同じ）
+                data, profile_path = service.render_profiled(normalized)
+                if profile_path:
+                    headers['X-Profile'] = os.path.basename(profile_path)
+            else:
+                data = service.render(key, normalized)
+        except OverflowError as e:
+            self._send_json(429, {'errors': [str(e)]}, {'Retry-After': '1'})
+            return
+        except TimeoutError as e:
+            self._send_json(503, {'errors': [str(e)]}, {'Retry-After': '5'})
+            return
+        metrics.observe('server.render_wait', time.perf_counter() - start)
+
+        year, month = normalized[0], normalized[1]
+        if spec.get('patient'):
+            filename = output_filename(year, month, str(spec['patient']))
+        else:
+            filename = f"{year}年{month}月_リハビリ訪問予定表.pdf"
+        headers.update({
+            'Content-Disposition': f"inline; filename*=UTF-8''{quote(filename)}",
+            'Server-Timing': f"render;dur={(time.perf_counter() - start) * 1000:.1f}",
+        })
+        self._send(200, data, 'application/pdf', headers)
+
+    def _export(self, query):
+        service = self.service
+        # 以下の2つは本文（ケースロード）を読まずに返すので、接続は使い回さない
+        if service.draining:
+            self.close_connection = True
+            self._send_json(503, {'errors': ["停止中です"]}, {'Retry-After': '5'})
+            return
+        params = parse_qs(query)
+        try:
+            year, month = int(params['year'][0]), int(params['month'][0])
+        except (KeyError, ValueError):
+            year = month = None
+        if not (year and month and 1 <= month <= 12):
+            self.close_connection = True
+            self._send_json(400, {'errors': ["year と month を数字で指定してください"]})
+            return
+        length = self._content_length(MAX_CASELOAD_BYTES)
+        if length is None:
+            return
+        try:
+            rows = read_rows(self.rfile.read(length))
+        except (UnicodeDecodeError, ValueError) as e:
+            self._send_json(400, {'errors': [f"ケースロードとして読めません: {e}"]})
+            return
+        # 途中でエラーになってもステータスを変えられないので、全員分を先にチェックする
+        errors = validate_rows(rows, year, month)
+        if errors:
+            service.count('invalid')
+            self._send_json(400, {'errors': [f"{e['row']}行目 {e['patient']}: {e['message']}" for e in errors],
+                                  'rows': errors})
+            return
+        patients = to_patients(rows)
+        if not service.exports.acquire(blocking=False):
+            service.count('rejected')
+            self._send_json(429, {'errors': ["ほかのZIPを作成中です"]}, {'Retry-After': '5'})
+            return
+
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/zip')
+            self.send_header('Content-Disposition',
+                             f"attachment; filename*=UTF-8''{quote(f'{year}年{month}月_リハビリ訪問予定表.zip')}")
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            out = ChunkedWriter(self.wfile)
+            service.export(patients, year, month, out)
+            out.finish()
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True  # 受け取る側が切断した
+        except Exception:
+            # ヘッダーは送ってしまったので、終わりのチャンクを送らずに切断して不完全なことを知らせる
+            self.close_connection = True
+            raise
+        finally:
+            service.exports.release()
+
+    def _feed(self, query):
+        service = self.service
+        if service.store is None:
+            self._send_json(404, {'errors': ["データベースが指定されていません（--db）"]})
+            return
+        params = {name: values[0] for name, values in parse_qs(query).items()}
+        today = date.today()
+        try:
+            start = parse_month(params['start']) if 'start' in params else (today.year, today.month)
+            end = parse_month(params['end']) if 'end' in params else _add_months(start, 2)
+        except ValueError as e:
+            self._send_json(400, {'errors': [f"start / end は 2025-10 の形式で指定してください: {e}"]})
+            return
+        months = month_range(start, end)
+        if not 1 <= len(months) <= MAX_FEED_MONTHS:
+            self._send_json(400, {'errors': [f"期間は1〜{MAX_FEED_MONTHS}か月で指定してください"]})
+            return
+        service.count('feeds')
+
+        # データベースが変わっていなければ作り直さない（カレンダーアプリは定期的に取りに来る）
+        digest = hashlib.sha1(f'{query}|{start}|{end}'.encode('utf-8')).hexdigest()[:16]
+        etag = f'"{service.store.revision()}-{digest}"'
+        headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+        if etag in [tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')]:
+            service.count('not_modified')
+            self._send(304, headers=headers)
+            return
+
+        therapist, patient = params.get('therapist'), params.get('patient')
+        name = patient or (f"訪問リハビリ（{therapist}）" if therapist else "訪問リハビリ")
+        self.send_response(200)
+        for header, value in headers.items():
+            self.send_header(header, value)
+        self.send_header('Content-Type', 'text/calendar; charset=utf-8')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        # 予定1件ずつでは小さすぎるので、まとめてからチャンクにする
+        out = io.BufferedWriter(ChunkedWriter(self.wfile), 64 * 1024)
+        try:
+            with metrics.span('server.feed'):
+                entries = caseload_entries(months, service.store.load_month, therapist, patient)
+                write_ics(iter_calendar(entries, name, show_patient=patient is None), out)
+            out.flush()
+            out.raw.finish()
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+
+class RenderHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # 標準の5だと同時接続が多いときに接続がやり直しになり、1秒以上待たされる
+    request_queue_size = 128
+
+
+def make_server(host='127.0.0.1', port=8765, verbose=False, **service_options):
+    """サーバーを作る（serve_forever() で開始。port=0 なら空いているポートを使う）"""
+    server = RenderHTTPServer((host, port), RenderRequestHandler)
+    server.service = RenderService(**service_options)
+    server.verbose = verbose
+    # フォントや描画ライブラリの読み込みを最初のリクエストの前に済ませる
+    warm_up(server.service.backend)
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="リハビリ訪問予定表PDFをHTTPで返すサービス")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="同時に描画する数")
+    parser.add_argument('--queue', type=int, help="実行中 + 待ちの上限（超えると429。デフォルト: workers×4）")
+    parser.add_argument('--backend', choices=PDF_BACKENDS, default=DEFAULT_BACKEND,
+                        help="PDFの描画方法（native はmatplotlibを使わず高速）")
+    parser.add_argument('--timeout', type=float, default=30.0, help="1件の作成を待つ秒数（超えると503）")
+    parser.add_argument('--exports', type=int, default=1, help="同時に作成するZIP（POST /export）の数")
+    parser.add_argument('--db', help="GET /feed.ics で使うデータベース（アプリで保存したSQLite）")
+    parser.add_argument('--verbose', '-v', action='store_true', help="リクエストごとのログを表示")
+    parser.add_argument('--metrics', action='store_true',
+                        help="処理時間を計測して /metrics で返す（REHAB_CALENDAR_METRICS=1 と同じ）")
+    parser.add_argument('--metrics-file', default=metrics.METRICS_FILE,
+                        help="計測結果を定期的に書き出すファイル（Prometheusのテキスト形式）")
+    args = parser.parse_args(argv)
+
+    if args.metrics or args.metrics_file:
+        metrics.enable()
+    metrics.start_file_export(args.metrics_file)
+    store = None
+    if args.db:
+        from store import ScheduleStore
+        store = ScheduleStore(args.db)
+
+    server = make_server(args.host, args.port, args.verbose, workers=args.workers, queue=args.queue,
+                         backend=args.backend, timeout=args.timeout, exports=args.exports, store=store)
+    print(f"http://{args.host}:{server.server_address[1]}/ で待ち受け中（Ctrl+Cで停止）", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.service.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
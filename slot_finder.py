@@ -0,0 +1,92 @@
+"""振替先の候補探し（同じ週の平日・定時内・担当者の空き時間）
+
+担当者・日ごとに、9:00〜17:30を5分刻みにした102ビットの「埋まっている時間」のビットマスクを持つ。
+長さ k 枠の空きの開始位置は「空き & (空き >> 1) & ... & (空き >> k-1)」の立っているビットなので、
+1日分の候補はビット演算 k 回（60分でも12回）で求まる。
+"""
+import heapq
+from collections import defaultdict, namedtuple
+
+from schedule import WORK_END_MINUTES, WORK_START_MINUTES, get_weekdays_in_same_week, parse_time_range
+
+SLOT_MINUTES = 5
+SLOTS_PER_DAY = (WORK_END_MINUTES - WORK_START_MINUTES) // SLOT_MINUTES
+_ALL_SLOTS = (1 << SLOTS_PER_DAY) - 1
+
+# start / end は0時からの分。time は '14:00-14:40' 形式
+Suggestion = namedtuple('Suggestion', 'day start end time')
+
+
+def _slot_bits(start, end):
+    """[start, end) を含む5分枠のビット（枠の途中から始まる・終わる訪問は枠全体を埋める）"""
+    first = max(0, (start - WORK_START_MINUTES) // SLOT_MINUTES)
+    last = min(SLOTS_PER_DAY, -(-(end - WORK_START_MINUTES) // SLOT_MINUTES))
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << first
+
+
+def _format(minutes):
+    return f"{minutes // 60}:{minutes % 60:02d}"
+
+
+class FreeTimeIndex:
+    """担当者・日ごとの埋まっている5分枠のビットマスク"""
+
+    def __init__(self, visits=()):
+        self._busy = defaultdict(int)           # (担当者, 日) → 埋まっている枠のビット
+        self._patient_days = defaultdict(set)   # (担当者, 利用者) → 訪問がある日
+        for visit in visits:
+            self.add(visit)
+
+    def copy(self):
+        """ほかの訪問を足して使うための複製（キャッシュした索引を書き換えないように）"""
+        other = FreeTimeIndex()
+        other._busy.update(self._busy)
+        other._patient_days.update((key, set(days)) for key, days in self._patient_days.items())
+        return other
+
+    def add(self, visit):
+        self._busy[(visit.therapist, visit.day)] |= _slot_bits(visit.start, visit.end)
+        self._patient_days[(visit.therapist, visit.patient)].add(visit.day)
+
+    def free_starts(self, therapist, day, duration, gap=0):
+        """duration 分の訪問を始められる時刻（分）のリスト。gap は前後に空ける分数"""
+        busy = self._busy.get((therapist, day), 0)
+        if gap:
+            # 前後 gap 分を埋まっているものとして扱う（広げる元は最初のマスク。広げたものをさらに広げない）
+            widen = -(-gap // SLOT_MINUTES)
+            orig = busy
+            for shift in range(1, widen + 1):
+                busy |= (orig << shift) | (orig >> shift)
+        run = free = ~busy & _ALL_SLOTS
+        for shift in range(1, -(-duration // SLOT_MINUTES)):
+            run &= free >> shift
+        starts = []
+        while run:
+            low = run & -run
+            starts.append(WORK_START_MINUTES + (low.bit_length() - 1) * SLOT_MINUTES)
+            run ^= low
+        return starts
+
+    def has_visit(self, therapist, patient, day):
+        return day in self._patient_days.get((therapist, patient), ())
+
+    def suggest(self, year, month, from_day, time_range, therapist='', patient=None, limit=5, gap=0):
+        """
+        休みにする訪問（from_day の time_range）の振替先の候補を、良い順に limit 件返す
+        候補は同じ週（月〜金）の同じ月の平日で、定時内かつ担当者の空いている時間
+        並び順: その利用者のほかの訪問がない日 → 各日で元の時刻に最も近い時刻を先に（日が偏らないように）
+               → 元の日に近い日 → 元の時刻に近い時刻
+        """
+        start, end = parse_time_range(time_range)
+        duration = end - start
+        candidates = []
+        for day in get_weekdays_in_same_week(year, month, from_day):
+            same_day = patient is not None and self.has_visit(therapist, patient, day)
+            starts = sorted(self.free_starts(therapist, day, duration, gap), key=lambda b: (abs(b - start), b))
+            for order, begin in enumerate(starts[:limit]):
+                rank = (same_day, order, abs(day - from_day), abs(begin - start), day)
+                candidates.append((rank, day, begin))
+        return [Suggestion(day, begin, begin + duration, f"{_format(begin)}-{_format(begin + duration)}")
+                for _, day, begin in heapq.nsmallest(limit, candidates)]
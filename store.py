@@ -0,0 +1,333 @@
+"""利用者・定期訪問の枠・振替を保存するSQLiteのデータベース
+
+テーブル:
+  patients   利用者（名前・担当者）
+  slots      定期訪問の枠（利用者ごとに曜日 + 時間。何個でも）
+  transfers  振替（利用者・年月・振替元の日ごとに1件）
+  visits     月ごとに展開した訪問（担当者・日付で引くため。定期訪問の枠や振替を書き換えると作り直す）
+  months     visits を展開済みの年月
+
+WALモードなので、書き込み中でもほかのスレッド・プロセスから読める。
+接続はスレッドごとに1つ（Streamlitのセッションはそれぞれ別のスレッドで動く）。
+"""
+import os
+import sqlite3
+import threading
+from datetime import date
+
+from schedule import parse_time_range, resolve_month
+
+DEFAULT_DB_PATH = os.environ.get(
+    'REHAB_CALENDAR_DB',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rehab_calendar.db')
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS patients (
+    id        INTEGER PRIMARY KEY,
+    name      TEXT NOT NULL UNIQUE,
+    therapist TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS slots (
+    patient_id INTEGER NOT NULL REFERENCES patients(id) ON DELETE CASCADE,
+    position   INTEGER NOT NULL,
+    weekday    TEXT NOT NULL,
+    time       TEXT NOT NULL,
+    PRIMARY KEY (patient_id, position)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS transfers (
+    patient_id INTEGER NOT NULL REFERENCES patients(id) ON DELETE CASCADE,
+    month      TEXT NOT NULL,            -- 'YYYY-MM'
+    from_day   INTEGER NOT NULL,
+    to_day     INTEGER NOT NULL,
+    time       TEXT NOT NULL,
+    seq        INTEGER NOT NULL,         -- 登録順
+    PRIMARY KEY (patient_id, month, from_day)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS transfers_month ON transfers (month);
+CREATE TABLE IF NOT EXISTS visits (
+    patient_id INTEGER NOT NULL REFERENCES patients(id) ON DELETE CASCADE,
+    therapist  TEXT NOT NULL,
+    date       TEXT NOT NULL,            -- 'YYYY-MM-DD'
+    start      INTEGER NOT NULL,         -- 0時からの分
+    end        INTEGER NOT NULL,
+    kind       TEXT NOT NULL             -- 'regular' / 'makeup'
+);
+CREATE INDEX IF NOT EXISTS visits_therapist_date ON visits (therapist, date, start);
+CREATE INDEX IF NOT EXISTS visits_patient_date ON visits (patient_id, date);
+CREATE TABLE IF NOT EXISTS months (
+    month TEXT PRIMARY KEY               -- visits を展開済みの 'YYYY-MM'
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+) WITHOUT ROWID;
+INSERT OR IGNORE INTO meta VALUES ('revision', 0);
+INSERT OR IGNORE INTO meta VALUES ('expand_version', 0);
+"""
+
+# visits の展開のしかたを変えたら上げる（古い展開は捨てて、読むときに作り直す）
+# 2: 祝日の定期訪問を休みにする
+EXPAND_VERSION = 2
+
+# 1か月分の利用者・定期訪問の枠・振替を1回のクエリで読む（{where} は利用者の絞り込み）
+# 「:patient IS NULL OR ...」のような書き方だと索引が使われないので、条件ごとに文を分ける
+_MONTH_QUERY = """
+SELECT p.id, p.name, p.therapist, 0 AS kind, s.position, s.weekday, s.time, NULL
+  FROM patients p JOIN slots s ON s.patient_id = p.id
+ WHERE {where}
+UNION ALL
+SELECT p.id, p.name, p.therapist, 1 AS kind, t.seq, t.from_day, t.time, t.to_day
+  FROM patients p JOIN transfers t ON t.patient_id = p.id
+ WHERE t.month = :month AND {where}
+ORDER BY 2, 4, 5
+"""
+_ALL_PATIENTS = _MONTH_QUERY.format(where='1')
+_BY_NAME = _MONTH_QUERY.format(where='p.name = :patient')
+_BY_ID = _MONTH_QUERY.format(where='p.id = :patient_id')
+
+
+def _month_key(year, month):
+    return f"{year:04d}-{month:02d}"
+
+
+def _month_dates(key):
+    """'YYYY-MM' の月の最初と最後の日付（BETWEENで日付の索引を使うため）"""
+    return key + '-01', key + '-31'
+
+
+def _expand_visits(patient_id, therapist, year, month, slots, transfers):
+    """1人・1か月分の visits テーブルの行"""
+    schedule = resolve_month(year, month, slots, transfers)
+    rows = []
+    for day in range(1, schedule.num_days + 1):
+        iso = date(year, month, day).isoformat()
+        for slot in schedule.regular_slots(day):
+            start, end = parse_time_range(slot['time'])
+            rows.append((patient_id, therapist, iso, start, end, 'regular'))
+        if schedule.is_makeup(day):
+            start, end = parse_time_range(schedule.makeup[day])
+            rows.append((patient_id, therapist, iso, start, end, 'makeup'))
+    return rows
+
+
+class ScheduleStore:
+    """利用者・定期訪問の枠・振替の保存先"""
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            version = conn.execute("SELECT value FROM meta WHERE key = 'expand_version'").fetchone()[0]
+            if version != EXPAND_VERSION:
+                conn.execute("DELETE FROM visits")
+                conn.execute("DELETE FROM months")
+                conn.execute("UPDATE meta SET value = ? WHERE key = 'expand_version'", (EXPAND_VERSION,))
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")  # WALではコミットごとのfsyncを省いても壊れない
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return _Transaction(conn)
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # ---- 読み込み ----
+
+    def revision(self):
+        """書き込みのたびに増える番号（キャッシュのキーに使う）"""
+        with self._connection() as conn:
+            return conn.execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()[0]
+
+    def load_month(self, year, month, patient=None):
+        """
+        1か月分の予定を1回のクエリで読む（patient を指定するとその利用者だけ）
+        batch.read_caseload と同じ形式 [{'patient', 'therapist', 'slots', 'transfers'}, ...]
+        """
+        with self._connection() as conn:
+            rows = conn.execute(_ALL_PATIENTS if patient is None else _BY_NAME,
+                                {'month': _month_key(year, month), 'patient': patient}).fetchall()
+        patients = {}
+        for _, name, therapist, kind, _, a, time_range, to_day in rows:
+            entry = patients.setdefault(name, {'patient': name, 'therapist': therapist,
+                                               'slots': [], 'transfers': []})
+            if kind == 0:
+                entry['slots'].append({'weekday': a, 'time': time_range})
+            else:
+                entry['transfers'].append((int(a), to_day, time_range))
+        return list(patients.values())
+
+    def patient_month(self, patient, year, month):
+        """1人分の予定（load_monthの1件）。登録されていなければ None"""
+        found = self.load_month(year, month, patient)
+        return found[0] if found else None
+
+    def therapist_visits(self, therapist, start_date, end_date):
+        """担当者の訪問（日付は 'YYYY-MM-DD'、両端を含む）。(利用者, 日付, 開始, 終了, 種類) のリスト"""
+        self._ensure_months(start_date[:7], end_date[:7])
+        with self._connection() as conn:
+            return conn.execute(
+                "SELECT p.name, v.date, v.start, v.end, v.kind FROM visits v JOIN patients p ON p.id = v.patient_id"
+                " WHERE v.therapist = ? AND v.date BETWEEN ? AND ? ORDER BY v.date, v.start",
+                (therapist, start_date, end_date)
+            ).fetchall()
+
+    def count_visits(self, year, month):
+        key = _month_key(year, month)
+        self._ensure_months(key, key)
+        with self._connection() as conn:
+            return conn.execute("SELECT count(*) FROM visits WHERE date BETWEEN ? AND ?",
+                                _month_dates(key)).fetchone()[0]
+
+    # ---- 書き込み（どれも1つのトランザクションでまとめて書く） ----
+
+    def save_patients(self, patients, year=None, month=None):
+        """
+        利用者と定期訪問の枠をまとめて登録・更新する（batch.read_caseload の形式）
+        year, month を指定すると、その月の振替も入れ替える
+        """
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT INTO patients (name, therapist) VALUES (?, ?)"
+                " ON CONFLICT (name) DO UPDATE SET therapist = excluded.therapist",
+                [(p['patient'], p.get('therapist', '')) for p in patients]
+            )
+            ids = self._patient_ids(conn, [p['patient'] for p in patients])
+            conn.executemany("DELETE FROM slots WHERE patient_id = ?", [(ids[p['patient']],) for p in patients])
+            conn.executemany(
+                "INSERT INTO slots (patient_id, position, weekday, time) VALUES (?, ?, ?, ?)",
+                [(ids[p['patient']], i, slot['weekday'], slot['time'])
+                 for p in patients for i, slot in enumerate(p['slots'])]
+            )
+            if year is not None:
+                self._replace_transfers(conn, [(ids[p['patient']], p['transfers']) for p in patients], year, month)
+            self._invalidate(conn, list(ids.values()))
+
+    def save_patient(self, patient, slots, year=None, month=None, transfers=None, therapist=None):
+        """1人分の定期訪問の枠（と year, month を指定すればその月の振替）を保存する"""
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if therapist is None:
+                conn.execute("INSERT OR IGNORE INTO patients (name) VALUES (?)", (patient,))
+            else:
+                conn.execute("INSERT INTO patients (name, therapist) VALUES (?, ?)"
+                             " ON CONFLICT (name) DO UPDATE SET therapist = excluded.therapist", (patient, therapist))
+            patient_id = self._patient_ids(conn, [patient])[patient]
+            conn.execute("DELETE FROM slots WHERE patient_id = ?", (patient_id,))
+            conn.executemany("INSERT INTO slots (patient_id, position, weekday, time) VALUES (?, ?, ?, ?)",
+                             [(patient_id, i, slot['weekday'], slot['time']) for i, slot in enumerate(slots)])
+            if year is not None:
+                self._replace_transfers(conn, [(patient_id, transfers or [])], year, month)
+            self._invalidate(conn, [patient_id])
+
+    def delete_patient(self, patient):
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM patients WHERE name = ?", (patient,))
+            self._bump(conn)
+
+    def _patient_ids(self, conn, names):
+        ids = {}
+        # SQLiteの変数の上限（999）を超えないよう分けて引く
+        for i in range(0, len(names), 500):
+            chunk = names[i:i + 500]
+            ids.update(conn.execute(
+                f"SELECT name, id FROM patients WHERE name IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall())
+        return ids
+
+    def _replace_transfers(self, conn, patient_transfers, year, month):
+        key = _month_key(year, month)
+        conn.executemany("DELETE FROM transfers WHERE patient_id = ? AND month = ?",
+                         [(patient_id, key) for patient_id, _ in patient_transfers])
+        conn.executemany(
+            "INSERT INTO transfers (patient_id, month, from_day, to_day, time, seq) VALUES (?, ?, ?, ?, ?, ?)",
+            [(patient_id, key, from_day, to_day, time_range, seq)
+             for patient_id, transfers in patient_transfers
+             for seq, (from_day, to_day, time_range) in enumerate(transfers)]
+        )
+
+    def _invalidate(self, conn, patient_ids):
+        """書き換えた利用者の、展開済みの月の visits を作り直す"""
+        months = [row[0] for row in conn.execute("SELECT month FROM months")]
+        if months:
+            self._expand(conn, months, patient_ids)
+        self._bump(conn)
+
+    def _bump(self, conn):
+        conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'revision'")
+
+    # ---- visits の展開 ----
+
+    def _ensure_months(self, first, last):
+        """first〜last（'YYYY-MM'）の visits が展開されていなければ展開する"""
+        months = []
+        year, month = int(first[:4]), int(first[5:7])
+        while _month_key(year, month) <= last:
+            months.append(_month_key(year, month))
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        with self._connection() as conn:
+            done = {row[0] for row in conn.execute("SELECT month FROM months")}
+            if all(m in done for m in months):
+                return
+            conn.execute("BEGIN IMMEDIATE")
+            # ほかのスレッドが先に展開したかもしれないので、ロックを取ってから調べ直す
+            done = {row[0] for row in conn.execute("SELECT month FROM months")}
+            missing = [m for m in months if m not in done]
+            self._expand(conn, missing)
+            conn.executemany("INSERT INTO months VALUES (?)", [(m,) for m in missing])
+
+    def _expand(self, conn, months, patient_ids=None):
+        """visits を作り直す（patient_ids を指定するとその利用者だけ）"""
+        if patient_ids is not None and len(patient_ids) > 50:
+            patient_ids = None  # 多いときは1人ずつ引くより月ごと作り直す方が速い
+        for key in months:
+            year, month = int(key[:4]), int(key[5:7])
+            first, last = _month_dates(key)
+            if patient_ids is None:
+                conn.execute("DELETE FROM visits WHERE date BETWEEN ? AND ?", (first, last))
+                rows = conn.execute(_ALL_PATIENTS, {'month': key}).fetchall()
+            else:
+                conn.executemany("DELETE FROM visits WHERE patient_id = ? AND date BETWEEN ? AND ?",
+                                 [(patient_id, first, last) for patient_id in patient_ids])
+                rows = []
+                for patient_id in patient_ids:
+                    rows += conn.execute(_BY_ID, {'month': key, 'patient_id': patient_id}).fetchall()
+            grouped = {}
+            for patient_id, _, therapist, kind, _, a, time_range, to_day in rows:
+                entry = grouped.setdefault(patient_id, (therapist, [], []))
+                if kind == 0:
+                    entry[1].append({'weekday': a, 'time': time_range})
+                else:
+                    entry[2].append((int(a), to_day, time_range))
+            conn.executemany(
+                "INSERT INTO visits (patient_id, therapist, date, start, end, kind) VALUES (?, ?, ?, ?, ?, ?)",
+                [row for patient_id, (therapist, slots, transfers) in grouped.items()
+                 for row in _expand_visits(patient_id, therapist, year, month, slots, transfers)]
+            )
+
+
+class _Transaction:
+    """with で囲んだ範囲を1つのトランザクションにする（BEGINは書き込む側が明示する）"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.conn.in_transaction:
+            self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
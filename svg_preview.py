@@ -0,0 +1,80 @@
+"""予定表のプレビュー（SVG）
+
+PDFと同じ calendar_pdf.draw_calendar で描くので、プレビューとPDFの内容は必ず一致する。
+matplotlibもフォントの読み込みも使わず、文字と四角形をSVGの要素にするだけなので数ミリ秒で描ける。
+座標・文字の大きさは native_pdf と同じA4横（ポイント単位）にそろえている。
+"""
+from html import escape
+
+import metrics
+from calendar_pdf import draw_calendar
+
+# A4横（ポイント単位）と余白。native_pdf.NativeCanvas と同じ
+PAGE_SIZE = (842, 595)
+MARGIN = 36
+
+FONT_FAMILY = "'IPAexGothic', 'Noto Sans CJK JP', 'Hiragino Sans', 'Yu Gothic', sans-serif"
+
+_ANCHORS = {'left': 'start', 'center': 'middle', 'right': 'end'}
+
+
+class SvgCanvas:
+    """draw_calendar の描画命令をSVGの要素にする。座標はデータ座標（xlim/ylim）で指定する"""
+
+    def __init__(self, xlim, ylim, page_size=PAGE_SIZE, margin=MARGIN):
+        self.page_size = page_size
+        width, height = page_size
+        self._sx = (width - 2 * margin) / (xlim[1] - xlim[0])
+        self._sy = (height - 2 * margin) / (ylim[1] - ylim[0])
+        self._ox = margin - xlim[0] * self._sx
+        # SVGはy軸が下向きなので、ページの上端から測る
+        self._oy = height - margin + ylim[0] * self._sy
+        self._elements = []
+
+    def _point(self, x, y):
+        return self._ox + x * self._sx, self._oy - y * self._sy
+
+    def rect(self, x, y, width, height, linewidth=1.0):
+        left, top = self._point(x, y + height)
+        self._elements.append(
+            f'<rect x="{left:.1f}" y="{top:.1f}" width="{width * self._sx:.1f}" height="{height * self._sy:.1f}" '
+            f'fill="none" stroke="black" stroke-width="{linewidth:g}"/>'
+        )
+
+    def text(self, x, y, s, ha='left', va='baseline', fontsize=10, fontweight='normal', color='black'):
+        """matplotlibのAxes.textと同じ引数で文字を置く（改行で複数行）"""
+        px, py = self._point(x, y)
+        lines = s.split('\n')
+        leading = fontsize * 1.2
+        # 1行目のベースライン（native_pdf と同じく、上端は0.88em・上下中央はキャップハイトの半分で近似）
+        if va == 'center':
+            first_baseline = py - (len(lines) - 1) * leading / 2 + fontsize * 0.35
+        elif va == 'top':
+            first_baseline = py + fontsize * 0.88
+        else:
+            first_baseline = py
+
+        weight = ' font-weight="bold"' if fontweight == 'bold' else ''
+        spans = ''.join(
+            f'<tspan x="{px:.1f}" y="{first_baseline + i * leading:.1f}">{escape(line)}</tspan>'
+            for i, line in enumerate(lines)
+        )
+        self._elements.append(
+            f'<text text-anchor="{_ANCHORS[ha]}" font-size="{fontsize:g}" fill="{color}"{weight}>{spans}</text>'
+        )
+
+    def svg(self):
+        width, height = self.page_size
+        # Markdownとして解釈されないよう、空行・インデントを含まない1行にする
+        return (f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {height}" '
+                f'style="width:100%;height:auto;background:white" font-family="{FONT_FAMILY}">'
+                + ''.join(self._elements) + '</svg>')
+
+
+def render_svg(schedule):
+    """解決済みの予定（schedule.MonthSchedule）からプレビューのSVG文字列を作る"""
+    with metrics.span('preview.svg'):
+        # フッターまで入るように、PDFと同じ範囲を取る
+        canvas = SvgCanvas(xlim=(0, 7), ylim=(-0.9, len(schedule.weeks) + 3.4))
+        draw_calendar(canvas, schedule)
+        return canvas.svg()
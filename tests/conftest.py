@@ -0,0 +1,8 @@
+import os
+import sys
+import tempfile
+
+# アプリのモジュールはリポジトリ直下にあるので、そこからimportできるようにする
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+# アプリを動かすテストがリポジトリ直下にデータベースを作らないようにする（store より先に設定する）
+os.environ.setdefault('REHAB_CALENDAR_DB', os.path.join(tempfile.mkdtemp(), 'rehab_calendar.db'))
@@ -0,0 +1,42 @@
+"""app.py のテスト（AppTest で動かす）"""
+import os
+
+import pytest
+import streamlit
+from streamlit.testing.v1 import AppTest
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app.py')
+ICS_LABEL = "📅 カレンダー（.ics）をダウンロード"
+
+
+@pytest.fixture
+def download_data(monkeypatch):
+    """
+    download_button に渡した data（押したときに呼ぶ関数）をラベルごとに記録する
+    AppTest にはダウンロードを実行する仕組みがないので、ここで受け取って直接呼ぶ
+    """
+    captured = {}
+    download_button = streamlit.download_button
+
+    def recording_download_button(label, data, *args, **kwargs):
+        captured[label] = data
+        return download_button(label, b'' if callable(data) else data, *args, **kwargs)
+
+    monkeypatch.setattr(streamlit, 'download_button', recording_download_button)
+    return captured
+
+
+def test_ics_download_uses_transfers_at_click_time(download_data):
+    at = AppTest.from_file(APP, default_timeout=60)
+    at.run()
+    # ボタンを表示したときの関数を取っておく（実際のアプリでは、振替の編集は振替のフラグメントだけ再実行し、
+    # .ics のボタンは作り直されない）
+    make_ics = download_data[ICS_LABEL]
+    assert '振替訪問' not in make_ics().decode('utf-8')
+
+    next(button for button in at.button if button.label == "➕ 振替を追加").click().run()
+    assert at.session_state.transfers
+
+    ics = make_ics().decode('utf-8')
+    assert '振替訪問' in ics
+    assert 'STATUS:CANCELLED' in ics
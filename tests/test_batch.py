@@ -0,0 +1,24 @@
+"""batch.py のテスト"""
+import os
+
+from batch import render_to_dir
+from calendar_pdf import output_filename
+
+
+def patient(name, weekday):
+    return {'patient': name, 'therapist': '', 'slots': [{'weekday': weekday, 'time': '10:00-10:40'}],
+            'transfers': []}
+
+
+def test_render_to_dir_numbers_duplicate_names(tmp_path):
+    patients = [patient('山田', '月曜日'), patient('山田', '火曜日'), patient('鈴木', '水曜日'),
+                patient('山田', '木曜日'), patient('佐藤', '金曜日')]
+    assert render_to_dir(patients, 2025, 10, tmp_path, workers=2, backend='native') == 5
+
+    files = sorted(os.listdir(tmp_path))
+    # 同じ名前は上書きせず、CSVの行順に _2, _3 を付ける
+    stem, ext = os.path.splitext(output_filename(2025, 10, '山田'))
+    assert files == sorted([f"{stem}{ext}", f"{stem}_2{ext}", f"{stem}_3{ext}",
+                            output_filename(2025, 10, '鈴木'), output_filename(2025, 10, '佐藤')])
+    for name in files:
+        assert (tmp_path / name).read_bytes().startswith(b'%PDF')
@@ -0,0 +1,58 @@
+"""server.py のテスト（空いているポートに起動して、ソケットで直接リクエストを送る）"""
+import socket
+import threading
+
+import pytest
+
+from server import make_server
+
+# 読まずに残った本文が次のリクエストとして解釈されると、頼んでいない2つ目の応答が返る
+SMUGGLED = b'GET /healthz HTTP/1.1\r\nHost: localhost\r\n\r\n'
+
+
+@pytest.fixture(scope='module')
+def server():
+    server = make_server(port=0, workers=1, backend='native')
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    server.service.shutdown()
+
+
+def post_keep_alive(server, path, body):
+    """keep-alive の接続で POST し、サーバーが接続を閉じるまでに受け取ったものを返す"""
+    host, port = server.server_address
+    with socket.create_connection((host, port), timeout=10) as sock:
+        sock.sendall(f'POST {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n'.encode()
+                     + body)
+        received = b''
+        while chunk := sock.recv(65536):
+            received += chunk
+    return received
+
+
+def test_post_unknown_path_closes_connection(server):
+    received = post_keep_alive(server, '/nope', SMUGGLED)
+    assert received.startswith(b'HTTP/1.1 404')
+    assert b'Connection: close' in received
+    assert received.count(b'HTTP/1.1 ') == 1
+
+
+def test_export_bad_query_closes_connection(server):
+    received = post_keep_alive(server, '/export?year=2025', SMUGGLED)
+    assert received.startswith(b'HTTP/1.1 400')
+    assert b'Connection: close' in received
+    assert received.count(b'HTTP/1.1 ') == 1
+
+
+def test_export_draining_closes_connection(server):
+    server.service.draining = True
+    try:
+        received = post_keep_alive(server, '/export?year=2025&month=4', SMUGGLED)
+    finally:
+        server.service.draining = False
+    assert received.startswith(b'HTTP/1.1 503')
+    assert b'Connection: close' in received
+    assert received.count(b'HTTP/1.1 ') == 1
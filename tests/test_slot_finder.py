@@ -0,0 +1,26 @@
+"""slot_finder.py のテスト"""
+from conflicts import Visit
+from slot_finder import FreeTimeIndex
+
+
+def minutes(hour, minute=0):
+    return hour * 60 + minute
+
+
+def test_free_starts_gap_of_several_slots():
+    # 10:00-10:40 の訪問があるとき、前後10分（2枠）空けて40分の訪問を入れる
+    index = FreeTimeIndex([Visit('佐藤', '山田', 6, minutes(10), minutes(10, 40), 'regular')])
+    starts = index.free_starts('佐藤', 6, 40, gap=10)
+
+    # 前は9:10開始（9:50終了）まで、後ろは10:50開始から
+    assert minutes(9, 10) in starts
+    assert minutes(10, 50) in starts
+    assert minutes(9, 15) not in starts
+    assert minutes(10, 45) not in starts
+
+
+def test_free_starts_without_gap():
+    index = FreeTimeIndex([Visit('佐藤', '山田', 6, minutes(10), minutes(10, 40), 'regular')])
+    starts = index.free_starts('佐藤', 6, 40)
+    assert minutes(9, 20) in starts and minutes(10, 40) in starts
+    assert minutes(9, 25) not in starts and minutes(10, 35) not in starts